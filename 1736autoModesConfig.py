@@ -18,5 +18,5 @@ def makeMainModeList():
     # We are putting the autonomous main mode list on the WebServer
     mainModeList = ModeList("Main")
     mainModeList.addMode(DoNothingMode())
-    mainModeList.addMode(DrivePathTest1())
+    mainModeList.addModeFactory("Drive Path Test 1", DrivePathTest1)
     return mainModeList
\ No newline at end of file
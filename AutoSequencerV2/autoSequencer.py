@@ -3,7 +3,11 @@ from AutoSequencerV2.modeList import ModeList
 from AutoSequencerV2.builtInModes.doNothingMode import DoNothingMode
 from AutoSequencerV2.builtInModes.waitMode import WaitMode
 from AutoSequencerV2.sequentialCommandGroup import SequentialCommandGroup
+from AutoSequencerV2.lazyMode import ModePreparer
 from utils.singleton import Singleton
+from utils.signalLogging import BooleanSignal, sigNameToNT4TopicName
+
+READY_SIG_NAME = "Auto Mode Ready"
 
 class AutoSequencer(metaclass=Singleton):
     """Top-level implementation of the AutoSequencer 
@@ -23,11 +27,21 @@ class AutoSequencer(metaclass=Singleton):
         
         self.topLevelCmdGroup = SequentialCommandGroup()
         self.startPose = Pose2d()
+
+        # Selected modes get prepared in the background. The command sequence is only
+        # put together once they're ready.
+        self.preparer = ModePreparer()
+        self.cmdGroupStale = True
+        self.readySig = BooleanSignal(READY_SIG_NAME)
         
         self.updateMode(force=True) # Ensure we load the auto sequencer at least once.
         
     def addMode(self, newMode):
         self.mainModeList.addMode(newMode)
+
+    # Add a mode which is only built once the drive team selects it
+    def addModeFactory(self, name, factory):
+        self.mainModeList.addModeFactory(name, factory)
         
     # Call this periodically while disabled to keep the dashboard updated
     # and, when things change, re-init modes
@@ -35,15 +49,34 @@ class AutoSequencer(metaclass=Singleton):
         mainChanged = self.mainModeList.updateMode()
         delayChanged = self.delayModeList.updateMode()
         if(mainChanged or delayChanged or force):
-            mainMode = self.mainModeList.getCurMode()
-            delayMode = self.delayModeList.getCurMode()
-            self.topLevelCmdGroup = delayMode.getCmdGroup().andThen(mainMode.getCmdGroup())
-            self.startPose = mainMode.getInitialDrivetrainPose()
-            print(f"[Auto] New Modes Selected: {delayMode.getName()}, {mainMode.getName()}")
+            self.cmdGroupStale = True
 
+        mainMode = self.mainModeList.getCurMode()
+        delayMode = self.delayModeList.getCurMode()
+        self.preparer.request(mainMode)
+        self.preparer.request(delayMode)
+        ready = self.preparer.isReady(mainMode) and self.preparer.isReady(delayMode)
+        self.readySig.set(ready)
+
+        if(self.cmdGroupStale and ready):
+            self._buildCmdGroup()
+
+    def _buildCmdGroup(self):
+        mainMode = self.mainModeList.getCurMode()
+        delayMode = self.delayModeList.getCurMode()
+        self.topLevelCmdGroup = delayMode.getCmdGroup().andThen(mainMode.getCmdGroup())
+        self.startPose = mainMode.getInitialDrivetrainPose()
+        self.cmdGroupStale = False
+        print(f"[Auto] New Modes Selected: {delayMode.getName()}, {mainMode.getName()}")
     
     # Call this once during autonmous init to init the current command sequence
     def initiaize(self):  
+        if(self.cmdGroupStale):
+            # Background preparation didn't finish in time - do it here, and accept the delay
+            print("[Auto] Selected modes weren't ready, preparing them now")
+            self.preparer.prepareNow(self.mainModeList.getCurMode())
+            self.preparer.prepareNow(self.delayModeList.getCurMode())
+            self._buildCmdGroup()
         print("[Auto] Starting Sequencer")
         self.topLevelCmdGroup.initialize()
     
@@ -66,5 +99,8 @@ class AutoSequencer(metaclass=Singleton):
     def getDelayModeNTTableName(self):
         return self.delayModeList.getModeTopicBase()
     
+    def getReadyTopicName(self):
+        return sigNameToNT4TopicName(READY_SIG_NAME)
+
     def getStartingPose(self):
         return self.startPose
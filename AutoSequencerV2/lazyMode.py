@@ -0,0 +1,75 @@
+import threading
+import traceback
+from AutoSequencerV2.mode import Mode
+
+# A mode which isn't built until it's needed.
+# Only one mode runs per match, so there's no point building every one of them at startup.
+# The name has to be given up front, so the mode can still be listed for the drive team to pick.
+class LazyMode(Mode):
+    def __init__(self, name, factory):
+        Mode.__init__(self, name)
+        self._factory = factory
+        self._mode = None
+        self._lock = threading.Lock()
+
+    # Build the real mode, and let it do its own slow setup. Safe to call from any thread, any number of times.
+    def prepare(self):
+        with self._lock:
+            if self._mode is None:
+                mode = self._factory()
+                mode.prepare()
+                self._mode = mode
+
+    def getCmdGroup(self):
+        self.prepare()
+        return self._mode.getCmdGroup()
+
+    def getInitialDrivetrainPose(self):
+        self.prepare()
+        return self._mode.getInitialDrivetrainPose()
+
+# Runs modes' prepare() on a background thread, one at a time, so the robot loop never waits on it
+class ModePreparer():
+    def __init__(self):
+        self.prepared = set()
+        # Modes whose background prepare() raised. They aren't retried in the background.
+        self.failed = set()
+        self.thread = None
+        self.threadMode = None
+
+    def isReady(self, mode):
+        return mode in self.prepared
+
+    # Start preparing a mode in the background, if it isn't already.
+    # If another mode is still being prepared, this does nothing - just ask again next loop.
+    # Modes which already failed in the background are left for prepareNow().
+    def request(self, mode):
+        if mode in self.prepared or mode in self.failed:
+            return
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.threadMode = mode
+        self.thread = threading.Thread(target=self._prepareInBackground, args=(mode,),
+                                       name="AutoModePrep", daemon=True)
+        self.thread.start()
+
+    # Make sure a mode is prepared, right now. Waits for the background thread if it's partway through.
+    def prepareNow(self, mode):
+        if mode in self.prepared:
+            return
+        if self.thread is not None and self.threadMode is mode:
+            self.thread.join()
+        if mode not in self.prepared:
+            mode.prepare()
+            self.prepared.add(mode)
+            self.failed.discard(mode)
+
+    def _prepareInBackground(self, mode):
+        try:
+            mode.prepare()
+            self.prepared.add(mode)
+        except Exception: # pylint: disable=broad-exception-caught
+            # It'll be tried again, on the main thread, when autonomous starts
+            self.failed.add(mode)
+            print(f"[Auto] Failed to prepare mode {mode.getName()}")
+            traceback.print_exc()
@@ -16,6 +16,11 @@ class Mode():
         else:
             self._name = self.__class__.__name__
 
+    # Do any slow setup (ie, loading trajectories) ahead of time. Runs on a background
+    # thread while the robot is disabled, so must be safe to call more than once.
+    def prepare(self):
+        pass
+
     def getCmdGroup(self):
         return SequentialCommandGroup([])
     
@@ -1,4 +1,5 @@
 import ntcore as nt
+from AutoSequencerV2.lazyMode import LazyMode
 
 # A mode list is the set of autonomous modes that the drive team must pick from before a match
 # Networktables is used to read the user's current selection
@@ -20,6 +21,10 @@ class ModeList():
         
     def addMode(self, modeIn):
         self.modes.append(modeIn)        
+
+    # Add a mode which is only built once it's selected. factory() should return the Mode.
+    def addModeFactory(self, name, factory):
+        self.addMode(LazyMode(name, factory))
         
     def updateMode(self, force=False):
         prevModeIdx = self.curModeIdx
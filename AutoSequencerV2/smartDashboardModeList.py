@@ -1,4 +1,5 @@
 import wpilib
+from AutoSequencerV2.lazyMode import LazyMode
 
 # A mode list is the set of autonomous modes that the drive team must pick from before a match
 # Networktables is used to read the user's current selection
@@ -21,6 +22,10 @@ class SmartDashboardModeList():
         self.modes.append(modeIn)
         #wpilib.SmartDashboard.putData(self.getDesModeTopicName(), self.desChooser)
 
+    # Add a mode which is only built once it's selected. factory() should return the Mode.
+    def addModeFactory(self, name, factory):
+        self.addMode(LazyMode(name, factory))
+
     def updateMode(self, force=False):
         prevModeIdx = self.curModeIdx
         tmp = self.desChooser.getSelected()
@@ -1,11 +1,12 @@
 import os
+import threading
 import wpilib
-from pathplannerlib import PathPlanner
 
 from AutoSequencerV2.command import Command
 from drivetrain.drivetrainControl import DrivetrainControl
 from drivetrain.drivetrainPhysical import MAX_DT_LINEAR_SPEED
 from drivetrain.drivetrainPhysical import MAX_TRANSLATE_ACCEL_MPS2
+from drivetrain.trajectoryCache import loadTrajectoryTable
 
 class DrivePathCommand(Command):
     
@@ -17,25 +18,44 @@ class DrivePathCommand(Command):
         # when the code is not running in the normal launch directory.
         # Critically, we have this issue while running unit tests on our code.
         # This shouldn't be necessary after PathPlanner is fixed internally
-        absPath = os.path.abspath(os.path.join(os.path.dirname(__file__), 
-                                               "..", 
-                                               "..", 
-                                               "deploy", 
-                                               "pathplanner", 
-                                               pathFile))
-
-        self.path = PathPlanner.loadPath(absPath, 
-                                         MAX_DT_LINEAR_SPEED * speedScalar,
-                                         MAX_TRANSLATE_ACCEL_MPS2 * speedScalar)
+        self.absPath = os.path.abspath(os.path.join(os.path.dirname(__file__), 
+                                                    "..", 
+                                                    "..", 
+                                                    "deploy", 
+                                                    "pathplanner", 
+                                                    pathFile))
+        self.maxVel = MAX_DT_LINEAR_SPEED * speedScalar
+        self.maxAccel = MAX_TRANSLATE_ACCEL_MPS2 * speedScalar
+
+        # Loaded the first time it's needed - see getTrajectory()
+        self.path = None
+        self.pathLock = threading.Lock()
         self.done = False
         self.startTime = -1 # we'll populate these for real later, just declare they'll exist
-        self.duration = self.path.getTotalTime()
+        self.duration = 0.0
         self.drivetrain = DrivetrainControl()
         self.poseTelem = DrivetrainControl().poseEst.telemetry
 
+    def getTrajectory(self):
+        """The path's trajectory, resampled so each loop's sample is quick no matter how long
+        the path is. Comes from the compiled trajectory cache if the path hasn't changed.
+
+        Returns:
+            TrajectorySampleTable: the trajectory
+        """
+        # Might be loading on a background thread already, see ModePreparer
+        with self.pathLock:
+            if self.path is None:
+                path = loadTrajectoryTable(self.absPath, self.maxVel, self.maxAccel)
+                self.duration = path.getTotalTime()
+                self.path = path
+        return self.path
+
     def initialize(self):
+        self.getTrajectory()
         self.startTime = wpilib.Timer.getFPGATimestamp()
         self.poseTelem.setTrajectory(self.path)
+        self.drivetrain.boostSensorRates(self.duration)
 
     def execute(self):
         curTime = wpilib.Timer.getFPGATimestamp() - self.startTime
@@ -9,10 +9,14 @@ class DrivePathTest1(Mode):
         Mode.__init__(self, f"Drive Path Test 1")
         self.pathCmd = DrivePathCommand("testPath1", 0.75)
         
+    def prepare(self):
+        # Load the trajectory ahead of time, rather than as autonomous starts
+        self.pathCmd.getTrajectory()
+
     def getCmdGroup(self):
         # Just return the path command
         return self.pathCmd
     
     def getInitialDrivetrainPose(self):
         # Use the path command to specify the starting pose
-        return self.pathCmd.path.getInitialHolonomicPose()
\ No newline at end of file
+        return self.pathCmd.getTrajectory().getInitialPose()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from AutoSequencerV2.autoSequencer import AutoSequencer
 from dashboardWidgets.autoChooser import AutoChooser
+from dashboardWidgets.icon import Icon
 from dashboardWidgets.swerveState import SwerveState
 from dashboardWidgets.text import Text
 from webserver.webserver import Webserver
@@ -16,4 +17,6 @@ class Dashboard():
                         AutoSequencer().getDelayModeList()))
         Webserver().addDashboardWidget(
             AutoChooser(50, 20, AutoSequencer().getMainModeNTTableName(), 
-                        AutoSequencer().getMainModeList()))
\ No newline at end of file
+                        AutoSequencer().getMainModeList()))
+        Webserver().addDashboardWidget(
+            Icon(50, 30, AutoSequencer().getReadyTopicName(), "'#00FF00'", "'icons/cycle.svg'"))
\ No newline at end of file
@@ -1,11 +1,15 @@
 from wpimath.kinematics import ChassisSpeeds
 from wpimath.geometry import Pose2d, Rotation2d
 from utils.singleton import Singleton
+from utils.signalLogging import DoubleArraySignal
+from utils.profiler import profile
+from dashboardWidgets.swerveState import getModuleStatesTopicName
 
 from drivetrain.drivetrainPoseEstimator import DrivetrainPoseEstimator
 from drivetrain.swerveModuleControl import SwerveModuleControl
 from drivetrain.swerveModuleGainSet import SwerveModuleGainSet
 from drivetrain.drivetrainTrajectoryControl import DrivetrainTrajectoryControl
+from drivetrain.swerveKinematics4 import SwerveKinematics4
 from drivetrain.drivetrainPhysical import MAX_FWD_REV_SPEED_MPS
 from drivetrain.drivetrainPhysical import FL_ENCODER_MOUNT_OFFSET_RAD
 from drivetrain.drivetrainPhysical import FR_ENCODER_MOUNT_OFFSET_RAD
@@ -16,6 +20,11 @@ from drivetrain.drivetrainPhysical import FR_INVERT_WHEEL_MOTOR
 from drivetrain.drivetrainPhysical import BL_INVERT_WHEEL_MOTOR
 from drivetrain.drivetrainPhysical import BR_INVERT_WHEEL_MOTOR
 from drivetrain.drivetrainPhysical import kinematics
+from drivetrain.drivetrainPhysical import robotToModuleTranslations
+
+# Do the per-loop swerve math in plain python (see swerveKinematics4.py), rather than
+# through wpimath. Both give the same answers - the python version is just quicker.
+USE_FAST_KINEMATICS = True
 
 class DrivetrainControl(metaclass=Singleton):
     """
@@ -29,6 +38,7 @@ class DrivetrainControl(metaclass=Singleton):
         self.modules.append(SwerveModuleControl("BR", 8, 9, 3, BR_ENCODER_MOUNT_OFFSET_RAD, BR_INVERT_WHEEL_MOTOR))
 
         self.desChSpd = ChassisSpeeds()
+        self.fastKin = SwerveKinematics4(robotToModuleTranslations)
         self.curDesPose = Pose2d()
 
         self.gains = SwerveModuleGainSet()
@@ -36,9 +46,21 @@ class DrivetrainControl(metaclass=Singleton):
         self.poseEst = DrivetrainPoseEstimator(self.getModulePositions())
         
         self.trajCtrl = DrivetrainTrajectoryControl()
+
+        # All four modules' states, logged together as one entry per loop
+        self.moduleStatesSig = DoubleArraySignal(getModuleStatesTopicName(), "deg,deg,frac,frac")
         
         self._updateAllCals()
 
+    def boostSensorRates(self, durationSec):
+        """Get fresher wheel motor data for a while, ie, while following a trajectory
+
+        Args:
+            durationSec (float): how long to boost for, in seconds
+        """
+        for module in self.modules:
+            module.wheelMotor.boostStatusFrames(durationSec)
+
     def setCmdFieldRelative(self, velX, velY, velT):
         """Send commands to the robot for motion relative to the field
 
@@ -51,7 +73,7 @@ class DrivetrainControl(metaclass=Singleton):
                                                     velY, 
                                                     velT, 
                                                     self.poseEst.getCurEstPose().rotation())
-        self.desChSpd = _discretizeChSpd(tmp)
+        self._setDesChSpd(tmp.vx, tmp.vy, tmp.omega)
         self.poseEst.telemetry.setDesiredPose(self.poseEst.getCurEstPose()) 
 
     def setCmdRobotRelative(self, velX, velY, velT):
@@ -62,18 +84,18 @@ class DrivetrainControl(metaclass=Singleton):
             velY (float): Desired speed in the robot's Y axis, in th meters per second
             velT (float): Desired rotational speed in the robot's reference frame, in radians per second
         """
-        self.desChSpd = _discretizeChSpd(ChassisSpeeds(velX, velY, velT))
+        self._setDesChSpd(velX, velY, velT)
         self.poseEst.telemetry.setDesiredPose(self.poseEst.getCurEstPose())
         
     def setCmdTrajectory(self, cmd):
         """Send commands to the robot for motion as a part of following a trajectory
 
         Args:
-            cmd (PathPlannerState): PathPlanner trajectory sample for the current time
+            cmd (TrajectorySample): trajectory sample for the current time
         """
         tmp = self.trajCtrl.update(cmd, self.poseEst.getCurEstPose())
-        self.desChSpd = _discretizeChSpd(tmp)
-        self.poseEst.telemetry.setDesiredPose(Pose2d(cmd.pose.translation(), cmd.holonomicRotation))
+        self._setDesChSpd(tmp.vx, tmp.vy, tmp.omega)
+        self.poseEst.telemetry.setDesiredPose(cmd.getPose())
 
 
     def update(self):
@@ -82,24 +104,40 @@ class DrivetrainControl(metaclass=Singleton):
         """
         
         # Given the current desired chassis speeds, convert to module states
-        desModStates = kinematics.toSwerveModuleStates(self.desChSpd)
-        
         # Scale back commands if one corner of the robot is going too fast
-        kinematics.desaturateWheelSpeeds(desModStates, MAX_FWD_REV_SPEED_MPS)
+        if USE_FAST_KINEMATICS:
+            self.fastKin.updateModuleStates(MAX_FWD_REV_SPEED_MPS)
+        else:
+            desModStates = kinematics.toSwerveModuleStates(self.desChSpd)
+            desModStates = kinematics.desaturateWheelSpeeds(desModStates, MAX_FWD_REV_SPEED_MPS)
 
         # Send commands to modules and update
-        for idx, module in enumerate(self.modules):
-            module.setDesiredState(desModStates[idx])
-            module.update()
+        with profile("Modules"):
+            for idx, module in enumerate(self.modules):
+                if USE_FAST_KINEMATICS:
+                    module.setDesiredSpeedAngle(self.fastKin.speeds[idx], self.fastKin.anglesRad[idx])
+                else:
+                    module.setDesiredState(desModStates[idx])
+                module.update()
+
+        self.moduleStatesSig.set([val for module in self.modules for val in module.getTelemetryVals()])
             
         # Update the estimate of our pose
-        self.poseEst.update(self.getModulePositions())
+        with profile("PoseEstimator"):
+            self.poseEst.update(self.getModulePositions())
         
         # Update calibration values if they've changed
         if(self.gains.hasChanged()):
             self._updateAllCals()
             
                 
+    def _setDesChSpd(self, velX, velY, velT):
+        # Helper function - discretizes and stores new robot relative chassis speed commands
+        if USE_FAST_KINEMATICS:
+            self.fastKin.setChassisSpeeds(velX, velY, velT)
+        else:
+            self.desChSpd = _discretizeChSpd(ChassisSpeeds(velX, velY, velT))
+
     def _updateAllCals(self):
         # Helper function - updates all calibration on request
         for module in self.modules:
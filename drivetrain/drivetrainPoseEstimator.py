@@ -4,7 +4,7 @@ from drivetrain.drivetrainPhysical import kinematics
 from drivetrain.drivetrainPhysical import wrapperedGyro
 from drivetrain.drivetrainPoseTelemetry import DrivetrainPoseTelemetry
 from utils.faults import Fault
-from utils.signalLogging import log
+from utils.signalLogging import Signal
 
 
 class DrivetrainPoseEstimator():
@@ -24,6 +24,7 @@ class DrivetrainPoseEstimator():
         self.lastModulePositions = initialModuleStates
         self.curRawGyroAngle = Rotation2d()
         self.telemetry = DrivetrainPoseTelemetry()
+        self.gyroAngleSig = Signal("PE Gyro Angle", "deg")
 
     def setKnownPose(self, knownPose):
         """Reset the robot's estimated pose to some specific position. This is useful if we know with certanty
@@ -51,7 +52,7 @@ class DrivetrainPoseEstimator():
         self.curEstPose = self.poseEst.getEstimatedPosition()
         
         # Record the estimate to telemetry/logging
-        log("PE Gyro Angle", self.curRawGyroAngle.degrees(), "deg")
+        self.gyroAngleSig.set(self.curRawGyroAngle.degrees())
         self.telemetry.update(self.curEstPose)
         
         # Remember the module positions for next loop
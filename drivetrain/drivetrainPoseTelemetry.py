@@ -3,7 +3,7 @@ import wpilib
 from wpimath.units import metersToFeet
 from wpimath.trajectory import Trajectory
 from wpimath.geometry import Pose2d
-from utils.signalLogging import log
+from utils.signalLogging import Signal
 
 
 
@@ -20,6 +20,13 @@ class DrivetrainPoseTelemetry():
         self.curTraj = Trajectory()
         self.desPose = Pose2d()
 
+        self.estXSig = Signal("DT Pose Est X", "ft")
+        self.estYSig = Signal("DT Pose Est Y", "ft")
+        self.estTSig = Signal("DT Pose Est T", "deg")
+        self.desXSig = Signal("DT Pose Des X", "ft")
+        self.desYSig = Signal("DT Pose Des Y", "ft")
+        self.desTSig = Signal("DT Pose Des T", "deg")
+
     def setDesiredPose(self, desPose):
         self.desPose = desPose
         
@@ -28,43 +35,33 @@ class DrivetrainPoseTelemetry():
         self.field.getObject("desPose").setPose(self.desPose)
         self.field.getObject("desTraj").setTrajectory(self.curTraj)
 
-        log("DT Pose Est X", metersToFeet(estPose.X()), "ft")
-        log("DT Pose Est Y", metersToFeet(estPose.Y()), "ft")
-        log("DT Pose Est T", estPose.rotation().degrees(), "deg")
-        log("DT Pose Des X", metersToFeet(self.desPose.X()), "ft")
-        log("DT Pose Des Y", metersToFeet(self.desPose.Y()), "ft")
-        log("DT Pose Des T", self.desPose.rotation().degrees(), "deg")
+        self.estXSig.set(metersToFeet(estPose.X()))
+        self.estYSig.set(metersToFeet(estPose.Y()))
+        self.estTSig.set(estPose.rotation().degrees())
+        self.desXSig.set(metersToFeet(self.desPose.X()))
+        self.desYSig.set(metersToFeet(self.desPose.Y()))
+        self.desTSig.set(self.desPose.rotation().degrees())
 
     def setTrajectory(self, trajIn):
         """Display a specific trajectory on the robot Field2d
 
         Args:
-            trajIn (PathPlannerTrajectory): The trajectory to display
+            trajIn (TrajectorySampleTable): The trajectory to display
         """
-        # Transform pathplanner state into useful trajectory for telemetry
+        # Transform trajectory samples into useful trajectory for telemetry
         if trajIn is not None:
             stateList = []
-            stateList.append(trajIn.getInitialState())
-            for idx in range(1, 10):
-                stateList.append(trajIn.sample(trajIn.getTotalTime() * (idx/float(10))))
-            stateList.append(trajIn.getEndState())
-
-            stateList = [self._pathplannerToWPIState(x) for x in stateList]
+            for idx in range(0, 11):
+                stateList.append(self._sampleToWPIState(trajIn.sample(trajIn.getTotalTime() * (idx/float(10)))))
             self.curTraj = Trajectory(stateList)
         else:
             self.curTraj = Trajectory()
 
-    # PathPlanner has a built in "to-wpilib" representation, but it doesn't
-    # account for holonomic heading. Fix that.
-    def _pathplannerToWPIState(self, inVal):
-        trans = inVal.pose.translation()
-        # Critically - in the shown pose,
-        # display the holonomic rotation, not the path velocity vector
-        rot = inVal.holonomicRotation 
-        pose = Pose2d(trans, rot)
+    # Critically - in the shown pose,
+    # display the holonomic rotation, not the path velocity vector
+    def _sampleToWPIState(self, inVal):
         return Trajectory.State(
-            acceleration=inVal.acceleration,
-            pose=pose,
+            pose=inVal.getPose(),
             t=inVal.time,
             velocity=inVal.velocity
             )
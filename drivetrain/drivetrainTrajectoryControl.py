@@ -3,7 +3,7 @@ from wpimath.controller import PIDController
 from wpimath.kinematics import ChassisSpeeds
 from drivetrain.drivetrainPhysical import MAX_FWD_REV_SPEED_MPS, MAX_ROTATE_SPEED_RAD_PER_SEC
 from utils.calibration import Calibration
-from utils.signalLogging import log
+from utils.signalLogging import Signal
 from utils.mathUtils import limit
 
 class DrivetrainTrajectoryControl():
@@ -48,6 +48,13 @@ class DrivetrainTrajectoryControl():
         )
         # Make sure the controller knows that -170 and 170 are just 20 degrees apart
         self.tCtrl.enableContinuousInput(-math.pi, math.pi)
+
+        self.xFFSig = Signal("Drivetrain HDC xFF", "mps")
+        self.yFFSig = Signal("Drivetrain HDC yFF", "mps")
+        self.tFFSig = Signal("Drivetrain HDC tFF", "radpersec")
+        self.xFBSig = Signal("Drivetrain HDC xFB", "mps")
+        self.yFBSig = Signal("Drivetrain HDC yFB", "mps")
+        self.tFBSig = Signal("Drivetrain HDC tFB", "radpersec")
         
     def updateCals(self):
         self.xCtrl.setPID(            
@@ -70,7 +77,7 @@ class DrivetrainTrajectoryControl():
         """Main periodic update, call this whenever you need new commands
 
         Args:
-            trajCmd (PathPlannerState): Current trajectory state
+            trajCmd (TrajectorySample): Current trajectory state
             curEstPose (Pose2d): Current best-estimate of where the robot is at on the field
 
         Returns:
@@ -78,24 +85,26 @@ class DrivetrainTrajectoryControl():
             the robot to follow that will get it to the desired pose
         """
                 
-        # Feed-Forward - calculate how fast we should be going at this point in the trajectory
-        xFF = trajCmd.velocity * trajCmd.pose.rotation().cos()
-        yFF = trajCmd.velocity * trajCmd.pose.rotation().sin()
-        tFF = trajCmd.holonomicAngularVelocity
+        # Feed-Forward - how fast we should be going at this point in the trajectory.
+        # Already worked out when the trajectory was loaded.
+        xFF = trajCmd.xFF
+        yFF = trajCmd.yFF
+        tFF = trajCmd.angularVelocity
         
         # Feed-Back - Apply additional correction if we're not quite yet at the spot on the field we
         #             want to be at.
-        xFB = self.xCtrl.calculate(curEstPose.X(), trajCmd.pose.X())
-        yFB = self.yCtrl.calculate(curEstPose.Y(), trajCmd.pose.Y())
-        tFB = self.tCtrl.calculate(curEstPose.rotation().radians(), trajCmd.holonomicRotation.radians())
+        xFB = self.xCtrl.calculate(curEstPose.X(), trajCmd.x)
+        yFB = self.yCtrl.calculate(curEstPose.Y(), trajCmd.y)
+        # Sample heading is kept continuous, and can be outside +/- pi - wrap it back for the controller
+        tFB = self.tCtrl.calculate(curEstPose.rotation().radians(), math.remainder(trajCmd.headingRad, math.tau))
         
-        log("Drivetrain HDC xFF", xFF, "mps")
-        log("Drivetrain HDC yFF", yFF, "mps")
-        log("Drivetrain HDC tFF", tFF, "radpersec")
+        self.xFFSig.set(xFF)
+        self.yFFSig.set(yFF)
+        self.tFFSig.set(tFF)
         
-        log("Drivetrain HDC xFB", xFB, "mps")
-        log("Drivetrain HDC yFB", yFB, "mps")
-        log("Drivetrain HDC tFB", tFB, "radpersec")
+        self.xFBSig.set(xFB)
+        self.yFBSig.set(yFB)
+        self.tFBSig.set(tFB)
 
         vXCmd = limit(xFF + xFB, MAX_FWD_REV_SPEED_MPS)
         vYCmd = limit(yFF + yFB, MAX_FWD_REV_SPEED_MPS)
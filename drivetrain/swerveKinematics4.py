@@ -0,0 +1,103 @@
+import array
+import math
+
+# Pure-python swerve drive math for exactly four modules.
+# Does the same job as wpimath's SwerveDrive4Kinematics, Pose2d.log() based discretization,
+# and SwerveModuleState.optimize(), but on plain floats kept in preallocated arrays.
+# Each wpimath call creates new Pose2d/Twist2d/ChassisSpeeds/SwerveModuleState objects,
+# and crosses from python into C++ and back. For only four modules, that overhead is
+# most of the cost - plain python float math is much quicker.
+# tests/swerveKinematics4_test.py checks this against wpimath.
+
+NUM_MODULES = 4
+
+class SwerveKinematics4():
+    """
+    Inverse kinematics, desaturation and discretization for a 4-module swerve drivetrain
+    """
+    def __init__(self, moduleTranslations, loopPeriodSec=0.02):
+        """
+        Args:
+            moduleTranslations (list[Translation2d]): Robot center to each module's contact patch, in the
+                same order as the modules
+            loopPeriodSec (float, optional): Period used to discretize chassis speeds. Defaults to 0.02.
+        """
+        self.moduleX = array.array('d', [trans.X() for trans in moduleTranslations])
+        self.moduleY = array.array('d', [trans.Y() for trans in moduleTranslations])
+        self.loopPeriodSec = loopPeriodSec
+
+        # Desired chassis speeds, robot relative and already discretized
+        self.vx = 0.0
+        self.vy = 0.0
+        self.omega = 0.0
+
+        # Desired module states - outputs of updateModuleStates()
+        self.speeds = array.array('d', [0.0] * NUM_MODULES)
+        self.anglesRad = array.array('d', [0.0] * NUM_MODULES)
+
+    def setChassisSpeeds(self, vx, vy, omega):
+        """Set the desired robot-relative chassis speeds, correcting for 2nd order kinematics
+        the same way as `_discretizeChSpd()` in drivetrainControl.
+        See https://www.chiefdelphi.com/t/whitepaper-swerve-drive-skew-and-second-order-kinematics/416964/30
+
+        Args:
+            vx (float): meters per second in the robot's X direction
+            vy (float): meters per second in the robot's Y direction
+            omega (float): radians per second, counter-clockwise positive
+        """
+        dt = self.loopPeriodSec
+        dx = vx * dt
+        dy = vy * dt
+        dtheta = omega * dt
+
+        # Pose2d.log() of the pose we'd be at after one loop
+        halfDtheta = dtheta / 2.0
+        cosMinusOne = math.cos(dtheta) - 1.0
+        if abs(cosMinusOne) < 1e-9:
+            halfThetaByTanOfHalfDtheta = 1.0 - 1.0 / 12.0 * dtheta * dtheta
+        else:
+            halfThetaByTanOfHalfDtheta = -(halfDtheta * math.sin(dtheta)) / cosMinusOne
+
+        self.vx = (dx * halfThetaByTanOfHalfDtheta + dy * halfDtheta) / dt
+        self.vy = (dy * halfThetaByTanOfHalfDtheta - dx * halfDtheta) / dt
+        self.omega = omega
+
+    def updateModuleStates(self, maxSpeed):
+        """Convert the desired chassis speeds into each module's speed and angle, then scale
+        all modules back together if any one is going faster than maxSpeed.
+        Results go in `speeds` and `anglesRad`.
+
+        Args:
+            maxSpeed (float): fastest any module may go, in meters per second
+        """
+        if self.vx == 0.0 and self.vy == 0.0 and self.omega == 0.0:
+            # Stopped - keep pointing the modules wherever they were
+            for idx in range(NUM_MODULES):
+                self.speeds[idx] = 0.0
+            return
+
+        realMaxSpeed = 0.0
+        for idx in range(NUM_MODULES):
+            modVx = self.vx - self.omega * self.moduleY[idx]
+            modVy = self.vy + self.omega * self.moduleX[idx]
+            speed = math.hypot(modVx, modVy)
+            self.speeds[idx] = speed
+            self.anglesRad[idx] = math.atan2(modVy, modVx)
+            realMaxSpeed = max(realMaxSpeed, speed)
+
+        if realMaxSpeed > maxSpeed:
+            scale = maxSpeed / realMaxSpeed
+            for idx in range(NUM_MODULES):
+                self.speeds[idx] *= scale
+
+def optimizeModuleState(speed, angleRad, curAngleRad):
+    """Same as SwerveModuleState.optimize() - if the module is more than 90 degrees from where
+    it's been asked to point, point it the opposite way and drive the wheel backward instead.
+
+    Returns:
+        tuple(float, float): the speed and angle (in radians) to command
+    """
+    delta = math.atan2(math.sin(angleRad - curAngleRad), math.cos(angleRad - curAngleRad))
+    if abs(delta) > math.pi / 2.0:
+        return -speed, math.atan2(-math.sin(angleRad), -math.cos(angleRad))
+    return speed, angleRad
@@ -6,15 +6,13 @@ from wpimath.geometry import Rotation2d
 import wpilib
 
 from wrappers.wrapperedSparkMax import WrapperedSparkMax
-from dashboardWidgets.swerveState import getAzmthDesTopicName, getAzmthActTopicName
-from dashboardWidgets.swerveState import getSpeedDesTopicName, getSpeedActTopicName
-from utils.signalLogging import log
 from utils.units import rad2Deg
 from drivetrain.drivetrainPhysical import dtMotorRotToLinear
 from drivetrain.drivetrainPhysical import dtLinearToMotorRot
 from drivetrain.drivetrainPhysical import MAX_FWD_REV_SPEED_MPS
 from drivetrain.drivetrainPhysical import INVERT_AZMTH_MOTOR
 from drivetrain.drivetrainPhysical import wrapperedSwerveDriveAzmthEncoder
+from drivetrain.swerveKinematics4 import optimizeModuleState
 
 class SwerveModuleControl():
     """
@@ -40,9 +38,14 @@ class SwerveModuleControl():
         
         self.wheelMotorFF = SimpleMotorFeedforwardMeters(0,0,0)
 
-        self.desiredState = SwerveModuleState()
-        self.optimizedDesiredState = SwerveModuleState()
-        self.actualState = SwerveModuleState()
+        # Module states are kept as plain floats (meters per second, and radians),
+        # so the periodic update doesn't need to create any new wpimath objects
+        self.desSpeed = 0.0
+        self.desAngleRad = 0.0
+        self.optDesSpeed = 0.0
+        self.optDesAngleRad = 0.0
+        self.actSpeed = 0.0
+        self.actAngleRad = 0.0
 
         self.azmthCtrl = PIDController(0,0,0)
         self.azmthCtrl.enableContinuousInput(-180.0, 180.0)
@@ -51,18 +54,27 @@ class SwerveModuleControl():
 
         self.moduleName = moduleName
 
+        # Most recent telemetry values, gathered up by the drivetrain into one signal for all modules
+        self.telemetryVals = (0.0, 0.0, 0.0, 0.0)
+
     def _updateTelemetry(self):
         """
-        Helper function to put all relevant data to logs and dashboards for this module
+        Helper function to gather all relevant data for logs and dashboards for this module.
+        Order must match what the SwerveState dashboard widget expects.
+        """
+        self.telemetryVals = (
+            rad2Deg(self.optDesAngleRad),
+            rad2Deg(self.azmthEnc.getAngleRad()),
+            self.optDesSpeed/MAX_FWD_REV_SPEED_MPS,
+            dtMotorRotToLinear(self.wheelMotor.getMotorVelocityRadPerSec())/MAX_FWD_REV_SPEED_MPS
+        )
+
+    def getTelemetryVals(self):
         """
-        log(getAzmthDesTopicName(self.moduleName), 
-            self.optimizedDesiredState.angle.degrees(), "deg")
-        log(getAzmthActTopicName(self.moduleName), 
-            rad2Deg(self.azmthEnc.getAngleRad()), "deg")
-        log(getSpeedDesTopicName(self.moduleName), 
-            self.optimizedDesiredState.speed/MAX_FWD_REV_SPEED_MPS, "frac")
-        log(getSpeedActTopicName(self.moduleName), 
-            dtMotorRotToLinear(self.wheelMotor.getMotorVelocityRadPerSec())/MAX_FWD_REV_SPEED_MPS, "frac")
+        Returns:
+            tuple: This module's azimuth desired and actual (deg), and speed desired and actual (fraction of max)
+        """
+        return self.telemetryVals
 
     def getActualPosition(self):
         """
@@ -77,14 +89,14 @@ class SwerveModuleControl():
         Returns:
             SwerveModuleState: The state of the module (azmth and wheel) as measured by sensors
         """
-        return self.actualState
+        return SwerveModuleState(self.actSpeed, Rotation2d(self.actAngleRad))
 
     def getDesiredState(self):
         """
         Returns:
             SwerveModuleState: The commanded, desired state of the module (azmth and wheel)
         """
-        return self.desiredState
+        return SwerveModuleState(self.desSpeed, Rotation2d(self.desAngleRad))
 
     def setClosedLoopGains(self, gains):
         """Set feed-forward and closed loop gains for the module
@@ -108,7 +120,18 @@ class SwerveModuleControl():
         Args:
             desState (SwerveModuleState): The commanded state of the module
         """
-        self.desiredState = desState
+        self.desSpeed = desState.speed
+        self.desAngleRad = desState.angle.radians()
+
+    def setDesiredSpeedAngle(self, speed, angleRad):
+        """Same as setDesiredState(), but with the state as plain numbers
+
+        Args:
+            speed (float): Commanded wheel speed in meters per second
+            angleRad (float): Commanded azimuth angle in radians
+        """
+        self.desSpeed = speed
+        self.desAngleRad = angleRad
 
 
     def update(self):
@@ -118,18 +141,19 @@ class SwerveModuleControl():
         # Read from the azimuth angle sensor (encoder)
         self.azmthEnc.update()
 
+        curAngleRad = self.azmthEnc.getAngleRad()
+
         # Optimize our incoming swerve command to minimize motion
-        self.optimizedDesiredState = SwerveModuleState.optimize(self.desiredState, 
-                                                                Rotation2d(self.azmthEnc.getAngleRad()))
+        self.optDesSpeed, self.optDesAngleRad = optimizeModuleState(self.desSpeed, self.desAngleRad, curAngleRad)
 
         # Use a PID controller to calculate the voltage for the azimuth motor
-        self.azmthCtrl.setSetpoint(self.optimizedDesiredState.angle.degrees()) # type: ignore
-        azmthVoltage = self.azmthCtrl.calculate(rad2Deg(self.azmthEnc.getAngleRad()))
+        self.azmthCtrl.setSetpoint(rad2Deg(self.optDesAngleRad))
+        azmthVoltage = self.azmthCtrl.calculate(rad2Deg(curAngleRad))
         self.azmthMotor.setVoltage(azmthVoltage)
 
         # Send voltage and speed commands to the wheel motor
         
-        motorDesSpd = dtLinearToMotorRot(self.optimizedDesiredState.speed)
+        motorDesSpd = dtLinearToMotorRot(self.optDesSpeed)
         motorDesAccel = (motorDesSpd - self._prevMotorDesSpeed)/ 0.02
         motorVoltageFF = self.wheelMotorFF.calculate(motorDesSpd, motorDesAccel)
         self.wheelMotor.setVelCmd(motorDesSpd, motorVoltageFF)
@@ -138,11 +162,12 @@ class SwerveModuleControl():
 
         if(wpilib.TimedRobot.isSimulation()):
             # Simulation - assume module is perfect and goes to where we want it to
-            self.actualState = self.optimizedDesiredState
+            self.actSpeed = self.optDesSpeed
+            self.actAngleRad = self.optDesAngleRad
         else:
             # Real Robot
             # Update this module's actual state with measurements from the sensors
-            self.actualState.angle = Rotation2d(self.azmthEnc.getAngleRad())
-            self.actualState.speed = dtMotorRotToLinear(self.wheelMotor.getMotorVelocityRadPerSec())
+            self.actAngleRad = curAngleRad
+            self.actSpeed = dtMotorRotToLinear(self.wheelMotor.getMotorVelocityRadPerSec())
 
         self._updateTelemetry()
@@ -0,0 +1,105 @@
+import array
+import hashlib
+import mmap
+import os
+import struct
+import wpilib
+from pathplannerlib import PathPlanner
+from drivetrain.trajectorySampleTable import TrajectorySampleTable, TRAJ_SAMPLE_PERIOD_S, TRAJ_TABLE_FIELDS
+
+# Bump this whenever the file layout or the resampling changes, so old files get regenerated
+TRAJ_CACHE_VERSION = 2
+TRAJ_CACHE_MAGIC = b"TRAJ"
+
+# magic, version, sample count, padding, sample period, duration.
+# Padded to a multiple of 8 bytes, so the double arrays after it are naturally aligned.
+_HEADER = struct.Struct("<4sII4xdd")
+
+# The RIO's own flash - survives reboots, but not a re-image.
+# In simulation, next to the robot code rather than wherever it was launched from.
+def getTrajectoryCacheDir():
+    if wpilib.RobotBase.isSimulation():
+        return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "simulationLogs", "trajCache"))
+    return "/home/lvuser/trajCache"
+
+def loadTrajectoryTable(pathFile, maxVel, maxAccel, cacheDir=None):
+    """Get the resampled trajectory for a PathPlanner path. Generating a trajectory from the
+    path file is slow, so the result is saved to disk. Later loads just map that file in, as long
+    as the path file and limits haven't changed.
+
+    Args:
+        pathFile (str): absolute path to the PathPlanner path, without the .path extension
+        maxVel (float): velocity limit, meters per second
+        maxAccel (float): acceleration limit, meters per second squared
+        cacheDir (str, optional): where to keep compiled trajectories. Defaults to getTrajectoryCacheDir().
+
+    Returns:
+        TrajectorySampleTable: the trajectory
+    """
+    cacheDir = getTrajectoryCacheDir() if cacheDir is None else cacheDir
+    pathName = os.path.basename(pathFile)
+    cachePath = os.path.join(cacheDir, f"{pathName}_{_cacheKey(pathFile, maxVel, maxAccel)}.traj")
+
+    table = _readCacheFile(cachePath)
+    if table is None:
+        table = TrajectorySampleTable(PathPlanner.loadPath(pathFile, maxVel, maxAccel))
+        _writeCacheFile(cacheDir, cachePath, pathName, table)
+    return table
+
+# Changes whenever anything that goes into the trajectory does
+def _cacheKey(pathFile, maxVel, maxAccel):
+    hasher = hashlib.sha1()
+    with open(pathFile + ".path", "rb") as inFile:
+        hasher.update(inFile.read())
+    hasher.update(struct.pack("<Iddd", TRAJ_CACHE_VERSION, maxVel, maxAccel, TRAJ_SAMPLE_PERIOD_S))
+    return hasher.hexdigest()[:16]
+
+# Map a compiled trajectory in. Each field is a read-only view straight into the file.
+# Returns None if there's no usable file.
+def _readCacheFile(cachePath):
+    try:
+        with open(cachePath, "rb") as inFile:
+            mapped = mmap.mmap(inFile.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, numSamples, periodSec, duration = _HEADER.unpack_from(mapped, 0)
+    except struct.error:
+        mapped.close()
+        return None
+    fieldBytes = numSamples * 8
+    if (magic != TRAJ_CACHE_MAGIC or version != TRAJ_CACHE_VERSION or numSamples < 2
+            or len(mapped) != _HEADER.size + fieldBytes * len(TRAJ_TABLE_FIELDS)):
+        mapped.close()
+        return None
+
+    view = memoryview(mapped)
+    fieldArrays = [view[_HEADER.size + idx * fieldBytes:_HEADER.size + (idx + 1) * fieldBytes].cast('d')
+                   for idx in range(len(TRAJ_TABLE_FIELDS))]
+    table = TrajectorySampleTable.fromArrays(periodSec, duration, fieldArrays)
+    # Keep the file mapped for as long as the table's around
+    table.backingMap = mapped
+    return table
+
+# Write to a temporary file, then move it into place, so a half-written file is never seen.
+# Older compiled versions of the same path are cleaned up. Failures just mean no cache next time.
+def _writeCacheFile(cacheDir, cachePath, pathName, table):
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        tmpPath = cachePath + ".tmp"
+        with open(tmpPath, "wb") as outFile:
+            outFile.write(_HEADER.pack(TRAJ_CACHE_MAGIC, TRAJ_CACHE_VERSION, len(table.x),
+                                       table.periodSec, table.duration))
+            for fieldName in TRAJ_TABLE_FIELDS:
+                outFile.write(array.array('d', getattr(table, fieldName)).tobytes())
+        os.replace(tmpPath, cachePath)
+
+        for fileName in os.listdir(cacheDir):
+            filePath = os.path.join(cacheDir, fileName)
+            isSamePath = (fileName.startswith(pathName + "_") and fileName.endswith(".traj")
+                          and len(fileName) == len(os.path.basename(cachePath)))
+            if isSamePath and filePath != cachePath:
+                os.remove(filePath)
+    except OSError as err:
+        print(f"Warning, could not save compiled trajectory {cachePath}: {err}")
@@ -0,0 +1,138 @@
+import array
+import math
+from wpimath.geometry import Pose2d, Rotation2d
+
+# Time between precomputed samples
+TRAJ_SAMPLE_PERIOD_S = 0.005
+
+# Per-sample values kept by a TrajectorySampleTable, in the order they're stored on disk
+TRAJ_TABLE_FIELDS = ("x", "y", "headingRad", "velocity", "angularVelocity", "xFF", "yFF")
+
+class TrajectorySample():
+    """
+    One point along a trajectory, as plain floats. Field-relative, meters and radians.
+    """
+    def __init__(self):
+        self.time = 0.0
+        self.x = 0.0
+        self.y = 0.0
+        self.headingRad = 0.0 # Which way the robot should face - the holonomic rotation
+        self.velocity = 0.0
+        self.angularVelocity = 0.0
+        # Feed-forward velocities for the trajectory controller, already split into x and y
+        self.xFF = 0.0
+        self.yFF = 0.0
+
+    def getPose(self):
+        return Pose2d(self.x, self.y, Rotation2d(self.headingRad))
+
+class TrajectorySampleTable():
+    """
+    A trajectory resampled once, up front, at evenly spaced times.
+    Sampling at run time is then just an index calculation and a linear interpolation between
+    two neighboring entries - no searching, so it costs the same no matter how long the path is.
+    """
+    def __init__(self, path, periodSec=TRAJ_SAMPLE_PERIOD_S):
+        """
+        Args:
+            path (PathPlannerTrajectory): trajectory to resample
+            periodSec (float, optional): time between samples. Defaults to TRAJ_SAMPLE_PERIOD_S.
+        """
+        self.periodSec = periodSec
+        self.duration = 0.0
+        # The last sample lands right on the end of the trajectory, so the last interval may be shorter
+        self.lastIdx = 0
+        self.lastIntervalSec = 0.0
+        self.x = array.array('d')
+        self.y = array.array('d')
+        self.headingRad = array.array('d')
+        self.velocity = array.array('d')
+        self.angularVelocity = array.array('d')
+        self.xFF = array.array('d')
+        self.yFF = array.array('d')
+
+        # Handed back from every sample() call, rather than making a new one each loop
+        self.curSample = TrajectorySample()
+
+        # File the arrays are mapped from, when loaded from the trajectory cache
+        self.backingMap = None
+
+        if path is not None:
+            self._resample(path)
+
+    def _resample(self, path):
+        self.duration = path.getTotalTime()
+        numSamples = max(2, int(math.ceil(self.duration / self.periodSec)) + 1)
+
+        prevHeading = None
+        for idx in range(numSamples):
+            state = path.sample(min(idx * self.periodSec, self.duration))
+            travelDir = state.pose.rotation()
+            heading = state.holonomicRotation.radians()
+            # Keep heading continuous, so interpolating between samples never goes the long way around
+            if prevHeading is not None:
+                heading = prevHeading + math.remainder(heading - prevHeading, math.tau)
+            prevHeading = heading
+
+            self.x.append(state.pose.X())
+            self.y.append(state.pose.Y())
+            self.headingRad.append(heading)
+            self.velocity.append(state.velocity)
+            self.angularVelocity.append(state.holonomicAngularVelocity)
+            self.xFF.append(state.velocity * travelDir.cos())
+            self.yFF.append(state.velocity * travelDir.sin())
+
+        self.lastIdx = numSamples - 2
+        self.lastIntervalSec = self.duration - self.lastIdx * self.periodSec
+
+    @classmethod
+    def fromArrays(cls, periodSec, duration, fieldArrays):
+        """Make a table straight from already-resampled values, ie, loaded from a cache file
+
+        Args:
+            periodSec (float): time between samples
+            duration (float): total time of the trajectory
+            fieldArrays (list): one sequence of floats per entry in TRAJ_TABLE_FIELDS, all the same length.
+                Anything indexable works - array.array, or a memoryview into a file.
+        """
+        table = cls(None, periodSec)
+        table.duration = duration
+        for fieldName, values in zip(TRAJ_TABLE_FIELDS, fieldArrays):
+            setattr(table, fieldName, values)
+        table.lastIdx = len(table.x) - 2
+        table.lastIntervalSec = duration - table.lastIdx * periodSec
+        return table
+
+    def getTotalTime(self):
+        return self.duration
+
+    def getInitialPose(self):
+        return Pose2d(self.x[0], self.y[0], Rotation2d(self.headingRad[0]))
+
+    def sample(self, time):
+        """Trajectory state at a given time. Times before the start or after the end are held
+        at the first or last sample.
+
+        Returns:
+            TrajectorySample: the state. This same object is reused by the next call.
+        """
+        time = min(max(time, 0.0), self.duration)
+        pos = time / self.periodSec
+        idx = int(pos)
+        if idx >= self.lastIdx:
+            idx = self.lastIdx
+            frac = (time - idx * self.periodSec) / self.lastIntervalSec if self.lastIntervalSec > 0.0 else 1.0
+        else:
+            frac = pos - idx
+        nxt = idx + 1
+
+        out = self.curSample
+        out.time = time
+        out.x = self.x[idx] + (self.x[nxt] - self.x[idx]) * frac
+        out.y = self.y[idx] + (self.y[nxt] - self.y[idx]) * frac
+        out.headingRad = self.headingRad[idx] + (self.headingRad[nxt] - self.headingRad[idx]) * frac
+        out.velocity = self.velocity[idx] + (self.velocity[nxt] - self.velocity[idx]) * frac
+        out.angularVelocity = self.angularVelocity[idx] + (self.angularVelocity[nxt] - self.angularVelocity[idx]) * frac
+        out.xFF = self.xFF[idx] + (self.xFF[nxt] - self.xFF[idx]) * frac
+        out.yFF = self.yFF[idx] + (self.yFF[nxt] - self.yFF[idx]) * frac
+        return out
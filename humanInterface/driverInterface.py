@@ -7,7 +7,7 @@ from drivetrain.drivetrainPhysical import MAX_ROTATE_SPEED_RAD_PER_SEC
 from drivetrain.drivetrainPhysical import MAX_ROTATE_ACCEL_RAD_PER_SEC_2
 from drivetrain.drivetrainPhysical import MAX_TRANSLATE_ACCEL_MPS2
 from utils.faults import Fault
-from utils.signalLogging import log
+from utils.signalLogging import Signal, BooleanSignal
 
 
 
@@ -28,6 +28,11 @@ class DriverInterface():
         self.velYSlewRateLimiter = SlewRateLimiter(rateLimit=MAX_TRANSLATE_ACCEL_MPS2)
         self.velTSlewRateLimiter = SlewRateLimiter(rateLimit=MAX_ROTATE_ACCEL_RAD_PER_SEC_2)
 
+        self.fwdRevCmdSig = Signal("DI FwdRev Cmd", "mps")
+        self.strafeCmdSig = Signal("DI Strafe Cmd", "mps")
+        self.rotateCmdSig = Signal("DI Rotate Cmd", "radPerSec")
+        self.connectedSig = BooleanSignal("DI connected")
+
     def update(self):
         """Main update - call this once every 20ms
         """
@@ -72,10 +77,10 @@ class DriverInterface():
             self.gyroResetCmd = False
             self.connectedFault.setFaulted()
 
-        log("DI FwdRev Cmd", self.velXCmd, "mps")
-        log("DI Strafe Cmd", self.velYCmd, "mps")
-        log("DI Rotate Cmd", self.velTCmd, "radPerSec")
-        log("DI connected", self.ctrl.isConnected(), "bool")
+        self.fwdRevCmdSig.set(self.velXCmd)
+        self.strafeCmdSig.set(self.velYCmd)
+        self.rotateCmdSig.set(self.velTCmd)
+        self.connectedSig.set(self.ctrl.isConnected())
 
     def getVxCmd(self):
         """
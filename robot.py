@@ -3,6 +3,7 @@ import wpilib
 from Autonomous.modes.drivePathTest1 import DrivePathTest1
 from robotConfig import webserverConstructorOrNone
 from robotConfig import dashboardOrNone
+from robotConfig import BACKGROUND_SIGNAL_PUBLISH
 from humanInterface.driverInterface import DriverInterface
 from drivetrain.drivetrainControl import DrivetrainControl
 from utils.segmentTimeTracker import SegmentTimeTracker
@@ -11,7 +12,10 @@ from utils.calibration import CalibrationWrangler
 from utils.faults import FaultWrangler
 from utils.crashLogger import CrashLogger
 from utils.rioMonitor import RIOMonitor
+from utils.profiler import profile
+from utils.gcManager import GcManager
 from utils.singleton import destroyAllSingletonInstances
+from wrappers.wrapperedSparkMax import SparkMaxWrangler
 from AutoSequencerV2.autoSequencer import AutoSequencer
 
 class MyRobot(wpilib.TimedRobot):
@@ -27,6 +31,8 @@ class MyRobot(wpilib.TimedRobot):
         wpilib.LiveWindow.disableAllTelemetry()
         self.webserver = webserverConstructorOrNone()
 
+        # Has to happen before any calibrations are created, so they pick up their saved values
+        CalibrationWrangler().loadStore()
 
         self.driveTrain = DrivetrainControl()
                 
@@ -35,12 +41,19 @@ class MyRobot(wpilib.TimedRobot):
         self.dInt = DriverInterface()
 
         self.autoSequencer = AutoSequencer()
-        self.autoSequencer.addMode(DrivePathTest1())
+        self.autoSequencer.addModeFactory("Drive Path Test 1", DrivePathTest1)
 
         self.dashboard = dashboardOrNone()
 
         self.rioMonitor = RIOMonitor()
 
+        # Optionally move NT and log file writes off of the main loop
+        if BACKGROUND_SIGNAL_PUBLISH:
+            SignalWrangler().startBackgroundPublish()
+
+        # Everything made so far lives for the whole run - keep the garbage collector from re-checking it
+        GcManager().freezeAfterInit()
+
         
         # Uncomment this and simulate to update the code 
         # dependencies graph
@@ -51,16 +64,30 @@ class MyRobot(wpilib.TimedRobot):
     def robotPeriodic(self):
         self.stt.start()
         self.crashLogger.update()
+
+        # Read all motor sensors once, up front, for everything else in the loop to use
+        with profile("SparkMaxSnapshot"):
+            SparkMaxWrangler().snapshotAll()
         
         if(self.dInt.getGyroResetCmd()):
             self.driveTrain.resetGyro()
         
-        self.driveTrain.update()
+        with profile("Drivetrain"):
+            self.driveTrain.update()
         
-        SignalWrangler().publishPeriodic()
-        CalibrationWrangler().update()
-        FaultWrangler().update()
+        with profile("SignalWrangler"):
+            SignalWrangler().publishPeriodic()
+        with profile("CalibrationWrangler"):
+            CalibrationWrangler().update()
+        with profile("FaultWrangler"):
+            FaultWrangler().update()
         self.stt.end()
+
+        # Garbage collection only happens here, in whatever time is left over, while enabled
+        GcManager().update(self.stt.curLoopExecDur, wpilib.DriverStation.isEnabled())
+
+        if self.webserver is not None:
+            self.webserver.updateThrottle(self.stt.curLoopExecDur, self.stt.longLoopThresh)
         
     #########################################################
     ## Autonomous-Specific init and update
@@ -72,7 +99,8 @@ class MyRobot(wpilib.TimedRobot):
         self.driveTrain.poseEst.setKnownPose(self.autoSequencer.getStartingPose())
         
     def autonomousPeriodic(self):
-        self.autoSequencer.update()
+        with profile("AutoSequencer"):
+            self.autoSequencer.update()
 
     def autonomousExit(self):
         self.autoSequencer.end()
@@ -83,11 +111,12 @@ class MyRobot(wpilib.TimedRobot):
         pass
         
     def teleopPeriodic(self):
-        self.dInt.update()
-        self.driveTrain.setCmdFieldRelative(
-            self.dInt.getVxCmd(),
-            self.dInt.getVyCmd(),
-            self.dInt.getVtCmd())
+        with profile("DriverInterface"):
+            self.dInt.update()
+            self.driveTrain.setCmdFieldRelative(
+                self.dInt.getVxCmd(),
+                self.dInt.getVyCmd(),
+                self.dInt.getVtCmd())
     
     
     #########################################################
@@ -106,6 +135,9 @@ class MyRobot(wpilib.TimedRobot):
     ## Cleanup
     def endCompetition(self):
         self.rioMonitor.stopThreads()
+        SignalWrangler().stopBackgroundPublish()
+        GcManager().restoreAutomatic()
+        CalibrationWrangler().flushStore()
         destroyAllSingletonInstances()
         super().endCompetition()
 
@@ -1,6 +1,10 @@
 from webserver.webserver import Webserver
 from dashboard import Dashboard
 
+# Set True to do NT and log file writes on their own thread, rather than in the main loop.
+# See docs/userAPI/signal.md
+BACKGROUND_SIGNAL_PUBLISH = False
+
 # pylint: disable=R0801
 
 def webserverConstructorOrNone():
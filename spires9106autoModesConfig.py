@@ -19,6 +19,6 @@ def makeMainModeList():
     # We are putting the autonomous main mode list on the SmartDashboard
     mainModeList = SmartDashboardModeList("Main")
     mainModeList.addMode(DoNothingMode())
-    mainModeList.addMode(DrivePathTest1())
+    mainModeList.addModeFactory("Drive Path Test 1", DrivePathTest1)
     mainModeList.listIsComplete()
     return mainModeList
\ No newline at end of file
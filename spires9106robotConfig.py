@@ -2,6 +2,10 @@ from utils.singleton import Singleton
 
 # pylint: disable=R0801
 
+# Set True to do NT and log file writes on their own thread, rather than in the main loop.
+# See docs/userAPI/signal.md
+BACKGROUND_SIGNAL_PUBLISH = False
+
 class DisabledWebserver(metaclass=Singleton):
 
     def __init__(self):
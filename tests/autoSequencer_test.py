@@ -2,6 +2,7 @@
 from AutoSequencerV2.autoSequencer import *
 from AutoSequencerV2.command import Command
 from AutoSequencerV2.mode import Mode
+from AutoSequencerV2.lazyMode import LazyMode, ModePreparer
 from AutoSequencerV2.parallelCommandGroup import ParallelCommandGroup
 from AutoSequencerV2.raceCommandGroup import RaceCommandGroup
 
@@ -28,6 +29,76 @@ def test_topLevel():
     dut.update()
     dut.end()
 
+class SlowMode(Mode):
+    def __init__(self):
+        Mode.__init__(self, "Slow Mode")
+        self.prepareCount = 0
+    def prepare(self):
+        self.prepareCount += 1
+    def getCmdGroup(self):
+        return SequentialCommandGroup([CountingCommand()])
+
+def test_lazyModeBuiltOnlyWhenUsed():
+    built = []
+    def factory():
+        built.append(SlowMode())
+        return built[-1]
+
+    dut = LazyMode("Slow Mode", factory)
+    assert dut.getName() == "Slow Mode"
+    assert len(built) == 0
+
+    dut.prepare()
+    dut.prepare()
+    assert len(built) == 1
+    assert built[0].prepareCount == 1
+    assert isinstance(dut.getCmdGroup(), SequentialCommandGroup)
+
+def test_preparerBackgroundAndFallback():
+    preparer = ModePreparer()
+    bgMode = SlowMode()
+    preparer.request(bgMode)
+    preparer.thread.join()
+    assert preparer.isReady(bgMode)
+    assert bgMode.prepareCount == 1
+
+    # Never requested - prepared right away when asked
+    fgMode = SlowMode()
+    assert not preparer.isReady(fgMode)
+    preparer.prepareNow(fgMode)
+    assert preparer.isReady(fgMode)
+    preparer.prepareNow(fgMode)
+    assert fgMode.prepareCount == 1
+
+class FailingMode(SlowMode):
+    def __init__(self):
+        SlowMode.__init__(self)
+        self.shouldFail = True
+    def prepare(self):
+        SlowMode.prepare(self)
+        if self.shouldFail:
+            raise RuntimeError("Test prepare failure")
+
+def test_preparerFailedNotRetriedInBackground():
+    preparer = ModePreparer()
+    mode = FailingMode()
+    preparer.request(mode)
+    preparer.thread.join()
+    assert mode in preparer.failed
+    assert not preparer.isReady(mode)
+
+    # Asking again doesn't start another background attempt
+    preparer.request(mode)
+    preparer.thread.join()
+    assert mode.prepareCount == 1
+
+    # Left for prepareNow(), when autonomous starts
+    mode.shouldFail = False
+    preparer.prepareNow(mode)
+    assert preparer.isReady(mode)
+    assert mode not in preparer.failed
+    assert mode.prepareCount == 2
+
 def test_parallel():
 
     dut = CountingCommand().alongWith(CountingCommand().alongWith(CountingCommand()))
@@ -0,0 +1,84 @@
+# pylint: disable-all
+import json
+import ntcore as nt
+import pytest
+from utils.calibration import Calibration, CalibrationWrangler
+from utils.calibrationStore import STORE_VERSION
+from utils.singleton import destroyAllSingletonInstances
+
+def test_eventDrivenUpdate():
+    cal = Calibration("Test Event Cal", default=1.0, minVal=0.0, maxVal=10.0)
+    table = nt.NetworkTableInstance.getDefault().getTable("Calibrations")
+    desPub = table.getDoubleTopic("Test Event Cal/desValue").publish()
+    curSub = table.getDoubleTopic("Test Event Cal/curValue").subscribe(-1.0)
+
+    CalibrationWrangler().update()
+    assert not cal.isChanged()
+    assert curSub.get() == 1.0
+
+    desPub.set(4.5)
+    CalibrationWrangler().update()
+    assert cal.isChanged()
+    assert cal.curValTopic.getProperty("pending") == True
+    # Nothing else happened, so nothing should need publishing
+    assert not CalibrationWrangler().dirtyCals
+
+    assert cal.get() == 4.5
+    assert not cal.isChanged()
+    CalibrationWrangler().update()
+    assert curSub.get() == 4.5
+    assert cal.curValTopic.getProperty("pending") == False
+
+    desPub.close()
+    curSub.close()
+    destroyAllSingletonInstances()
+
+def test_persistentStore(tmp_path):
+    storePath = str(tmp_path / "cals.json")
+    CalibrationWrangler().loadStore(storePath)
+    cal = Calibration("Test Stored Cal", default=2.0)
+    other = Calibration("Test Untouched Cal", default=3.0)
+
+    unknown = CalibrationWrangler().importSnapshot({"version": STORE_VERSION,
+                                                    "values": {"Test Stored Cal": 7.25, "Not A Cal": 1.0}})
+    assert unknown == ["Not A Cal"]
+    CalibrationWrangler().update()
+    assert cal.get() == 7.25
+    CalibrationWrangler().flushStore()
+
+    with open(storePath) as storeFile:
+        contents = json.load(storeFile)
+    # Only values tuned away from their defaults are kept
+    assert contents["values"] == {"Test Stored Cal": 7.25}
+
+    # After a "reboot", the tuned value comes back without anyone touching it
+    destroyAllSingletonInstances()
+    CalibrationWrangler().loadStore(storePath)
+    cal = Calibration("Test Stored Cal", default=2.0)
+    assert cal.get() == 7.25
+    assert not cal.isChanged()
+    destroyAllSingletonInstances()
+
+def test_importIsAllOrNothing():
+    cal = Calibration("Test Import Cal A", default=1.0)
+    other = Calibration("Test Import Cal B", default=2.0)
+
+    # The bad value comes after a good one, so a partial import would have queued the first
+    with pytest.raises(ValueError):
+        CalibrationWrangler().importSnapshot({"version": STORE_VERSION,
+                                              "values": {"Test Import Cal A": 5.0, "Test Import Cal B": "oops"}})
+    CalibrationWrangler().update()
+    assert cal.get() == 1.0
+    assert other.get() == 2.0
+    destroyAllSingletonInstances()
+
+def test_importRejectsOtherVersion():
+    cal = Calibration("Test Import Cal", default=1.0)
+
+    with pytest.raises(ValueError):
+        CalibrationWrangler().importSnapshot({"version": STORE_VERSION + 1, "values": {"Test Import Cal": 5.0}})
+    with pytest.raises(ValueError):
+        CalibrationWrangler().importSnapshot({"values": {"Test Import Cal": 5.0}})
+    CalibrationWrangler().update()
+    assert cal.get() == 1.0
+    destroyAllSingletonInstances()
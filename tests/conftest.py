@@ -0,0 +1,25 @@
+# pylint: disable-all
+import os
+import pytest
+import utils.calibration
+import drivetrain.trajectoryCache
+
+# Timing comparisons are too noisy to pass or fail on, so tests marked @pytest.mark.benchmark
+# are skipped unless asked for, and should just print their numbers. To run them:
+#   RUN_BENCHMARKS=1 python robot.py test -- -s -m benchmark
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing comparison, skipped unless RUN_BENCHMARKS is set")
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("RUN_BENCHMARKS"):
+        return
+    skipBenchmark = pytest.mark.skip(reason="benchmark - set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if item.get_closest_marker("benchmark") is not None:
+            item.add_marker(skipBenchmark)
+
+# Keep files the code saves in simulation out of the source tree
+@pytest.fixture(autouse=True)
+def simFilesInTmpPath(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.calibration, "defaultStorePath", lambda: str(tmp_path / "calibrations.json"))
+    monkeypatch.setattr(drivetrain.trajectoryCache, "getTrajectoryCacheDir", lambda: str(tmp_path / "trajCache"))
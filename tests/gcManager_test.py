@@ -0,0 +1,69 @@
+# pylint: disable-all
+import gc
+import pytest
+import utils.gcManager
+from utils.gcManager import GcManager, MIN_SLACK_S, FORCE_COLLECT_FACTOR
+from utils.singleton import destroyAllSingletonInstances
+
+# Stands in for the gc module, so tests can pick the counts and see what got collected
+class FakeGc():
+    def __init__(self, counts, thresholds=(700, 10, 10)):
+        self.counts = counts
+        self.thresholds = thresholds
+        self.collected = []
+
+    def get_count(self):
+        return self.counts
+
+    def get_threshold(self):
+        return self.thresholds
+
+    def collect(self, gen=2):
+        self.collected.append(gen)
+
+@pytest.fixture
+def gcMgr():
+    destroyAllSingletonInstances()
+    mgr = GcManager()
+    yield mgr
+    # Straight to the real gc module - monkeypatch may not have put it back yet
+    gc.unfreeze()
+    gc.enable()
+    destroyAllSingletonInstances()
+
+def test_collectsOldestDueGeneration(gcMgr, monkeypatch):
+    fake = FakeGc((800, 12, 3))
+    monkeypatch.setattr(utils.gcManager, "gc", fake)
+    gcMgr._collectInSlack(MIN_SLACK_S[1])
+    assert fake.collected == [1]
+
+def test_skipsGenerationWithoutSlack(gcMgr, monkeypatch):
+    # Gen 2 is due, but there's only time for gen 0
+    fake = FakeGc((800, 3, 12))
+    monkeypatch.setattr(utils.gcManager, "gc", fake)
+    gcMgr._collectInSlack(MIN_SLACK_S[0])
+    assert fake.collected == [0]
+
+def test_nothingDue(gcMgr, monkeypatch):
+    fake = FakeGc((100, 3, 3))
+    monkeypatch.setattr(utils.gcManager, "gc", fake)
+    gcMgr._collectInSlack(1.0)
+    assert fake.collected == []
+
+def test_forcedWithoutSlack(gcMgr, monkeypatch):
+    fake = FakeGc((700 * FORCE_COLLECT_FACTOR, 3, 3))
+    monkeypatch.setattr(utils.gcManager, "gc", fake)
+    gcMgr._collectInSlack(0.0)
+    assert fake.collected == [0]
+
+def test_restoreAutomatic(gcMgr):
+    gcMgr.freezeAfterInit()
+    assert gc.get_freeze_count() > 0
+    gcMgr.update(0.001, True)
+    assert not gc.isenabled()
+    assert gcMgr.manualMode
+
+    gcMgr.restoreAutomatic()
+    assert gc.isenabled()
+    assert not gcMgr.manualMode
+    assert gc.get_freeze_count() == 0
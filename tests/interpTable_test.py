@@ -0,0 +1,59 @@
+# pylint: disable-all
+import itertools
+import pytest
+from utils.interpTable import InterpTable, CalibratedInterpTable
+from utils.calibration import CalibrationWrangler
+from utils.singleton import destroyAllSingletonInstances
+
+def _plane(x, y, z=0.0):
+    return 2.0 * x - 3.0 * y + 0.5 * z + 1.0
+
+def test_bilinearExactOnPlane():
+    xs = [0.0, 1.0, 4.0]
+    ys = [-2.0, 0.0, 5.0, 6.0]
+    mut = InterpTable([xs, ys], [[_plane(x, y) for y in ys] for x in xs])
+    # Anything linear in each input is reproduced exactly, including at grid points
+    for x in [0.0, 0.3, 1.0, 2.5, 4.0]:
+        for y in [-2.0, -1.1, 0.0, 5.5, 6.0]:
+            assert mut.lookup(x, y) == pytest.approx(_plane(x, y))
+    # Held at the edges
+    assert mut.lookup(-5.0, 10.0) == pytest.approx(_plane(0.0, 6.0))
+
+def test_trilinearAndBatch():
+    axes = [[0.0, 1.0, 2.0], [0.0, 2.0], [-1.0, 1.0, 3.0]]
+    values = [[[_plane(x, y, z) for z in axes[2]] for y in axes[1]] for x in axes[0]]
+    mut = InterpTable(axes, values)
+    points = list(itertools.product([-0.5, 0.25, 1.5, 2.5], [0.1, 1.9], [-2.0, 0.0, 2.2]))
+    batch = mut.lookupMany(points)
+    for point, result in zip(points, batch):
+        assert result == pytest.approx(mut.lookup(*point))
+
+def test_singlePointAxis():
+    mut = InterpTable([[0.0, 10.0], [3.0]], [[1.0], [2.0]])
+    assert mut.lookup(5.0, 100.0) == pytest.approx(1.5)
+    assert mut.lookupMany([[5.0, 100.0]])[0] == pytest.approx(1.5)
+
+def test_badShape():
+    with pytest.raises(ValueError):
+        InterpTable([[0.0, 1.0], [0.0, 1.0]], [[1.0, 2.0]])
+    with pytest.raises(ValueError):
+        InterpTable([[1.0, 0.0]], [1.0, 2.0])
+
+def test_wrongInputCount():
+    mut = InterpTable([[0.0, 1.0], [0.0, 1.0]], [[1.0, 2.0], [3.0, 4.0]])
+    with pytest.raises(ValueError):
+        mut.lookup(0.5)
+    with pytest.raises(ValueError):
+        mut.lookup(0.5, 0.5, 0.5)
+    with pytest.raises(ValueError):
+        mut.lookupMany([[0.5, 0.5, 0.5]])
+
+def test_calibratedCellUpdate():
+    mut = CalibratedInterpTable("Test Shooter Speed", [[1.0, 2.0], [0.0, 10.0]], [[1.0, 2.0], [3.0, 4.0]])
+    assert mut.lookup(1.5, 5.0) == pytest.approx(2.5)
+    cal = mut.cals[3]
+    assert cal.name == "Test Shooter Speed @ (2, 10)"
+    cal.set(8.0)
+    assert mut.lookup(2.0, 10.0) == pytest.approx(8.0)
+    assert mut.lookupMany([[1.5, 5.0]])[0] == pytest.approx(3.5)
+    destroyAllSingletonInstances()
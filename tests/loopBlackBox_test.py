@@ -0,0 +1,100 @@
+# pylint: disable-all
+import gc
+import json
+import pytest
+from utils.loopBlackBox import LoopHistogram, LoopBlackBox, getGcEventRecorder
+from utils.loopBlackBox import BLACK_BOX_LOOPS, BLACK_BOX_GC_EVENTS, MIN_DUMP_INTERVAL_S, MAX_DUMPS
+from utils.extDriveManager import ExtDriveManager
+from utils.singleton import destroyAllSingletonInstances
+
+def test_histogramBins():
+    hist = LoopHistogram(binWidthMs=1.0, numBins=5)
+    hist.add(0.2)
+    hist.add(2.7)
+    hist.add(2.1)
+    hist.add(40.0) # Past the end, lands in the last bin
+    hist.add(-1.0) # Clock weirdness shouldn't crash, lands in the first bin
+    assert hist.getCounts() == [2, 0, 2, 0, 1]
+
+# Records loops numbered 0..count-1, each with one section taking idx ms
+def _recordLoops(blackBox, count):
+    for idx in range(count):
+        blackBox.record(float(idx), 0.02, 0.01, [("Loop/Work", idx / 1000.0)])
+
+@pytest.fixture
+def blackBox(tmp_path):
+    destroyAllSingletonInstances()
+    ExtDriveManager().logDir = str(tmp_path)
+    yield LoopBlackBox()
+    destroyAllSingletonInstances()
+
+def _dumpFiles(tmp_path):
+    return sorted(tmp_path.glob("overrun_*.json"))
+
+def _dumpAndRead(blackBox, tmp_path, overrunCount):
+    blackBox.dumpOnOverrun(overrunCount)
+    blackBox.dumpThread.join()
+    with open(_dumpFiles(tmp_path)[-1], encoding="utf-8") as inFile:
+        return json.load(inFile)
+
+def test_ringOrderBeforeWrap(blackBox, tmp_path):
+    _recordLoops(blackBox, 3)
+    dump = _dumpAndRead(blackBox, tmp_path, 1)
+    assert [loop['time'] for loop in dump['loops']] == [0.0, 1.0, 2.0]
+
+def test_ringWrapsOldestFirst(blackBox, tmp_path):
+    _recordLoops(blackBox, BLACK_BOX_LOOPS + 7)
+    dump = _dumpAndRead(blackBox, tmp_path, 1)
+    times = [loop['time'] for loop in dump['loops']]
+    assert len(times) == BLACK_BOX_LOOPS
+    assert times == [float(idx) for idx in range(7, BLACK_BOX_LOOPS + 7)]
+
+def test_dumpContents(blackBox, tmp_path):
+    _recordLoops(blackBox, 5)
+    gc.collect()
+    dump = _dumpAndRead(blackBox, tmp_path, 3)
+    assert dump['overrunCount'] == 3
+    assert "_3.json" in _dumpFiles(tmp_path)[-1].name
+    lastLoop = dump['loops'][-1]
+    assert lastLoop['periodMs'] == pytest.approx(20.0)
+    assert lastLoop['durationMs'] == pytest.approx(10.0)
+    assert lastLoop['sectionsMs'] == {"Loop/Work": pytest.approx(4.0)}
+    # The collection above shows up, with how long it took
+    assert dump['gcEvents']
+    assert dump['gcEvents'][-1]['generation'] == 2
+    assert dump['gcEvents'][-1]['durationMs'] >= 0.0
+    assert sum(dump['durationHist']) == 5
+
+def test_gcEventRecorderCapture():
+    recorder = getGcEventRecorder()
+    before = len(recorder.getEvents())
+    gc.collect(1)
+    events = recorder.getEvents()
+    assert len(events) == min(before + 1, BLACK_BOX_GC_EVENTS)
+    fpgaTime, generation, collected, duration = events[-1]
+    assert generation == 1
+    assert collected >= 0
+    assert duration >= 0.0
+
+def test_dumpRateLimited(blackBox, tmp_path):
+    _recordLoops(blackBox, 2)
+    blackBox.dumpOnOverrun(1)
+    blackBox.dumpThread.join()
+    # Too soon after the last one
+    blackBox.dumpOnOverrun(2)
+    blackBox.dumpThread.join()
+    assert len(_dumpFiles(tmp_path)) == 1
+
+    blackBox.lastDumpTime -= MIN_DUMP_INTERVAL_S
+    blackBox.dumpOnOverrun(3)
+    blackBox.dumpThread.join()
+    assert len(_dumpFiles(tmp_path)) == 2
+
+def test_maxDumps(blackBox, tmp_path):
+    _recordLoops(blackBox, 2)
+    for overrunCount in range(MAX_DUMPS + 5):
+        blackBox.lastDumpTime = None
+        blackBox.dumpOnOverrun(overrunCount)
+        blackBox.dumpThread.join()
+    assert blackBox.dumpCount == MAX_DUMPS
+    assert len(_dumpFiles(tmp_path)) == MAX_DUMPS
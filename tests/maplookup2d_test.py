@@ -1,5 +1,6 @@
 # pylint: disable-all
-
+import time
+import pytest
 
 from utils.mapLookup2d import MapLookup2D
 
@@ -43,3 +44,77 @@ def test_onpoints():
     assert mut.lookup(9) == 0
     assert mut.lookup(9.1) == 0
 
+
+def test_callerListUntouched():
+    points = [(5,1), (1,2), (3,3)]
+    mut = MapLookup2D(points)
+    assert points == [(5,1), (1,2), (3,3)]
+    assert mut.lookup(2) == 2.5
+
+def test_hintMatchesSearch():
+    mut = MapLookup2D([(x, (x * 7) % 5) for x in range(0, 50, 2)])
+    # Slow sweep up and down (hits the hint), then big jumps (misses it)
+    sweep = [x * 0.1 for x in range(-10, 510)]
+    jumps = [((x * 37) % 53) - 1.5 for x in range(200)]
+    for xval in sweep + sweep[::-1] + jumps:
+        # A fresh map has no useful hint, so always searches
+        fresh = MapLookup2D(mut.points)
+        assert abs(mut.lookup(xval) - fresh.lookup(xval)) < 1e-12
+
+def test_lookupMany():
+    mut = MapLookup2D([(1,4), (3,2), (5,2), (6,3), (9,0)])
+    xvals = [x * 0.25 for x in range(-4, 44)]
+    results = mut.lookupMany(xvals)
+    for xval, result in zip(xvals, results):
+        assert abs(result - mut.lookup(xval)) < 1e-12
+    assert list(MapLookup2D([]).lookupMany([1.0, 2.0])) == [0, 0]
+
+# The original linear-scan implementation, kept here to check and benchmark against
+class _LegacyMapLookup2D():
+    def __init__(self, points):
+        self.points = sorted(points, key=lambda pt: pt[0])
+
+    def lookup(self, xval):
+        if xval < self.points[0][0]:
+            return self.points[0][1]
+        elif xval > self.points[-1][0]:
+            return self.points[-1][1]
+        lowerIndex = 0
+        for indexIter in range(0, len(self.points) - 1):
+            if self.points[indexIter][0] <= xval <= self.points[indexIter + 1][0]:
+                lowerIndex = indexIter
+                break
+        intervalXDelta = self.points[lowerIndex + 1][0] - self.points[lowerIndex][0]
+        intervalYDelta = self.points[lowerIndex + 1][1] - self.points[lowerIndex][1]
+        return ((xval - self.points[lowerIndex][0]) / intervalXDelta) * intervalYDelta + self.points[lowerIndex][1]
+
+def test_matchesLinearScan():
+    points = [(x, x * x) for x in range(30)]
+    legacy = _LegacyMapLookup2D(points)
+    mut = MapLookup2D(points)
+    for xval in [x * 0.01 for x in range(-100, 3100)]:
+        assert abs(mut.lookup(xval) - legacy.lookup(xval)) < 1e-9
+
+@pytest.mark.benchmark
+def test_benchmark():
+    points = [(x, x * x) for x in range(30)]
+    legacy = _LegacyMapLookup2D(points)
+    mut = MapLookup2D(points)
+    xvals = [x * 0.01 for x in range(3000)]
+
+    startTime = time.perf_counter()
+    for xval in xvals:
+        legacy.lookup(xval)
+    legacyTime = (time.perf_counter() - startTime) / len(xvals)
+
+    startTime = time.perf_counter()
+    for xval in xvals:
+        mut.lookup(xval)
+    fastTime = (time.perf_counter() - startTime) / len(xvals)
+
+    startTime = time.perf_counter()
+    mut.lookupMany(xvals)
+    manyTime = (time.perf_counter() - startTime) / len(xvals)
+
+    print(f"MapLookup2D per lookup: linear scan {legacyTime*1e6:.2f}us, indexed {fastTime*1e6:.2f}us, "
+          f"lookupMany {manyTime*1e6:.3f}us")
@@ -0,0 +1,55 @@
+# pylint: disable-all
+import time
+from utils.profiler import LoopProfiler, profile, profiled, PROFILE_STATS_PERIOD_LOOPS
+from utils.singleton import destroyAllSingletonInstances
+
+@profiled("Work")
+def _doWork():
+    with profile("Inner"):
+        time.sleep(0.001)
+
+def test_nestedSections():
+    destroyAllSingletonInstances()
+
+    for _ in range(PROFILE_STATS_PERIOD_LOOPS):
+        with profile("Outer"):
+            _doWork()
+            _doWork()
+        LoopProfiler().endLoop()
+
+    root = LoopProfiler().getBreakdown()
+    assert root['name'] == "Loop"
+
+    outer = root['children'][0]
+    assert outer['name'] == "Outer"
+    work = outer['children'][0]
+    assert work['name'] == "Work"
+    assert work['children'][0]['name'] == "Inner"
+
+    # Both calls in a loop count towards that loop's total
+    assert work['min'] >= 2.0
+    assert outer['max'] >= work['max']
+    assert work['min'] <= work['mean'] <= work['p99'] <= work['max']
+    assert root['min'] >= outer['min']
+
+    destroyAllSingletonInstances()
+
+def test_rootCoversSectionsBeforeLoopStart():
+    destroyAllSingletonInstances()
+
+    for _ in range(PROFILE_STATS_PERIOD_LOOPS):
+        # Like teleopPeriodic(), which runs before robotPeriodic() starts the loop
+        with profile("Mode"):
+            time.sleep(0.002)
+        LoopProfiler().startLoop()
+        with profile("Periodic"):
+            time.sleep(0.001)
+        LoopProfiler().endLoop()
+
+    root = LoopProfiler().getBreakdown()
+    mode, periodic = root['children']
+    # Every loop's root time covers both of its children
+    assert root['min'] >= mode['min'] + periodic['min']
+    assert root['mean'] >= mode['mean'] + periodic['mean']
+
+    destroyAllSingletonInstances()
@@ -0,0 +1,184 @@
+# pylint: disable-all
+import threading
+import time
+import pytest
+from utils.signalLogging import SignalWrangler, Signal, BooleanSignal, IntegerSignal, DoubleArraySignal
+from utils.singleton import destroyAllSingletonInstances
+
+# Stands in for a signal's NT publisher, so tests can see what the writer thread wrote
+class RecordingPub():
+    def __init__(self, blocked=False):
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+        self.values = []
+    def set(self, value, time):
+        self.release.wait()
+        self.values.append(value)
+
+class FailingPub():
+    def set(self, value, time):
+        raise RuntimeError("NT went away")
+
+def _makeSig(name, pub):
+    sig = Signal(name)
+    sig.pub = pub
+    sig.logEntry = None
+    return sig
+
+# Wait until the writer has handed back every buffer
+def _waitForWriter(wrangler, numBufs):
+    deadline = time.monotonic() + 5.0
+    while wrangler.freeBufQueue.qsize() < numBufs and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+def test_backgroundBufferSwap():
+    destroyAllSingletonInstances()
+    wrangler = SignalWrangler()
+    pub = RecordingPub(blocked=True)
+    sig = _makeSig("Test BG Swap", pub)
+    wrangler.startBackgroundPublish(maxQueueDepth=3)
+
+    # Values are copied out at hand-off, so setting the next one doesn't change what's queued
+    for val in (1.0, 2.0, 3.0):
+        sig.set(val)
+        wrangler.publishPeriodic()
+    assert wrangler.overrunCount == 0
+
+    pub.release.set()
+    wrangler.stopBackgroundPublish()
+    assert pub.values == [1.0, 2.0, 3.0]
+    # Every buffer came back, empty
+    assert wrangler.freeBufQueue.qsize() == 3
+    assert all(len(buf) == 0 for buf in wrangler.freeBufQueue.queue)
+    destroyAllSingletonInstances()
+
+def test_backgroundOverrunCounting():
+    destroyAllSingletonInstances()
+    wrangler = SignalWrangler()
+    pub = RecordingPub(blocked=True)
+    sig = _makeSig("Test BG Overrun", pub)
+    wrangler.startBackgroundPublish(maxQueueDepth=2)
+
+    # Writer is stuck on the first loop, the second waits in the queue, and the rest have nowhere to go
+    for val in (1.0, 2.0, 3.0, 4.0):
+        sig.set(val)
+        wrangler.publishPeriodic()
+    assert wrangler.overrunCount == 2
+    assert wrangler.droppedSampleCount >= 2
+
+    pub.release.set()
+    wrangler.stopBackgroundPublish()
+    assert pub.values == [1.0, 2.0]
+    destroyAllSingletonInstances()
+
+def test_backgroundFlushOnStop():
+    destroyAllSingletonInstances()
+    wrangler = SignalWrangler()
+    pub = RecordingPub()
+    sig = _makeSig("Test BG Flush", pub)
+    wrangler.startBackgroundPublish()
+
+    sig.set(5.0)
+    wrangler.publishPeriodic()
+    wrangler.stopBackgroundPublish()
+    # Everything queued before the stop is written before it returns
+    assert pub.values == [5.0]
+    assert wrangler.writerThread is None
+    # Stopping twice is harmless
+    wrangler.stopBackgroundPublish()
+    destroyAllSingletonInstances()
+
+def test_backgroundWriteErrorDoesNotStopWriter():
+    destroyAllSingletonInstances()
+    wrangler = SignalWrangler()
+    badSig = _makeSig("Test BG Bad", FailingPub())
+    goodPub = RecordingPub()
+    goodSig = _makeSig("Test BG Good", goodPub)
+    wrangler.startBackgroundPublish(maxQueueDepth=2)
+
+    for val in (1.0, 2.0, 3.0, 4.0):
+        badSig.set(val)
+        goodSig.set(val)
+        wrangler.publishPeriodic()
+        # Let the writer catch up, so any lost buffer would show up as an overrun
+        _waitForWriter(wrangler, 2)
+
+    wrangler.stopBackgroundPublish()
+    assert wrangler.writeErrorCount == 4
+    assert wrangler.overrunCount == 0
+    assert goodPub.values == [1.0, 2.0, 3.0, 4.0]
+    assert wrangler.freeBufQueue.qsize() == 2
+    destroyAllSingletonInstances()
+
+def _publishedSequence(sig, values):
+    published = []
+    for val in values:
+        sig.set(val)
+        published.append(sig.checkPublishPolicy())
+    return published
+
+def test_policyFirstSampleAlwaysPublishes():
+    assert _publishedSequence(Signal("Test Policy First Dec", decimation=5), [1.0]) == [True]
+    assert _publishedSequence(Signal("Test Policy First DB", deadband=100.0), [0.0]) == [True]
+    destroyAllSingletonInstances()
+
+def test_policyDecimation():
+    sig = Signal("Test Policy Dec", decimation=3)
+    assert _publishedSequence(sig, [1.0] * 7) == [True, False, False, True, False, False, True]
+    destroyAllSingletonInstances()
+
+def test_policyDeadband():
+    sig = Signal("Test Policy DB", deadband=0.5)
+    # Compared against the last *published* value, so slow drift still gets published eventually
+    assert _publishedSequence(sig, [0.0, 0.3, 0.6, 0.8, 1.2, 0.0]) == [True, False, True, False, True, True]
+    destroyAllSingletonInstances()
+
+def test_policyChangeOnly():
+    sig = Signal("Test Policy Change", deadband=0)
+    assert _publishedSequence(sig, [1.0, 1.0, 2.0, 2.0]) == [True, False, True, False]
+    destroyAllSingletonInstances()
+
+def test_policyBooleanPublishesOnChange():
+    # Even with a deadband bigger than the True/False difference
+    sig = BooleanSignal("Test Policy Bool", deadband=1.0)
+    assert _publishedSequence(sig, [False, False, True, True, False]) == [True, False, True, False, True]
+    destroyAllSingletonInstances()
+
+def test_policyArrayPublishesOnChange():
+    sig = DoubleArraySignal("Test Policy Array", deadband=0.1)
+    values = [[1.0, 2.0], [1.0, 2.05], [1.0, 2.2], [1.0, 2.2, 3.0]]
+    assert _publishedSequence(sig, values) == [True, False, True, True]
+    destroyAllSingletonInstances()
+
+def test_policyHeldValueRefreshedOnDecimationTick():
+    sig = Signal("Test Policy Held", decimation=3, deadband=1.0)
+    # Held by the deadband, but still refreshed every third value
+    assert _publishedSequence(sig, [0.0] * 7) == [True, False, False, True, False, False, True]
+    # A real change goes out right away, and restarts the count
+    assert _publishedSequence(sig, [5.0, 5.0, 5.0, 5.0]) == [True, False, False, True]
+    destroyAllSingletonInstances()
+
+def test_policySkippedSamplesCounted():
+    destroyAllSingletonInstances()
+    wrangler = SignalWrangler()
+    sig = _makeSig("Test Policy Count", RecordingPub())
+    sig.deadband = 0
+    for _ in range(3):
+        sig.set(1.0)
+        wrangler.publishPeriodic()
+    assert sig.pub.values == [1.0]
+    assert wrangler.skippedSampleCountSig.value == 1
+    destroyAllSingletonInstances()
+
+def test_sameNameSharesPublisher():
+    first = IntegerSignal("Test Shared Name", "count")
+    second = IntegerSignal("Test Shared Name", "count")
+    assert second.pub is first.pub
+    destroyAllSingletonInstances()
+
+def test_sameNameDifferentTypeRaises():
+    Signal("Test Typed Name")
+    with pytest.raises(TypeError):
+        BooleanSignal("Test Typed Name")
+    destroyAllSingletonInstances()
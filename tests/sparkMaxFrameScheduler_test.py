@@ -0,0 +1,80 @@
+# pylint: disable-all
+from wrappers.sparkMaxFrameScheduler import SparkMaxFrameScheduler, frameLoad
+from wrappers.sparkMaxFrameScheduler import STATUS0, STATUS1, STATUS2, STATUS3
+from wrappers.sparkMaxFrameScheduler import FAST_PERIOD_MS, SLOW_PERIOD_MS, USAGE_HOLD_S, CAN_BUDGET_FRAC
+from wrappers.sparkMaxFrameScheduler import OFF_PERIOD_MS
+
+class FakeMotor():
+    def __init__(self, name):
+        self.name = name
+        self.used = (False, False)
+        self.framePeriodsMs = {STATUS0: 20, STATUS1: FAST_PERIOD_MS, STATUS2: FAST_PERIOD_MS, STATUS3: 65500}
+
+    def takeFrameUsage(self):
+        usage = self.used
+        self.used = (False, False)
+        return usage
+
+    def setFramePeriod(self, frame, periodMs):
+        self.framePeriodsMs[frame] = periodMs
+
+def totalLoad(motors):
+    return sum(frameLoad(p) for m in motors for p in m.framePeriodsMs.values())
+
+def test_unusedFramesSlowDown():
+    sched = SparkMaxFrameScheduler()
+    motor = FakeMotor("test_onlyVel")
+    sched.schedule([motor], 0.0, 0.0)
+    motor.used = (True, False)
+    sched.schedule([motor], USAGE_HOLD_S + 1.0, 0.0)
+    assert motor.framePeriodsMs[STATUS1] == FAST_PERIOD_MS
+    assert motor.framePeriodsMs[STATUS2] == SLOW_PERIOD_MS
+
+def test_budgetEnforced():
+    sched = SparkMaxFrameScheduler()
+    motors = [FakeMotor(f"test_budget{idx}") for idx in range(20)]
+    for motor in motors:
+        motor.used = (True, True)
+    # Other devices are using a good chunk of the bus, so twenty motors' worth of frames won't fit at full rate
+    sched.schedule(motors, 0.0, totalLoad(motors) + 0.3)
+    assert totalLoad(motors) <= CAN_BUDGET_FRAC - 0.3 + 1e-6
+    assert motors[0].framePeriodsMs[STATUS1] > FAST_PERIOD_MS
+
+def test_boostedKeptLast():
+    sched = SparkMaxFrameScheduler()
+    motors = [FakeMotor(f"test_boost{idx}") for idx in range(14)]
+    sched.schedule(motors, 0.0, 0.0)
+    state = sched.motorStates[motors[0]]
+    state.boostEndTime = 10.0
+    state.boostPeriodMs = 10
+    motors[0].used = (True, True)
+    sched.schedule(motors, 1.0, totalLoad(motors) + 0.3)
+    # Boosted motor keeps its rate, the rest are slowed to make room
+    assert motors[0].framePeriodsMs[STATUS1] == 10
+    assert motors[1].framePeriodsMs[STATUS1] > FAST_PERIOD_MS
+    assert totalLoad(motors) <= CAN_BUDGET_FRAC - 0.3 + 1e-6
+
+def test_noRoomKeepsUsedFrames():
+    sched = SparkMaxFrameScheduler()
+    motor = FakeMotor("test_noRoom")
+    sched.schedule([motor], 0.0, 0.0)
+    motor.used = (True, False)
+    # Other devices are using the whole bus
+    sched.schedule([motor], USAGE_HOLD_S + 1.0, 1.0)
+    # Position isn't read by anything, so it gets turned off. Velocity is, so it just slows down.
+    assert motor.framePeriodsMs[STATUS2] == OFF_PERIOD_MS
+    assert motor.framePeriodsMs[STATUS1] == SLOW_PERIOD_MS
+
+def test_unusedFramesSlowedFirst():
+    sched = SparkMaxFrameScheduler()
+    motors = [FakeMotor(f"test_unusedFirst{idx}") for idx in range(4)]
+    sched.schedule(motors, 0.0, 0.0)
+    for motor in motors:
+        motor.used = (True, False)
+    # Leave just enough budget for status 0 and fast velocity frames, plus a little.
+    # Slowing down the unread position frames is enough to fit.
+    neededLoad = len(motors) * 2 * frameLoad(FAST_PERIOD_MS) + 0.001
+    sched.schedule(motors, USAGE_HOLD_S + 1.0, totalLoad(motors) + CAN_BUDGET_FRAC - neededLoad)
+    for motor in motors:
+        assert motor.framePeriodsMs[STATUS1] == FAST_PERIOD_MS
+        assert motor.framePeriodsMs[STATUS2] > SLOW_PERIOD_MS
@@ -0,0 +1,82 @@
+# pylint: disable-all
+import math
+import random
+import time
+import pytest
+from wpimath.geometry import Pose2d, Rotation2d, Translation2d
+from wpimath.kinematics import ChassisSpeeds, SwerveDrive4Kinematics, SwerveModuleState
+from drivetrain.swerveKinematics4 import SwerveKinematics4, optimizeModuleState
+
+TRANSLATIONS = [Translation2d(0.3, 0.25), Translation2d(0.3, -0.25),
+                Translation2d(-0.3, 0.25), Translation2d(-0.3, -0.25)]
+MAX_SPEED = 4.0
+TOL = 1e-9
+
+def _wpiDiscretize(chSpd):
+    # Same as drivetrainControl._discretizeChSpd
+    dt = 0.02
+    poseVel = Pose2d(chSpd.vx * dt, chSpd.vy * dt, Rotation2d(chSpd.omega * dt))
+    twistVel = Pose2d().log(poseVel)
+    return ChassisSpeeds(twistVel.dx / dt, twistVel.dy / dt, twistVel.dtheta / dt)
+
+def _wpiModuleStates(wpiKin, vx, vy, omega):
+    states = wpiKin.toSwerveModuleStates(_wpiDiscretize(ChassisSpeeds(vx, vy, omega)))
+    return SwerveDrive4Kinematics.desaturateWheelSpeeds(states, MAX_SPEED)
+
+def _angleDiff(a, b):
+    return abs(math.atan2(math.sin(a - b), math.cos(a - b)))
+
+def test_matchesWpimath():
+    rng = random.Random(1736)
+    wpiKin = SwerveDrive4Kinematics(*TRANSLATIONS)
+    fastKin = SwerveKinematics4(TRANSLATIONS)
+
+    cases = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, 2.0), (0.0, 0.0, 0.0), (5.0, 5.0, 6.0)]
+    cases += [(rng.uniform(-5, 5), rng.uniform(-5, 5), rng.uniform(-8, 8)) for _ in range(500)]
+
+    for vx, vy, omega in cases:
+        wpiStates = _wpiModuleStates(wpiKin, vx, vy, omega)
+        fastKin.setChassisSpeeds(vx, vy, omega)
+        fastKin.updateModuleStates(MAX_SPEED)
+
+        for idx in range(4):
+            assert abs(fastKin.speeds[idx] - wpiStates[idx].speed) < TOL
+            assert _angleDiff(fastKin.anglesRad[idx], wpiStates[idx].angle.radians()) < TOL
+
+def test_optimizeMatchesWpimath():
+    rng = random.Random(9106)
+    for _ in range(1000):
+        speed = rng.uniform(-4, 4)
+        angle = rng.uniform(-math.pi, math.pi)
+        curAngle = rng.uniform(-3 * math.pi, 3 * math.pi)
+
+        wpiState = SwerveModuleState.optimize(SwerveModuleState(speed, Rotation2d(angle)), Rotation2d(curAngle))
+        fastSpeed, fastAngle = optimizeModuleState(speed, angle, curAngle)
+
+        assert abs(fastSpeed - wpiState.speed) < TOL
+        assert _angleDiff(fastAngle, wpiState.angle.radians()) < TOL
+
+@pytest.mark.benchmark
+def test_benchmark():
+    wpiKin = SwerveDrive4Kinematics(*TRANSLATIONS)
+    fastKin = SwerveKinematics4(TRANSLATIONS)
+    numLoops = 2000
+    curAngles = [0.1, 0.2, 0.3, 0.4]
+
+    startTime = time.perf_counter()
+    for loop in range(numLoops):
+        states = _wpiModuleStates(wpiKin, 1.0 + loop * 1e-4, 0.5, 0.3)
+        for idx in range(4):
+            SwerveModuleState.optimize(states[idx], Rotation2d(curAngles[idx]))
+    wpiTime = (time.perf_counter() - startTime) / numLoops
+
+    startTime = time.perf_counter()
+    for loop in range(numLoops):
+        fastKin.setChassisSpeeds(1.0 + loop * 1e-4, 0.5, 0.3)
+        fastKin.updateModuleStates(MAX_SPEED)
+        for idx in range(4):
+            optimizeModuleState(fastKin.speeds[idx], fastKin.anglesRad[idx], curAngles[idx])
+    fastTime = (time.perf_counter() - startTime) / numLoops
+
+    print(f"Swerve kinematics per loop: wpimath {wpiTime*1e6:.1f}us, python {fastTime*1e6:.1f}us, "
+          f"saved {(wpiTime - fastTime)*1e6:.1f}us")
@@ -0,0 +1,96 @@
+# pylint: disable-all
+import os
+import shutil
+import time
+import pytest
+import drivetrain.trajectoryCache
+from drivetrain.trajectoryCache import loadTrajectoryTable, getTrajectoryCacheDir, _readCacheFile, _HEADER
+from AutoSequencerV2.lazyMode import LazyMode
+from Autonomous.modes.drivePathTest1 import DrivePathTest1
+from utils.singleton import destroyAllSingletonInstances
+
+PATH_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "deploy", "pathplanner", "testPath1"))
+
+def _cacheFiles(cacheDir):
+    return sorted(name for name in os.listdir(cacheDir) if name.endswith(".traj"))
+
+def test_cacheRoundTrip(tmp_path):
+    cacheDir = str(tmp_path)
+    generated = loadTrajectoryTable(PATH_FILE, 3.0, 2.0, cacheDir)
+    assert len(_cacheFiles(cacheDir)) == 1
+    cached = loadTrajectoryTable(PATH_FILE, 3.0, 2.0, cacheDir)
+    assert cached.backingMap is not None
+    assert cached.getTotalTime() == generated.getTotalTime()
+    for idx in range(101):
+        sampleTime = generated.getTotalTime() * idx / 100.0
+        assert cached.sample(sampleTime).x == generated.sample(sampleTime).x
+        assert cached.sample(sampleTime).headingRad == generated.sample(sampleTime).headingRad
+
+    # Different limits make a different trajectory, and replace the old compiled file
+    loadTrajectoryTable(PATH_FILE, 2.0, 1.0, cacheDir)
+    assert len(_cacheFiles(cacheDir)) == 1
+
+def test_changedSourceRegenerates(tmp_path):
+    cacheDir = str(tmp_path / "cache")
+    pathCopy = str(tmp_path / "copiedPath")
+    shutil.copy(PATH_FILE + ".path", pathCopy + ".path")
+    loadTrajectoryTable(pathCopy, 3.0, 2.0, cacheDir)
+    firstFiles = _cacheFiles(cacheDir)
+    with open(pathCopy + ".path", "a") as pathFile:
+        pathFile.write(" ")
+    loadTrajectoryTable(pathCopy, 3.0, 2.0, cacheDir)
+    assert _cacheFiles(cacheDir) != firstFiles
+
+def test_corruptFileIgnored(tmp_path):
+    cacheDir = str(tmp_path)
+    loadTrajectoryTable(PATH_FILE, 3.0, 2.0, cacheDir)
+    cachePath = os.path.join(cacheDir, _cacheFiles(cacheDir)[0])
+    with open(cachePath, "r+b") as cacheFile:
+        cacheFile.truncate(20)
+    table = loadTrajectoryTable(PATH_FILE, 3.0, 2.0, cacheDir)
+    assert table.backingMap is None
+    assert table.getTotalTime() > 0
+
+def test_rejectedFileUnmapped(tmp_path, monkeypatch):
+    maps = []
+    realMmap = drivetrain.trajectoryCache.mmap.mmap
+    def recordingMmap(*args, **kwargs):
+        maps.append(realMmap(*args, **kwargs))
+        return maps[-1]
+    monkeypatch.setattr(drivetrain.trajectoryCache.mmap, "mmap", recordingMmap)
+
+    shortPath = tmp_path / "short.traj"
+    shortPath.write_bytes(b"TRAJ")
+    badVersionPath = tmp_path / "badVersion.traj"
+    badVersionPath.write_bytes(_HEADER.pack(b"TRAJ", 0, 2, 0.005, 0.01) + bytes(1000))
+    assert _readCacheFile(str(shortPath)) is None
+    assert _readCacheFile(str(badVersionPath)) is None
+    assert len(maps) == 2
+    assert all(mapped.closed for mapped in maps)
+
+def test_fieldsAligned(tmp_path):
+    assert _HEADER.size % 8 == 0
+    cacheDir = str(tmp_path)
+    loadTrajectoryTable(PATH_FILE, 3.0, 2.0, cacheDir)
+    assert loadTrajectoryTable(PATH_FILE, 3.0, 2.0, cacheDir).backingMap is not None
+
+@pytest.mark.benchmark
+def test_startupBenchmark():
+    # The same path an autonomous mode would load, through the same steps as at startup
+    numLoads = 5
+
+    coldTime = 0.0
+    for _ in range(numLoads):
+        shutil.rmtree(getTrajectoryCacheDir(), ignore_errors=True)
+        startTime = time.perf_counter()
+        LazyMode("Drive Path Test 1", DrivePathTest1).prepare()
+        coldTime += (time.perf_counter() - startTime) / numLoads
+
+    warmTime = 0.0
+    for _ in range(numLoads):
+        startTime = time.perf_counter()
+        LazyMode("Drive Path Test 1", DrivePathTest1).prepare()
+        warmTime += (time.perf_counter() - startTime) / numLoads
+    destroyAllSingletonInstances()
+
+    print(f"Trajectory load: generated {coldTime*1e3:.2f}ms, from cache {warmTime*1e3:.2f}ms")
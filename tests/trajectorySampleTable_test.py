@@ -0,0 +1,49 @@
+# pylint: disable-all
+import math
+import os
+import time
+import pytest
+from pathplannerlib import PathPlanner
+from drivetrain.trajectorySampleTable import TrajectorySampleTable
+
+PATH_FILE = os.path.join(os.path.dirname(__file__), "..", "deploy", "pathplanner", "testPath1")
+
+def _loadPath():
+    return PathPlanner.loadPath(os.path.abspath(PATH_FILE), 3.0, 2.0)
+
+def test_matchesPathPlanner():
+    path = _loadPath()
+    table = TrajectorySampleTable(path)
+    duration = path.getTotalTime()
+    for idx in range(200):
+        sampleTime = duration * idx / 199.0
+        expected = path.sample(sampleTime)
+        actual = table.sample(sampleTime)
+        assert abs(actual.x - expected.pose.X()) < 0.01
+        assert abs(actual.y - expected.pose.Y()) < 0.01
+        headingErr = math.remainder(actual.headingRad - expected.holonomicRotation.radians(), math.tau)
+        assert abs(headingErr) < 0.01
+        assert abs(actual.velocity - expected.velocity) < 0.05
+
+    # Past either end, held at the first and last states
+    endState = path.getEndState()
+    assert abs(table.sample(duration + 5.0).x - endState.pose.X()) < 1e-9
+    assert abs(table.sample(-1.0).y - path.getInitialState().pose.Y()) < 1e-9
+
+@pytest.mark.benchmark
+def test_benchmark():
+    path = _loadPath()
+    table = TrajectorySampleTable(path)
+    sampleTimes = [path.getTotalTime() * idx / 2000.0 for idx in range(2000)]
+
+    startTime = time.perf_counter()
+    for sampleTime in sampleTimes:
+        path.sample(sampleTime)
+    pathTime = (time.perf_counter() - startTime) / len(sampleTimes)
+
+    startTime = time.perf_counter()
+    for sampleTime in sampleTimes:
+        table.sample(sampleTime)
+    tableTime = (time.perf_counter() - startTime) / len(sampleTimes)
+
+    print(f"Trajectory sample: PathPlanner {pathTime*1e6:.1f}us, table {tableTime*1e6:.1f}us")
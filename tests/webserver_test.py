@@ -0,0 +1,419 @@
+# pylint: disable-all
+import functools
+import gzip
+import http.client
+import io
+import json
+import os
+import queue
+import socket
+import struct
+import tarfile
+import threading
+import time
+import pytest
+import webserver.webserver
+from tests.wpilogReader_test import _writeLog, _start, _record
+from utils.extDriveManager import ExtDriveManager
+from utils.singleton import destroyAllSingletonInstances
+from webserver.webserver import PooledTCPServer
+from webserver.casseroleWebServerImpl import CasseroleWebServerImpl, WEB_ROOT, logIndexCache
+from webserver.casseroleWebServerImpl import _parseByteRange, RANGE_NOT_SATISFIABLE, _writeTar
+from webserver.casseroleWebServerImpl import addDashboardWidget, dashboardWidgetList, dashboardCache
+from webserver.casseroleWebServerImpl import StaticAssetCache, STATIC_CACHE_CONTROL
+from webserver.casseroleWebServerImpl import RequestThrottle, THROTTLE_RETRY_AFTER_S
+from dashboardWidgets.text import Text
+
+# Start a real server on a free port, serving logs out of logDir.
+# Returns a function which stops it again.
+def _startServer(logDir, maxConcurrency=4):
+    destroyAllSingletonInstances()
+    ExtDriveManager().logDir = str(logDir)
+    handler = functools.partial(CasseroleWebServerImpl, directory=str(WEB_ROOT))
+    srv = PooledTCPServer(("127.0.0.1", 0), handler, maxConcurrency)
+    thread = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    def stop():
+        srv.shutdown()
+        thread.join()
+        srv.server_close()
+        logIndexCache.invalidate()
+        destroyAllSingletonInstances()
+    return srv, stop
+
+@pytest.fixture
+def server(tmp_path):
+    srv, stop = _startServer(tmp_path)
+    yield srv
+    stop()
+
+def _connect(srv):
+    return http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=10)
+
+def _get(srv, path, headers=None):
+    conn = _connect(srv)
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+def test_queryLogNonFiniteAsNull(server, tmp_path):
+    _writeLog(str(tmp_path / "q.wpilog"), [
+        _start(1, "/SmartDashboard/dbl", "double"),
+        _record(1, 1000000, struct.pack("<d", 1.0)),
+        _record(1, 2000000, struct.pack("<d", float("nan"))),
+        _record(1, 3000000, struct.pack("<d", float("inf"))),
+    ])
+    resp, body = _get(server, "/query_log?file=q.wpilog&signal=dbl&points=10")
+    assert resp.status == 200
+    # Strict parsing - bare NaN or Infinity would fail here
+    result = json.loads(body.decode().strip(), parse_constant=lambda name: pytest.fail(f"got {name}"))
+    assert result["time"] == [1.0, 2.0, 3.0]
+    assert result["value"] == [1.0, None, None]
+
+def test_queryLogIndexCached(server, tmp_path):
+    logPath = str(tmp_path / "c.wpilog")
+    records = [_start(1, "/SmartDashboard/dbl", "double"), _record(1, 1000000, struct.pack("<d", 1.0))]
+    _writeLog(logPath, records)
+
+    _get(server, "/query_log?file=c.wpilog&signal=dbl")
+    firstIndex = logIndexCache.entries[logPath][1]
+    resp, body = _get(server, "/query_log?file=c.wpilog&signal=dbl")
+    assert json.loads(body)["value"] == [1.0]
+    assert logIndexCache.entries[logPath][1] is firstIndex
+
+    # A changed file gets indexed again
+    _writeLog(logPath, records + [_record(1, 2000000, struct.pack("<d", 2.0))])
+    os.utime(logPath, ns=(0, 12345))
+    resp, body = _get(server, "/query_log?file=c.wpilog&signal=dbl")
+    assert json.loads(body)["value"] == [1.0, 2.0]
+    assert logIndexCache.entries[logPath][1] is not firstIndex
+
+    # Deleting the file forgets its index
+    conn = _connect(server)
+    conn.request("DELETE", "/delete_file/c.wpilog")
+    assert conn.getresponse().status == 200
+    conn.close()
+    assert logPath not in logIndexCache.entries
+
+def test_parseByteRange():
+    assert _parseByteRange("bytes=0-9", 100) == (0, 9)
+    assert _parseByteRange("bytes=90-", 100) == (90, 99)
+    assert _parseByteRange("bytes=90-200", 100) == (90, 99)
+    assert _parseByteRange("bytes=-10", 100) == (90, 99)
+    assert _parseByteRange("bytes=-200", 100) == (0, 99)
+    assert _parseByteRange("bytes=100-", 100) == RANGE_NOT_SATISFIABLE
+    assert _parseByteRange("bytes=-0", 100) == RANGE_NOT_SATISFIABLE
+    # Ignored - the whole file gets sent
+    assert _parseByteRange("bytes=0-9,20-29", 100) is None
+    assert _parseByteRange("bytes=9-0", 100) is None
+    assert _parseByteRange("items=0-9", 100) is None
+    assert _parseByteRange("bytes=-", 100) is None
+
+def _writeLogFile(tmp_path, name, size):
+    data = bytes(idx % 251 for idx in range(size))
+    (tmp_path / name).write_bytes(data)
+    return data
+
+def test_downloadRanges(server, tmp_path):
+    data = _writeLogFile(tmp_path, "r.wpilog", 200000)
+
+    resp, body = _get(server, "/download_file/r.wpilog", {"Range": "bytes=100-199"})
+    assert resp.status == 206
+    assert resp.getheader("Content-Range") == "bytes 100-199/200000"
+    assert body == data[100:200]
+
+    resp, body = _get(server, "/download_file/r.wpilog", {"Range": "bytes=300000-"})
+    assert resp.status == 416
+    assert resp.getheader("Content-Range") == "bytes */200000"
+
+    resp, body = _get(server, "/download_file/r.wpilog", {"Range": "bytes=0-9,100-109"})
+    assert resp.status == 200
+    assert body == data
+
+def test_downloadGzip(server, tmp_path):
+    data = _writeLogFile(tmp_path, "g.wpilog", 300000)
+    resp, body = _get(server, "/download_file/g.wpilog", {"Accept-Encoding": "gzip"})
+    assert resp.status == 200
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body) == data
+
+    resp, body = _get(server, "/download_file/missing.wpilog")
+    assert resp.status == 404
+
+def test_downloadLogsSinceTar(server, tmp_path):
+    first = _writeLogFile(tmp_path, "a.wpilog", 1000)
+    second = _writeLogFile(tmp_path, "b.wpilog", 70000)
+    _writeLogFile(tmp_path, "old.wpilog", 10)
+    os.utime(tmp_path / "old.wpilog", (100, 100))
+
+    for headers in ({}, {"Accept-Encoding": "gzip"}):
+        resp, body = _get(server, "/download_logs_since?time=1000", headers)
+        assert resp.status == 200
+        if headers:
+            body = gzip.decompress(body)
+        with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+            assert sorted(tar.getnames()) == ["a.wpilog", "b.wpilog"]
+            assert tar.extractfile("a.wpilog").read() == first
+            assert tar.extractfile("b.wpilog").read() == second
+
+def test_tarSkipsUnreadableFile(tmp_path):
+    (tmp_path / "a.wpilog").write_bytes(b"first log")
+    out = io.BytesIO()
+    assert _writeTar(out, [str(tmp_path / "gone.wpilog"), str(tmp_path / "a.wpilog")])
+    with tarfile.open(fileobj=io.BytesIO(out.getvalue())) as tar:
+        assert tar.getnames() == ["a.wpilog"]
+
+# Truncates a log as soon as the archive starts going out, like a log rotated mid-download
+class TruncatingWriter(io.BytesIO):
+    def __init__(self, victimPath):
+        super().__init__()
+        self.victimPath = victimPath
+
+    def write(self, data):
+        if self.victimPath is not None:
+            with open(self.victimPath, "r+b") as victim:
+                victim.truncate(10)
+            self.victimPath = None
+        return super().write(data)
+
+def test_tarStopsOnFileChangedMidMember(tmp_path):
+    logPath = tmp_path / "big.wpilog"
+    logPath.write_bytes(bytes(100000))
+    out = TruncatingWriter(str(logPath))
+    assert not _writeTar(out, [str(logPath)])
+    # Left unfinished, so it can't be mistaken for a good archive
+    with pytest.raises(tarfile.TarError):
+        with tarfile.open(fileobj=io.BytesIO(out.getvalue())) as tar:
+            tar.extractfile("big.wpilog").read()
+
+@pytest.fixture
+def emptyDashboard():
+    savedWidgets = list(dashboardWidgetList)
+    dashboardWidgetList.clear()
+    dashboardCache.clear()
+    yield
+    dashboardWidgetList[:] = savedWidgets
+    dashboardCache.clear()
+
+def test_dashboardRevalidation(server, emptyDashboard):
+    addDashboardWidget(Text(10, 10, "/SmartDashboard/first"))
+    resp, body = _get(server, "/dashboard/dashboard.js")
+    assert resp.status == 200
+    etag = resp.getheader("ETag")
+    lastModified = resp.getheader("Last-Modified")
+    assert b"/SmartDashboard/first" in body
+
+    # Client's copy is current - nothing to send
+    resp, body = _get(server, "/dashboard/dashboard.js", {"If-None-Match": etag})
+    assert resp.status == 304
+    assert body == b""
+    resp, body = _get(server, "/dashboard/dashboard.js", {"If-Modified-Since": lastModified})
+    assert resp.status == 304
+
+    # Gzipped copy for clients which take it
+    resp, body = _get(server, "/dashboard/dashboard.js", {"Accept-Encoding": "gzip"})
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert b"/SmartDashboard/first" in gzip.decompress(body)
+
+def test_dashboardInvalidatedByNewWidget(server, emptyDashboard):
+    addDashboardWidget(Text(10, 10, "/SmartDashboard/first"))
+    resp, _ = _get(server, "/dashboard/dashboard.html")
+    htmlEtag = resp.getheader("ETag")
+    resp, _ = _get(server, "/dashboard/dashboard.js")
+    jsEtag = resp.getheader("ETag")
+    assert dashboardCache
+
+    widget = Text(10, 20, "/SmartDashboard/second")
+    addDashboardWidget(widget)
+    assert widget.idx == 1
+    assert not dashboardCache
+
+    # The old copies are no longer current
+    resp, body = _get(server, "/dashboard/dashboard.js", {"If-None-Match": jsEtag})
+    assert resp.status == 200
+    assert resp.getheader("ETag") != jsEtag
+    assert b"/SmartDashboard/second" in body
+    resp, body = _get(server, "/dashboard/dashboard.html", {"If-None-Match": htmlEtag})
+    assert resp.status == 200
+
+def test_staticAssetRevalidation(server):
+    onDisk = (WEB_ROOT / "dashboard" / "icons" / "gear.svg").read_bytes()
+    resp, body = _get(server, "/dashboard/icons/gear.svg")
+    assert resp.status == 200
+    assert body == onDisk
+    assert resp.getheader("Cache-Control") == STATIC_CACHE_CONTROL
+    etag = resp.getheader("ETag")
+
+    resp, body = _get(server, "/dashboard/icons/gear.svg", {"If-None-Match": etag})
+    assert resp.status == 304
+    assert body == b""
+
+    resp, body = _get(server, "/dashboard/icons/gear.svg", {"Accept-Encoding": "gzip"})
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body) == onDisk
+
+def test_staticAssetCacheEviction(tmp_path):
+    webRoot = tmp_path / "www"
+    webRoot.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (webRoot / name).write_bytes(bytes(400))
+    (webRoot / "huge.txt").write_bytes(bytes(5000))
+    (tmp_path / "secret.txt").write_bytes(b"not for the web")
+
+    # Room for about two files, counting their gzipped copies
+    cache = StaticAssetCache(webRoot, maxBytes=1000)
+    assert cache.get(webRoot / "a.txt").body == bytes(400)
+    cache.get(webRoot / "b.txt")
+    cache.get(webRoot / "a.txt") # a is now the most recently used
+    cache.get(webRoot / "c.txt")
+    assert list(cache.entries) == [str(webRoot / "a.txt"), str(webRoot / "c.txt")]
+    assert cache.totalBytes <= 1000
+
+    # Too big to cache, and outside the web root
+    assert cache.get(webRoot / "huge.txt") is None
+    assert cache.get(webRoot / ".." / "secret.txt") is None
+    assert cache.get(webRoot / "missing.txt") is None
+
+# A raw connection, for control over exactly what gets sent when
+class RawConnection():
+    def __init__(self, srv):
+        self.sock = socket.create_connection(srv.server_address, timeout=5)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, text):
+        self.sock.sendall(text.encode())
+
+    # Read exactly one reply, which must have a Content-Length. Returns the status line and body.
+    def readReply(self):
+        status = self.reader.readline().strip()
+        assert status, "connection closed"
+        length = 0
+        while True:
+            line = self.reader.readline().strip()
+            if not line:
+                break
+            name, value = line.split(b":", 1)
+            if name.lower() == b"content-length":
+                length = int(value)
+        return status, self.reader.read(length)
+
+    def request(self, text):
+        self.send(text)
+        return self.readReply()
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+INDEX_REQUEST = "GET /dashboard/icons/gear.svg HTTP/1.1\r\nHost: robot\r\n\r\n"
+
+def test_idleKeepAliveDoesNotHoldWorkers(tmp_path):
+    srv, stop = _startServer(tmp_path, maxConcurrency=2)
+    try:
+        # More open, idle connections than there are workers - like a browser's connection pool
+        conns = [RawConnection(srv) for _ in range(6)]
+        for conn in conns:
+            status, _ = conn.request(INDEX_REQUEST)
+            assert status.endswith(b"200 OK")
+
+        # A new client still gets served right away
+        start = time.monotonic()
+        resp, _ = _get(srv, "/dashboard/icons/gear.svg")
+        assert resp.status == 200
+        assert time.monotonic() - start < 1.0
+
+        # And the idle connections still work when they're used again
+        for conn in conns:
+            status, _ = conn.request(INDEX_REQUEST)
+            assert status.endswith(b"200 OK")
+            conn.close()
+    finally:
+        stop()
+
+def test_pipelinedRequests(server):
+    conn = RawConnection(server)
+    conn.send(INDEX_REQUEST * 3)
+    for _ in range(3):
+        status, body = conn.readReply()
+        assert status.endswith(b"200 OK")
+        assert body.startswith(b"<")
+    conn.close()
+
+def test_parkedConnectionClosedWhenQueueFull(server):
+    conn = RawConnection(server)
+    conn.request(INDEX_REQUEST)
+    deadline = time.monotonic() + 5.0
+    while not server.parkedConns and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.parkedConns
+
+    # Every queue slot taken - swapped in, so the workers don't empty it
+    realQueue = server.requestQueue
+    server.requestQueue = queue.Queue(maxsize=1)
+    server.requestQueue.put(None)
+    try:
+        conn.send(INDEX_REQUEST)
+        # Closed, rather than the parker waiting for room
+        assert conn.reader.read() == b""
+        assert not server.parkedConns
+    finally:
+        server.requestQueue = realQueue
+        conn.close()
+
+def test_serverCloseReleasesParker(tmp_path):
+    srv, stop = _startServer(tmp_path)
+    stop()
+    assert not srv.parker.is_alive()
+    assert srv.parkSelector.get_map() is None
+    assert srv.wakeRecv.fileno() == -1
+    assert srv.wakeSend.fileno() == -1
+
+def test_idleConnectionClosed(server, monkeypatch):
+    monkeypatch.setattr(webserver.webserver, "KEEP_ALIVE_IDLE_S", 0.2)
+    conn = RawConnection(server)
+    conn.request(INDEX_REQUEST)
+    # Server hangs up once the connection has been idle too long
+    assert conn.reader.read() == b""
+    conn.close()
+    assert not server.parkedConns
+
+def test_bulkRequestsLimited(server):
+    # Every bulk slot in use - like a couple of long log downloads
+    while server.tryStartBulk():
+        pass
+    resp, _ = _get(server, "/get_file_list")
+    assert resp.status == 503
+    assert resp.getheader("Retry-After") is not None
+    # Everything else is still served
+    resp, _ = _get(server, "/dashboard/icons/gear.svg")
+    assert resp.status == 200
+
+    server.endBulk()
+    resp, body = _get(server, "/get_file_list")
+    assert resp.status == 200
+    assert json.loads(body) == []
+
+def test_throttledBulkRequestDeferredImmediately(server):
+    throttle = RequestThrottle()
+    throttle.update(0.0, 0.02, True)
+    assert throttle.isThrottled()
+
+    startTime = time.monotonic()
+    resp, body = _get(server, "/get_file_list")
+    assert resp.status == 503
+    assert resp.getheader("Retry-After") == str(THROTTLE_RETRY_AFTER_S)
+    # A page which retries by itself, for downloads opened straight in the browser
+    assert f'content="{THROTTLE_RETRY_AFTER_S}"'.encode() in body
+    # Sent back without waiting for the throttle to lift
+    assert time.monotonic() - startTime < 1.0
+    assert throttle.deferredCount == 1
+    # Dashboard pages are never throttled
+    resp, _ = _get(server, "/dashboard/icons/gear.svg")
+    assert resp.status == 200
+
+    throttle.update(0.0, 0.02, False)
+    resp, _ = _get(server, "/get_file_list")
+    assert resp.status == 200
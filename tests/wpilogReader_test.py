@@ -0,0 +1,110 @@
+# pylint: disable-all
+import struct
+import numpy as np
+from utils.wpilogReader import WpilogReader, minMaxDecimate
+
+# Minimal wpilog writer, just enough to build test files by hand
+def _record(entryId, timestamp, payload):
+    hdr = 0x3 | (0x3 << 2) | (0x7 << 4) # 4 byte ID, 4 byte size, 8 byte timestamp
+    return struct.pack("<BIIQ", hdr, entryId, len(payload), timestamp) + payload
+
+def _str(val):
+    return struct.pack("<I", len(val)) + val.encode()
+
+def _start(entryId, name, typeStr):
+    return _record(0, 0, bytes([0]) + struct.pack("<I", entryId) + _str(name) + _str(typeStr) + _str(""))
+
+def _finish(entryId):
+    return _record(0, 0, bytes([1]) + struct.pack("<I", entryId))
+
+def _writeLog(path, records):
+    with open(path, "wb") as outFile:
+        outFile.write(b"WPILOG" + struct.pack("<HI", 0x0100, 0))
+        outFile.write(b"".join(records))
+
+def test_readTypes(tmp_path):
+    logPath = str(tmp_path / "test.wpilog")
+    _writeLog(logPath, [
+        _start(1, "/SmartDashboard/dbl", "double"),
+        _start(2, "/SmartDashboard/flag", "boolean"),
+        _start(3, "/SmartDashboard/arr", "double[]"),
+        _start(4, "/SmartDashboard/txt", "string"),
+        _record(1, 1000, struct.pack("<d", 1.5)),
+        _record(2, 1000, bytes([1])),
+        _record(3, 1000, struct.pack("<2d", 1.0, 2.0)),
+        _record(4, 1000, b"hello"),
+        _record(1, 2000, struct.pack("<d", -3.0)),
+        _record(3, 2000, struct.pack("<2d", 3.0, 4.0)),
+    ])
+
+    with WpilogReader(logPath) as reader:
+        assert set(reader.getSignalNames()) == {"/SmartDashboard/dbl", "/SmartDashboard/flag",
+                                                "/SmartDashboard/arr", "/SmartDashboard/txt"}
+        assert reader.readSignal("/SmartDashboard/dbl") == ([1000, 2000], [1.5, -3.0])
+        assert reader.readSignal("/SmartDashboard/flag") == ([1000], [True])
+        assert reader.readSignal("/SmartDashboard/arr") == ([1000, 2000], [[1.0, 2.0], [3.0, 4.0]])
+        assert reader.readSignal("/SmartDashboard/txt") == ([1000], ["hello"])
+
+        times, vals = reader.readSignalArrays("/SmartDashboard/dbl")
+        assert list(times) == [1000, 2000]
+        assert list(vals) == [1.5, -3.0]
+
+        times, vals = reader.readSignalArrays("/SmartDashboard/arr")
+        assert vals.shape == (2, 2)
+        assert vals[1, 1] == 4.0
+
+def test_entryIdReuseAndTruncation(tmp_path):
+    logPath = str(tmp_path / "test.wpilog")
+    records = [
+        _start(1, "/a", "double"),
+        _record(1, 10, struct.pack("<d", 1.0)),
+        _finish(1),
+        _start(1, "/b", "int64"),
+        _record(1, 20, struct.pack("<q", 7)),
+        _record(1, 30, struct.pack("<q", 8)),
+    ]
+    # Chop the last record in half, like a power cut mid-write
+    data = b"".join(records)
+    _writeLog(logPath, [data[:-4]])
+
+    with WpilogReader(logPath) as reader:
+        assert reader.readSignal("/a") == ([10], [1.0])
+        assert reader.readSignal("/b") == ([20], [7])
+
+def test_exportColumnar(tmp_path):
+    logPath = str(tmp_path / "test.wpilog")
+    _writeLog(logPath, [
+        _start(1, "/SmartDashboard/Loop Duration", "double"),
+        _start(2, "/SmartDashboard/txt", "string"),
+        _record(1, 100, struct.pack("<d", 4.0)),
+        _record(1, 200, struct.pack("<d", 5.0)),
+        _record(2, 200, b"skipped"),
+    ])
+
+    outDir = tmp_path / "export"
+    with WpilogReader(logPath) as reader:
+        index = reader.exportColumnar(str(outDir))
+
+    info = index["signals"]["/SmartDashboard/Loop Duration"]
+    assert "/SmartDashboard/txt" not in index["signals"]
+    assert list(np.load(outDir / info["values"])) == [4.0, 5.0]
+    assert list(np.load(outDir / info["timestamps"])) == [100, 200]
+
+def test_minMaxDecimate(tmp_path):
+    logPath = str(tmp_path / "test.wpilog")
+    # Flat signal with one spike, 10 samples per bucket
+    records = [_start(1, "/SmartDashboard/sig", "double")]
+    for idx in range(100):
+        val = 50.0 if idx == 37 else 1.0
+        records.append(_record(1, idx * 10, struct.pack("<d", val)))
+    _writeLog(logPath, records)
+
+    with WpilogReader(logPath) as reader:
+        samples = list(minMaxDecimate(reader.iterSamples("/SmartDashboard/sig"), 0, 1000, 10))
+        assert len(samples) <= 20
+        assert (370, 50.0) in samples
+        assert [time for time, _ in samples] == sorted(time for time, _ in samples)
+
+        # Time window only decodes the samples inside it
+        windowed = list(reader.iterSamples("/SmartDashboard/sig", 200, 300))
+        assert [time for time, _ in windowed] == list(range(200, 310, 10))
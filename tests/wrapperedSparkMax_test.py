@@ -0,0 +1,76 @@
+# pylint: disable-all
+import pytest
+from wrappers.wrapperedSparkMax import SparkMaxWrangler, WrapperedSparkMax, CONFIG_VERSION, CONFIG_MARKER_SLOT
+from utils.units import rev2Rad
+from utils.singleton import destroyAllSingletonInstances
+
+def test_parallelConfig():
+    motors = [WrapperedSparkMax(50 + idx, f"test_cfg{idx}") for idx in range(4)]
+    motors[0].setInverted(True)
+    motors[0].setPID(0.5, 0.0, 0.01)
+    SparkMaxWrangler().waitForConfig(timeoutSec=30.0)
+    assert SparkMaxWrangler().isConfigDone()
+    for motor in motors:
+        assert motor.connected
+        assert motor.configTries == 1
+    # Settings given while configuration was still running aren't lost
+    assert motors[0].ctrl.getInverted()
+    assert motors[0].pidCtrl.getP() == 0.5
+    assert motors[0].pidCtrl.getD() == pytest.approx(0.01)
+    destroyAllSingletonInstances()
+
+def test_snapshotGetters():
+    motor = WrapperedSparkMax(60, "test_snap")
+    SparkMaxWrangler().waitForConfig(timeoutSec=30.0)
+    motor.encoder.setPosition(2.0)
+    # Before the first snapshot, position comes straight from the controller
+    assert motor.getMotorPositionRad() == pytest.approx(rev2Rad(2.0))
+
+    SparkMaxWrangler().snapshotAll()
+    motor.encoder.setPosition(3.0)
+    # After it, getters hold the snapshot's values until the next one
+    assert motor.getMotorPositionRad() == pytest.approx(rev2Rad(2.0))
+    assert motor.getMotorVelocityRadPerSec() == motor.velRadPerSec
+    assert motor.getOutputCurrentA() == motor.outputCurrentA
+    assert motor.getMotorTemperatureC() == motor.motorTempC
+
+    SparkMaxWrangler().snapshotAll()
+    assert motor.getMotorPositionRad() == pytest.approx(rev2Rad(3.0))
+    destroyAllSingletonInstances()
+
+def test_snapshotGettersMarkFramesUsed():
+    motor = WrapperedSparkMax(61, "test_usage")
+    SparkMaxWrangler().waitForConfig(timeoutSec=30.0)
+    SparkMaxWrangler().snapshotAll()
+    motor.takeFrameUsage()
+
+    motor.getMotorPositionRad()
+    assert motor.takeFrameUsage() == (False, True)
+    motor.getOutputCurrentA()
+    assert motor.takeFrameUsage() == (True, False)
+    assert motor.takeFrameUsage() == (False, False)
+    destroyAllSingletonInstances()
+
+def _reconfigure(motor):
+    motor.connected = False
+    motor.configTries = 0
+    motor.configure()
+
+def test_factoryResetSkippedOnlyWithMarker():
+    motor = WrapperedSparkMax(62, "test_marker")
+    SparkMaxWrangler().waitForConfig(timeoutSec=30.0)
+    # A fresh controller has no marker, so gets reset, then marked
+    assert not motor.skippedFactoryReset
+    assert motor.pidCtrl.getIZone(CONFIG_MARKER_SLOT) == CONFIG_VERSION
+
+    # Like a code restart - same code set the controller up last time
+    _reconfigure(motor)
+    assert motor.connected
+    assert motor.skippedFactoryReset
+
+    # Set up by some other version of the code
+    motor.pidCtrl.setIZone(CONFIG_VERSION + 1, CONFIG_MARKER_SLOT)
+    _reconfigure(motor)
+    assert not motor.skippedFactoryReset
+    assert motor.pidCtrl.getIZone(CONFIG_MARKER_SLOT) == CONFIG_VERSION
+    destroyAllSingletonInstances()
@@ -1,7 +1,9 @@
+import threading
 import wpilib
 import ntcore as nt
 
 from utils.singleton import Singleton
+from utils.calibrationStore import CalibrationStore, defaultStorePath, STORE_VERSION
 
 class CalibrationWrangler(metaclass=Singleton):
     """
@@ -10,6 +12,63 @@ class CalibrationWrangler(metaclass=Singleton):
     """
     def __init__(self):
         self.calDict = {}
+        # Calibrations change a handful of times per session, so rather than check every one
+        # every loop, NT queues up an event whenever a new desired value arrives
+        self.desValPoller = nt.NetworkTableListenerPoller(nt.NetworkTableInstance.getDefault())
+        self.calsByListener = {}
+        # Calibrations whose current value or pending state needs publishing
+        self.dirtyCals = set()
+        # Persistent values, if enabled with loadStore()
+        self.store = None
+        # Values imported through the webserver, waiting to be applied on the main thread
+        self.importQueue = []
+        self.importLock = threading.Lock()
+
+    def loadStore(self, filePath=None):
+        """Turn on saving calibration values across reboots. Must be called before any
+        Calibrations are created, since they pick up their stored values when constructed.
+
+        Args:
+            filePath (str, optional): where to keep the values. Defaults to the RIO's home directory.
+        """
+        self.store = CalibrationStore(defaultStorePath() if filePath is None else filePath)
+
+    def flushStore(self):
+        if self.store is not None:
+            self.store.flush()
+
+    def getStoredValue(self, name):
+        return None if self.store is None else self.store.get(name)
+
+    def exportSnapshot(self):
+        """All calibrations' current desired values, in the same layout as the store file.
+        Safe to call from other threads.
+        """
+        return {"version": STORE_VERSION, "values": {name: cal.peek() for name, cal in list(self.calDict.items())}}
+
+    def importSnapshot(self, snapshot):
+        """Queue up values to be applied at the next update(). Safe to call from other threads.
+        Either every value is queued, or none are.
+
+        Args:
+            snapshot (dict): same layout as exportSnapshot() returns
+
+        Returns:
+            list[str]: names in the snapshot which don't match any calibration
+
+        Raises:
+            ValueError: the snapshot is from a different version, or has a non-numeric value
+        """
+        version = snapshot.get("version")
+        if version != STORE_VERSION:
+            raise ValueError(f"Calibration snapshot is version {version}, expected {STORE_VERSION}")
+        values = snapshot.get("values", {})
+        unknown = [name for name in values if name not in self.calDict]
+        # Convert everything before touching the queue, so a bad value can't leave half an import behind
+        imports = [(name, float(val)) for name, val in values.items() if name in self.calDict]
+        with self.importLock:
+            self.importQueue.extend(imports)
+        return unknown
         
     def register(self, cal):
         """Record that a new calibration is present and should be processed in the future
@@ -18,12 +77,38 @@ class CalibrationWrangler(metaclass=Singleton):
             cal (Calibration): the calibration to register
         """
         self.calDict[cal.name] = cal
+        listener = self.desValPoller.addListener(cal.desValueSubscriber,
+                                                 nt.EventFlags.kValueAll | nt.EventFlags.kImmediate)
+        self.calsByListener[listener] = cal
+        self.dirtyCals.add(cal)
+
+    def markDirty(self, cal):
+        self.dirtyCals.add(cal)
         
     def update(self):
-        """Update all calibrations. Should be called every 20ms
+        """Update calibrations with new desired values, and publish any changes. Should be called every 20ms
         """
-        for cal in self.calDict.values():
-            cal.update()
+        for event in self.desValPoller.readQueue():
+            cal = self.calsByListener.get(event.listener)
+            if cal is not None:
+                self._setAndSave(cal, event.data.value.getDouble())
+
+        if self.importQueue:
+            with self.importLock:
+                imports = self.importQueue
+                self.importQueue = []
+            for name, val in imports:
+                self._setAndSave(self.calDict[name], val)
+
+        if self.dirtyCals:
+            for cal in self.dirtyCals:
+                cal.publishState()
+            self.dirtyCals.clear()
+
+    def _setAndSave(self, cal, newVal):
+        cal.set(newVal)
+        if self.store is not None:
+            self.store.save(cal.name, cal.peek(), cal.getDefault())
 ###########################################
 # Public API
 ###########################################
@@ -38,14 +123,24 @@ class Calibration():
         self.name = name
         self.units = units
         self._default = float(default)
-        self._lastUpdateTime = 0
         self.min = minVal
         self.max = maxVal
         self._desValue = self._default
         self._curValue = self._default
         self._changed = False
+        self._wrangler = CalibrationWrangler()
+        # What's been published to NT so far, so it's only re-sent when it changes
+        self._pubCurValue = None
+        self._pubPending = None
+        self._changeCallbacks = []
         
         self.reset()
+
+        # Pick up the value it was last tuned to, if there is one
+        stored = self._wrangler.getStoredValue(name)
+        if stored is not None and self.max >= stored >= self.min:
+            self._desValue = stored
+            self._curValue = stored
         
         # Set up nt 
         table = nt.NetworkTableInstance.getDefault().getTable("Calibrations")
@@ -53,24 +148,27 @@ class Calibration():
         self.curValTopic = table.getDoubleTopic(name + "/curValue")
         self.curValuePublisher = self.curValTopic.publish(nt.PubSubOptions(
                                     sendAll=False, keepDuplicates=False))
-        self.curValuePublisher.setDefault(self._default)
+        self.curValuePublisher.setDefault(self._curValue)
         
         self.curValTopic.setProperty("units", str(self.units))
         self.curValTopic.setProperty("min_cal", float(self.min))
         self.curValTopic.setProperty("max_cal", float(self.max))
         self.curValTopic.setProperty("default_val", float(self._default))
         self.curValTopic.setProperty("pending", False)
+        self._pubCurValue = self._curValue
+        self._pubPending = False
         
         desValueTopic = table.getDoubleTopic(name + "/desValue")
         self.desValueSubscriber = desValueTopic.subscribe(self._default)
         
-        CalibrationWrangler().register(self)
+        self._wrangler.register(self)
         
     # Resets the value of the calibration back to its default
     def reset(self):
         self._desValue = self._default
         self._curValue = self._default
         self._changed = False
+        self._wrangler.markDirty(self)
 
     # Provides a new value to the calibration. This value will be returned on the next
     # call to `get()`. The `isChanged()` flag will return True until `get()` is called.
@@ -78,19 +176,35 @@ class Calibration():
         if self.max >= newVal >= self.min:
             self._changed = True
             self._desValue = newVal
+            self._wrangler.markDirty(self)
+            for callback in self._changeCallbacks:
+                callback(self)
         else:
             wpilib.reportWarning(f"[Calibration] Skipping value update for {self.name}," +
                                  " value {newVal} is out of range [{self.min},{self.max}]")
         
-    # Periodic update to read from the desired value on NT, and publish the current value
-    def update(self):
-        val = self.desValueSubscriber.getAtomic()
-        if val.time > self._lastUpdateTime :
-            self.set(val.value)
-            self._lastUpdateTime = val.time
-        self.curValuePublisher.set(self._curValue)
-        self.curValTopic.setProperty("pending", self._changed)
+    # Publish the current value and pending state to NT, if either has changed since last time.
+    # Called by the CalibrationWrangler, only for calibrations which have been touched.
+    def publishState(self):
+        if self._curValue != self._pubCurValue:
+            self.curValuePublisher.set(self._curValue)
+            self._pubCurValue = self._curValue
+        if self._changed != self._pubPending:
+            self.curValTopic.setProperty("pending", self._changed)
+            self._pubPending = self._changed
         
+    # Have `callback(cal)` called whenever the calibration is given a new value,
+    # for code which needs to react right away rather than check `isChanged()` every loop.
+    def addChangeCallback(self, callback):
+        self._changeCallbacks.append(callback)
+
+    # Latest value given to the calibration, without marking it as consumed
+    def peek(self):
+        return self._desValue
+
+    def getDefault(self):
+        return self._default
+
     # Returns True if the value is different than the last time `get()` was called. False otherwise.
     def isChanged(self):
         return self._changed
@@ -98,6 +212,8 @@ class Calibration():
     # Gets the current value of the calibration, resetting state internally with
     # the assumption the user's code is consuming the value and doing something useful with it.
     def get(self):
-        self._curValue = self._desValue
-        self._changed = False
+        if self._changed:
+            self._curValue = self._desValue
+            self._changed = False
+            self._wrangler.markDirty(self)
         return self._curValue
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+import wpilib
+
+# Bump this if the file layout changes. Files from a newer version are ignored, not overwritten.
+STORE_VERSION = 1
+
+# After a change, wait this long for more before writing, so a burst of tuning turns into one write
+STORE_WRITE_DELAY_S = 1.0
+
+# The RIO's own flash, not the log drive - calibrations shouldn't go away with the logs.
+# In simulation, next to the robot code rather than wherever it was launched from.
+def defaultStorePath():
+    if wpilib.RobotBase.isSimulation():
+        return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "simulationLogs", "calibrations.json"))
+    return "/home/lvuser/calibrations.json"
+
+# Keeps calibration values which have been tuned away from their defaults, in a JSON file
+# which survives reboots. Writes happen on a background thread, and each write goes to a
+# temporary file first, then replaces the old one - a power cut mid-write can't corrupt it.
+class CalibrationStore():
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.values = {}
+        self.lock = threading.Lock()
+        self.fileLock = threading.Lock()
+        self.writeRequested = threading.Event()
+        self.writerThread = None
+        self.writeEnabled = True
+        self._load()
+
+    def get(self, name):
+        """Stored value for a calibration, or None if it should use its default"""
+        return self.values.get(name)
+
+    def save(self, name, value, default):
+        """Record a calibration's new value. Values equal to the default aren't kept,
+        so changing the default in code still takes effect.
+        """
+        with self.lock:
+            if value == default:
+                if self.values.pop(name, None) is None:
+                    return
+            elif self.values.get(name) == value:
+                return
+            else:
+                self.values[name] = value
+
+        if self.writerThread is None:
+            self.writerThread = threading.Thread(target=self._writerLoop, name="CalStoreWriter", daemon=True)
+            self.writerThread.start()
+        self.writeRequested.set()
+
+    def flush(self):
+        """Write any pending changes right now. Call on shutdown."""
+        if self.writeRequested.is_set():
+            self.writeRequested.clear()
+            self._write()
+
+    def _load(self):
+        try:
+            with open(self.filePath, "r", encoding="utf-8") as inFile:
+                contents = json.load(inFile)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as err:
+            print(f"Warning, could not read calibration store {self.filePath}, using defaults: {err}")
+            return
+
+        version = contents.get("version") if isinstance(contents, dict) else None
+        if version != STORE_VERSION:
+            print(f"Warning, calibration store {self.filePath} is version {version}, expected {STORE_VERSION}."
+                  " Using defaults, and leaving the file alone.")
+            self.writeEnabled = False
+            return
+
+        self.values = {str(name): float(val) for name, val in contents.get("values", {}).items()}
+
+    def _writerLoop(self):
+        while True:
+            self.writeRequested.wait()
+            time.sleep(STORE_WRITE_DELAY_S)
+            self.writeRequested.clear()
+            self._write()
+
+    def _write(self):
+        if not self.writeEnabled:
+            return
+
+        with self.lock:
+            contents = {"version": STORE_VERSION, "values": dict(self.values)}
+
+        tmpPath = self.filePath + ".tmp"
+        with self.fileLock:
+            try:
+                with open(tmpPath, "w", encoding="utf-8") as outFile:
+                    json.dump(contents, outFile, separators=(",", ":"), sort_keys=True)
+                    outFile.flush()
+                    os.fsync(outFile.fileno())
+                os.replace(tmpPath, self.filePath)
+            except OSError as err:
+                print(f"Warning, could not write calibration store {self.filePath}: {err}")
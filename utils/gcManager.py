@@ -0,0 +1,82 @@
+import gc
+from utils.singleton import Singleton
+from utils.signalLogging import Signal, IntegerSignal, BooleanSignal
+from utils.loopBlackBox import getGcEventRecorder
+
+# Nominal robot loop period
+LOOP_PERIOD_S = 0.02
+
+# Slack needed at the end of a loop before we'll spend it on a collection of each generation.
+# Older generations have more objects to walk, so need more time.
+MIN_SLACK_S = (0.004, 0.008, 0.015)
+
+# If a generation's count gets this many times past its threshold without any slack
+# to collect in, collect it anyway, rather than let memory grow forever
+FORCE_COLLECT_FACTOR = 10
+
+# Takes over running python's garbage collector from the interpreter.
+# Automatic collection can kick in at any allocation, which means a random chunk of
+# the periodic loop can suddenly take several ms longer. Instead, while the robot is
+# enabled, collections are only run at the end of a loop, and only if there's time left over.
+class GcManager(metaclass=Singleton):
+    def __init__(self):
+        self.gcEventRecorder = getGcEventRecorder()
+        self.manualMode = False
+
+        self.gen0CountSig = IntegerSignal("GC Gen0 Collections", "count")
+        self.gen1CountSig = IntegerSignal("GC Gen1 Collections", "count")
+        self.gen2CountSig = IntegerSignal("GC Gen2 Collections", "count")
+        self.lastPauseSig = Signal("GC Last Pause", "ms")
+        self.manualModeSig = BooleanSignal("GC Manual Mode")
+
+    def freezeAfterInit(self):
+        """Call once at the end of robotInit(). Everything created so far is assumed to live
+        for the whole run, and is moved out of the collector's view so later collections are quicker.
+        """
+        gc.collect()
+        gc.freeze()
+
+    def update(self, loopExecDur, isEnabled):
+        """Call once per loop, right after SegmentTimeTracker.end()
+
+        Args:
+            loopExecDur (float): How long this loop took, in seconds
+            isEnabled (bool): True if the robot is enabled. Automatic collection is only turned off while enabled.
+        """
+        if isEnabled and not self.manualMode:
+            gc.disable()
+            self.manualMode = True
+        elif not isEnabled and self.manualMode:
+            gc.enable()
+            self.manualMode = False
+
+        if self.manualMode:
+            self._collectInSlack(LOOP_PERIOD_S - loopExecDur)
+
+        stats = gc.get_stats()
+        self.gen0CountSig.set(stats[0]["collections"])
+        self.gen1CountSig.set(stats[1]["collections"])
+        self.gen2CountSig.set(stats[2]["collections"])
+        events = self.gcEventRecorder.events
+        if events:
+            self.lastPauseSig.set(events[-1][3] * 1000.0)
+        self.manualModeSig.set(self.manualMode)
+
+    # Put things back how the interpreter had them, including
+    # handing the objects frozen in freezeAfterInit() back to the collector
+    def restoreAutomatic(self):
+        gc.unfreeze()
+        gc.enable()
+        self.manualMode = False
+
+    # Collect the oldest generation which is due, and which there's time for
+    def _collectInSlack(self, slack):
+        counts = gc.get_count()
+        thresholds = gc.get_threshold()
+
+        for gen in (2, 1, 0):
+            if thresholds[gen] <= 0 or counts[gen] < thresholds[gen]:
+                continue
+            if slack >= MIN_SLACK_S[gen] or counts[gen] >= thresholds[gen] * FORCE_COLLECT_FACTOR:
+                gc.collect(gen)
+                return
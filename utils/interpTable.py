@@ -0,0 +1,174 @@
+import array
+import bisect
+import itertools
+from utils.calibration import Calibration
+
+class InterpTable():
+    """
+    Lookup table over a grid of any number of inputs, with linear interpolation between grid
+    points along every input (bilinear for two inputs, trilinear for three, and so on).
+    Inputs past either end of an axis are held at that end.
+    """
+    def __init__(self, axes, values):
+        """
+        Args:
+            axes (list[list[float]]): grid points along each input, strictly increasing
+            values (list): output at each grid point, nested one list deep per axis.
+                ie, for two axes, values[i][j] is the output at (axes[0][i], axes[1][j]).
+        """
+        self.numAxes = len(axes)
+        self.axes = []
+        self.invWidths = []
+        for axis in axes:
+            if len(axis) == 0 or any(axis[idx + 1] <= axis[idx] for idx in range(len(axis) - 1)):
+                raise ValueError("InterpTable axes must be non-empty and strictly increasing")
+            self.axes.append(array.array('d', axis))
+            self.invWidths.append(array.array('d', [1.0 / (axis[idx + 1] - axis[idx])
+                                                    for idx in range(len(axis) - 1)]))
+
+        # Row-major strides - the last axis' points are next to each other
+        self.strides = [1] * self.numAxes
+        for axisIdx in range(self.numAxes - 2, -1, -1):
+            self.strides[axisIdx] = self.strides[axisIdx + 1] * len(self.axes[axisIdx + 1])
+
+        self.values = array.array('d', _flatten(values, [len(axis) for axis in self.axes]))
+
+        # Offset to, and which side of each axis, for every corner of a grid cell.
+        # Axes with only one point don't have an upper side to interpolate toward.
+        self.corners = []
+        for sides in itertools.product((0, 1), repeat=self.numAxes):
+            if all(len(self.axes[idx]) > 1 or not side for idx, side in enumerate(sides)):
+                self.corners.append((sum(s * stride for s, stride in zip(sides, self.strides)), sides))
+
+        # Per-axis interval the last lookup landed in, see MapLookup2D
+        self.hintIdx = [0] * self.numAxes
+        self._fracs = [0.0] * self.numAxes
+
+        # numpy copies of the axes, and a view of the values, made on the first lookupMany()
+        self._npAxes = None
+        self._npValues = None
+
+    def lookup(self, *inputs):
+        """Interpolated output at one point. Pass one input per axis."""
+        if len(inputs) != self.numAxes:
+            raise ValueError(f"InterpTable lookup got {len(inputs)} inputs for {self.numAxes} axes")
+        baseIdx = 0
+        fracs = self._fracs
+        for axisIdx, xval in enumerate(inputs):
+            lowIdx, fracs[axisIdx] = self._locate(axisIdx, xval)
+            baseIdx += lowIdx * self.strides[axisIdx]
+
+        result = 0.0
+        for offset, sides in self.corners:
+            weight = 1.0
+            for axisIdx, side in enumerate(sides):
+                weight *= fracs[axisIdx] if side else 1.0 - fracs[axisIdx]
+            if weight != 0.0:
+                result += weight * self.values[baseIdx + offset]
+        return result
+
+    def lookupMany(self, inputs):
+        """Look up many points at once
+
+        Args:
+            inputs (array-like): shape (number of points, number of axes)
+
+        Returns:
+            numpy.ndarray: output at each point, same as calling lookup() on each
+        """
+        import numpy as np # pylint: disable=import-outside-toplevel
+
+        if self._npAxes is None:
+            self._npAxes = [np.frombuffer(axis, dtype=np.float64) for axis in self.axes]
+            # A view, not a copy - cell updates show up without rebuilding it
+            self._npValues = np.frombuffer(self.values, dtype=np.float64)
+
+        points = np.asarray(inputs, dtype=np.float64)
+        if points.shape[-1:] != (self.numAxes,):
+            raise ValueError(f"InterpTable lookupMany got points of shape {points.shape} for {self.numAxes} axes")
+        points = points.reshape(-1, self.numAxes)
+        baseIdx = np.zeros(len(points), dtype=np.int64)
+        fracs = []
+        for axisIdx, axis in enumerate(self._npAxes):
+            if len(axis) == 1:
+                fracs.append(np.zeros(len(points)))
+                continue
+            xvals = np.clip(points[:, axisIdx], axis[0], axis[-1])
+            lowIdx = np.clip(np.searchsorted(axis, xvals, side='right') - 1, 0, len(axis) - 2)
+            fracs.append((xvals - axis[lowIdx]) / (axis[lowIdx + 1] - axis[lowIdx]))
+            baseIdx += lowIdx * self.strides[axisIdx]
+
+        result = np.zeros(len(points))
+        for offset, sides in self.corners:
+            weight = np.ones(len(points))
+            for axisIdx, side in enumerate(sides):
+                weight *= fracs[axisIdx] if side else 1.0 - fracs[axisIdx]
+            result += weight * self._npValues[baseIdx + offset]
+        return result
+
+    def setCell(self, gridIdx, value):
+        """Change the output at one grid point. Nothing else needs recomputing.
+
+        Args:
+            gridIdx (tuple[int]): index along each axis
+            value (float): new output
+        """
+        self.values[sum(idx * stride for idx, stride in zip(gridIdx, self.strides))] = value
+
+    # Interval along one axis, and how far into it (0-1) the input is
+    def _locate(self, axisIdx, xval):
+        axis = self.axes[axisIdx]
+        numPts = len(axis)
+        if numPts == 1 or xval <= axis[0]:
+            return 0, 0.0
+        if xval >= axis[-1]:
+            return numPts - 2, 1.0
+
+        idx = self.hintIdx[axisIdx]
+        if not axis[idx] <= xval < axis[idx + 1]:
+            if idx + 2 < numPts and axis[idx + 1] <= xval < axis[idx + 2]:
+                idx += 1
+            elif idx > 0 and axis[idx - 1] <= xval < axis[idx]:
+                idx -= 1
+            else:
+                idx = bisect.bisect_right(axis, xval) - 1
+            self.hintIdx[axisIdx] = idx
+        return idx, (xval - axis[idx]) * self.invWidths[axisIdx][idx]
+
+class CalibratedInterpTable(InterpTable):
+    """
+    InterpTable whose outputs can be tuned from the webpage. Every grid point gets its own
+    Calibration. When one is changed, only that point in the table is updated, right as the
+    new value arrives - there's no per-loop checking, and nothing else gets rebuilt.
+    """
+    def __init__(self, name, axes, values, *, units="", minVal=float('-Inf'), maxVal=float('Inf')):
+        """
+        Args:
+            name (str): prefix for each grid point's calibration name
+            axes (list[list[float]]): see InterpTable
+            values (list): default output at each grid point, see InterpTable
+            units (str, optional): units of the output
+            minVal (float, optional): lowest allowed output
+            maxVal (float, optional): highest allowed output
+        """
+        super().__init__(axes, values)
+        self.cals = []
+        for gridIdx in itertools.product(*[range(len(axis)) for axis in self.axes]):
+            pointStr = ", ".join(f"{self.axes[axisIdx][idx]:g}" for axisIdx, idx in enumerate(gridIdx))
+            flatIdx = sum(idx * stride for idx, stride in zip(gridIdx, self.strides))
+            cal = Calibration(f"{name} @ ({pointStr})", self.values[flatIdx], units, minVal, maxVal)
+            # Picks up any saved value from the calibration store
+            self.values[flatIdx] = cal.get()
+            cal.addChangeCallback(lambda changedCal, flatIdx=flatIdx: self._onCalChanged(flatIdx, changedCal))
+            self.cals.append(cal)
+
+    def _onCalChanged(self, flatIdx, cal):
+        self.values[flatIdx] = cal.get()
+
+# Nested lists, in row-major order, checking each level has the right length
+def _flatten(values, shape):
+    if len(values) != shape[0]:
+        raise ValueError(f"InterpTable values have {len(values)} entries where the axis has {shape[0]}")
+    if len(shape) == 1:
+        return [float(val) for val in values]
+    return [val for subList in values for val in _flatten(subList, shape[1:])]
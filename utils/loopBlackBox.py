@@ -0,0 +1,168 @@
+import array
+import collections
+import gc
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import wpilib
+
+from utils.extDriveManager import ExtDriveManager
+from utils.signalLogging import DoubleArraySignal
+
+# Histogram bins are this many ms wide. The last bin also catches everything past the end.
+HIST_BIN_WIDTH_MS = 1.0
+HIST_NUM_BINS = 60
+
+# Histograms are published once every this many loops
+HIST_PUBLISH_PERIOD_LOOPS = 50
+
+# Number of most recent loops kept for dumping after an overrun
+BLACK_BOX_LOOPS = 50
+
+# Number of most recent garbage collector runs kept
+BLACK_BOX_GC_EVENTS = 64
+
+# Limits on overrun dumps, so an unhealthy robot can't fill up the drive
+MIN_DUMP_INTERVAL_S = 5.0
+MAX_DUMPS = 20
+
+# Fixed-memory count of how often a value landed in each range
+class LoopHistogram():
+    def __init__(self, binWidthMs=HIST_BIN_WIDTH_MS, numBins=HIST_NUM_BINS):
+        self.binWidthMs = binWidthMs
+        self.counts = array.array('L', [0] * numBins)
+
+    def add(self, valueMs):
+        binIdx = int(valueMs / self.binWidthMs)
+        self.counts[max(0, min(binIdx, len(self.counts) - 1))] += 1
+
+    def getCounts(self):
+        return list(self.counts)
+
+# Records every run of python's garbage collector, with how long it took.
+# Installed once per process, since gc.callbacks is global.
+class GcEventRecorder():
+    def __init__(self):
+        self.events = collections.deque(maxlen=BLACK_BOX_GC_EVENTS)
+        self.startTime = 0.0
+        gc.callbacks.append(self._callback)
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self.startTime = time.perf_counter()
+        else:
+            duration = time.perf_counter() - self.startTime
+            self.events.append((wpilib.Timer.getFPGATimestamp(), info["generation"], info["collected"], duration))
+
+    def getEvents(self):
+        return list(self.events)
+
+_gcEventRecorder = None # pylint: disable=invalid-name
+
+def getGcEventRecorder():
+    global _gcEventRecorder # pylint: disable=global-statement
+    if _gcEventRecorder is None:
+        _gcEventRecorder = GcEventRecorder()
+    return _gcEventRecorder
+
+# "Black box" flight recorder for the periodic loop.
+# Keeps histograms of loop period and duration for the whole run, plus a rolling record
+# of the last few loops. Whenever a loop overruns, that record is written out to a file on the
+# log drive, so intermittent slow loops can be picked apart after the match.
+class LoopBlackBox():
+    def __init__(self):
+        self.periodHist = LoopHistogram()
+        self.durationHist = LoopHistogram()
+        self.periodHistSig = DoubleArraySignal("LoopPeriodHistogram", "count")
+        self.durationHistSig = DoubleArraySignal("LoopDurationHistogram", "count")
+
+        # Ring of the most recent loops - each slot is reused, rather than reallocated
+        self.loopRecords = [{'time': 0.0, 'period': 0.0, 'duration': 0.0, 'sections': []}
+                            for _ in range(BLACK_BOX_LOOPS)]
+        self.loopRecordIdx = 0
+        self.loopRecordCount = 0
+        self.loopCount = 0
+
+        self.gcRecorder = getGcEventRecorder()
+
+        self.lastDumpTime = None
+        self.dumpCount = 0
+        # Thread writing the most recent dump out, if any
+        self.dumpThread = None
+
+    def record(self, loopStartTime, period, duration, sectionTimes):
+        """Record one loop. Call once per loop.
+
+        Args:
+            loopStartTime (float): FPGA time the loop started at, in seconds
+            period (float): Time since the previous loop started, in seconds
+            duration (float): How long this loop took to run, in seconds
+            sectionTimes (list): (section path, seconds) for each profiled section which ran this loop
+        """
+        self.periodHist.add(period * 1000.0)
+        self.durationHist.add(duration * 1000.0)
+
+        rec = self.loopRecords[self.loopRecordIdx]
+        rec['time'] = loopStartTime
+        rec['period'] = period
+        rec['duration'] = duration
+        rec['sections'] = sectionTimes
+        self.loopRecordIdx = (self.loopRecordIdx + 1) % BLACK_BOX_LOOPS
+        self.loopRecordCount = min(self.loopRecordCount + 1, BLACK_BOX_LOOPS)
+
+        self.loopCount += 1
+        if self.loopCount % HIST_PUBLISH_PERIOD_LOOPS == 0:
+            self.periodHistSig.set(self.periodHist.getCounts())
+            self.durationHistSig.set(self.durationHist.getCounts())
+
+    def dumpOnOverrun(self, overrunCount):
+        """Write the recent loop record to the log drive. The copy is taken now, but the write
+        happens on a background thread so it doesn't make the overrun any worse.
+        Rate limited, and silently skipped if there's no log drive.
+        """
+        if not ExtDriveManager().isConnected() or self.dumpCount >= MAX_DUMPS:
+            return
+
+        now = time.monotonic()
+        if self.lastDumpTime is not None and (now - self.lastDumpTime) < MIN_DUMP_INTERVAL_S:
+            return
+        self.lastDumpTime = now
+        self.dumpCount += 1
+
+        # Oldest loop first
+        loops = []
+        for offset in range(self.loopRecordCount):
+            rec = self.loopRecords[(self.loopRecordIdx - self.loopRecordCount + offset) % BLACK_BOX_LOOPS]
+            loops.append({
+                'time': rec['time'],
+                'periodMs': rec['period'] * 1000.0,
+                'durationMs': rec['duration'] * 1000.0,
+                'sectionsMs': {path: secTime * 1000.0 for path, secTime in rec['sections']},
+            })
+
+        dump = {
+            'overrunCount': overrunCount,
+            'wallTime': datetime.now().isoformat(),
+            'fpgaTime': wpilib.Timer.getFPGATimestamp(),
+            'loops': loops,
+            'gcEvents': [{'fpgaTime': evTime, 'generation': gen, 'collected': collected,
+                          'durationMs': dur * 1000.0}
+                         for evTime, gen, collected, dur in self.gcRecorder.getEvents()],
+            'histBinWidthMs': HIST_BIN_WIDTH_MS,
+            'periodHist': self.periodHist.getCounts(),
+            'durationHist': self.durationHist.getCounts(),
+        }
+
+        fileName = f"overrun_{datetime.now():%Y%m%d_%H%M%S}_{overrunCount}.json"
+        filePath = os.path.join(ExtDriveManager().getLogStoragePath(), fileName)
+        self.dumpThread = threading.Thread(target=_writeDump, args=(filePath, dump), name="BlackBoxDump", daemon=True)
+        self.dumpThread.start()
+
+def _writeDump(filePath, dump):
+    try:
+        with open(filePath, "w", encoding="utf-8") as outFile:
+            json.dump(dump, outFile, indent=1)
+    except OSError as err:
+        print(f"Warning, could not write loop overrun dump {filePath}: {err}")
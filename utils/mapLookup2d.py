@@ -1,52 +1,73 @@
+import array
+import bisect
 from operator import itemgetter
 
-# pylint: disable=too-few-public-methods
 class MapLookup2D():
+    """
+    Piecewise-linear lookup table. Points are copied into flat arrays once, along with the
+    slope of each interval, so a lookup is just finding the right interval and one multiply.
+    """
     # points should be a list of two-element tuples, with (x,y) pairs described by each tuple.
     def __init__(self, points:list[tuple[float,float]]):
-        self.points = points 
-        # Ensure points list is ordered from lowest value to highest value
-        self.points.sort(key=itemgetter(0))
+        # Ordered from lowest x value to highest. The caller's list is left alone.
+        self.points = sorted(points, key=itemgetter(0))
+        self.xs = array.array('d', [pt[0] for pt in self.points])
+        self.ys = array.array('d', [pt[1] for pt in self.points])
+        # Zero-width intervals (repeated x values) can never be landed in, so their slope doesn't matter
+        self.slopes = array.array('d', [0.0] * max(len(self.points) - 1, 0))
+        for idx in range(len(self.points) - 1):
+            xDelta = self.xs[idx + 1] - self.xs[idx]
+            if xDelta != 0.0:
+                self.slopes[idx] = (self.ys[idx + 1] - self.ys[idx]) / xDelta
+
+        # Interval the last lookup landed in. Inputs usually change slowly, so the next lookup
+        # is very likely in the same interval or one next to it - no need to search.
+        self.hintIdx = 0
+
+        # numpy copies of xs and ys, made on the first lookupMany()
+        self._npXs = None
+        self._npYs = None
         
     def lookup(self, xval):
-        yval = 0
-        if len(self.points) == 0 :
-            pass # case, no points. nothing we can do.
-        elif len(self.points) == 1 :
-            # One point. yup, that's the one.s
-            yval = self._y(0)
-        else:
-            # multiple points. Normal algorithm applies
-            xMin = self._x(0)
-            xMax = self._x(-1)
-            if(xval < xMin):
-                # off the lower end of the map, return smallest defined point
-                return self._y(0)
-            elif(xval > xMax):
-                # off the upper end of the map, return the highest defined point
-                return self._y(-1)
+        xs = self.xs
+        numPts = len(xs)
+        if numPts == 0:
+            return 0 # case, no points. nothing we can do.
+        elif xval <= xs[0]:
+            # off the lower end of the map (or only one point), return smallest defined point
+            return self.ys[0]
+        elif xval >= xs[-1]:
+            # off the upper end of the map, return the highest defined point
+            return self.ys[-1]
+
+        # Within the map - find the interval with xs[idx] <= xval < xs[idx+1]
+        idx = self.hintIdx
+        if not xs[idx] <= xval < xs[idx + 1]:
+            if idx + 2 < numPts and xs[idx + 1] <= xval < xs[idx + 2]:
+                idx += 1
+            elif idx > 0 and xs[idx - 1] <= xval < xs[idx]:
+                idx -= 1
             else:
-                # Within the map
-                lowerIndex = 0
-                # Iterate over the xAxis array to find the interval that req_x_val falls within
-                # Note this only works because xAxis is sorted.
-                for indexIter in range(0,len(self.points)-1):
-                    if self._x(indexIter) <= xval <= self._x(indexIter+1):
-                        lowerIndex = indexIter
-                        break
-                    
-                # math math math math mathy math
-                intervalXDelta = self._x(lowerIndex + 1) - self._x(lowerIndex)
-                intervalYDelta = self._y(lowerIndex + 1) - self._y(lowerIndex)
-                reqFractionIntoInterval = (xval - self._x(lowerIndex)) / intervalXDelta
-                return (reqFractionIntoInterval * intervalYDelta) + self._y(lowerIndex)
-            
-        return yval
-    
-    # pylint: disable=invalid-name
-    def _x(self, idx):
-        return self.points[idx][0]
-    
-    # pylint: disable=invalid-name
-    def _y(self, idx):
-        return self.points[idx][1]
\ No newline at end of file
+                idx = bisect.bisect_right(xs, xval) - 1
+            self.hintIdx = idx
+
+        return self.ys[idx] + self.slopes[idx] * (xval - xs[idx])
+
+    def lookupMany(self, xvals):
+        """Look up many values at once
+
+        Args:
+            xvals (array-like): input values
+
+        Returns:
+            numpy.ndarray: output value for each input, same as calling lookup() on each
+        """
+        import numpy as np # pylint: disable=import-outside-toplevel
+
+        if len(self.xs) == 0:
+            return np.zeros(np.shape(xvals))
+        if self._npXs is None:
+            self._npXs = np.frombuffer(self.xs, dtype=np.float64)
+            self._npYs = np.frombuffer(self.ys, dtype=np.float64)
+        # interp() also holds the end values past either end of the map
+        return np.interp(xvals, self._npXs, self._npYs)
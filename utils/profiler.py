@@ -0,0 +1,185 @@
+import array
+import functools
+import threading
+import time
+from utils.singleton import Singleton
+from utils.signalLogging import Signal
+
+# Number of loops of history kept for each section's stats - 5 seconds at 20ms per loop
+PROFILE_WINDOW_LOOPS = 250
+
+# Stats are recomputed and published once every this many loops, rather than every loop
+PROFILE_STATS_PERIOD_LOOPS = 50
+
+# Name of the section covering the whole loop. Every other section sits underneath it.
+# It's timed by the profiler itself, from the start of the loop's first section (or the
+# start of robotPeriodic(), if that's sooner) to the end of the loop, so it always covers
+# every section - including ones in the mode periodic functions, which run before robotPeriodic().
+ROOT_SECTION_NAME = "Loop"
+
+# One named chunk of code being timed. Sections nest - a section started while another
+# is running becomes its child, and is identified by the full path of names down to it.
+class ProfileSection():
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.path = name if parent is None else f"{parent.path}/{name}"
+        self.children = []
+
+        # Total time spent in this section each loop, for the last PROFILE_WINDOW_LOOPS loops it ran in
+        self.samples = array.array('d', [0.0] * PROFILE_WINDOW_LOOPS)
+        self.sampleIdx = 0
+        self.sampleCount = 0
+
+        self.loopTotal = 0.0
+        self.ranThisLoop = False
+        self.lastLoopTime = 0.0
+
+        # Stats over the window, in ms. Updated every PROFILE_STATS_PERIOD_LOOPS loops.
+        self.minMs = 0.0
+        self.meanMs = 0.0
+        self.p99Ms = 0.0
+        self.maxMs = 0.0
+
+        self.minSig = Signal(f"Profile/{self.path}/min", "ms")
+        self.meanSig = Signal(f"Profile/{self.path}/mean", "ms")
+        self.p99Sig = Signal(f"Profile/{self.path}/p99", "ms")
+        self.maxSig = Signal(f"Profile/{self.path}/max", "ms")
+
+    def addTime(self, duration):
+        self.loopTotal += duration
+        self.ranThisLoop = True
+
+    # Move this loop's total into the history. Loops the section didn't run in aren't counted.
+    def endLoop(self):
+        self.lastLoopTime = self.loopTotal
+        if self.ranThisLoop:
+            self.samples[self.sampleIdx] = self.loopTotal
+            self.sampleIdx = (self.sampleIdx + 1) % PROFILE_WINDOW_LOOPS
+            self.sampleCount = min(self.sampleCount + 1, PROFILE_WINDOW_LOOPS)
+            self.loopTotal = 0.0
+            self.ranThisLoop = False
+
+    def updateStats(self):
+        if self.sampleCount == 0:
+            return
+
+        window = sorted(self.samples[:self.sampleCount])
+        self.minMs = window[0] * 1000.0
+        self.meanMs = sum(window) / self.sampleCount * 1000.0
+        self.p99Ms = window[int(0.99 * (self.sampleCount - 1))] * 1000.0
+        self.maxMs = window[-1] * 1000.0
+
+        self.minSig.set(self.minMs)
+        self.meanSig.set(self.meanMs)
+        self.p99Sig.set(self.p99Ms)
+        self.maxSig.set(self.maxMs)
+
+    # Nested dictionary of this section's stats and all its children's, for the webserver
+    def getBreakdown(self):
+        return {
+            'name': self.name,
+            'min': self.minMs,
+            'mean': self.meanMs,
+            'p99': self.p99Ms,
+            'max': self.maxMs,
+            'children': [child.getBreakdown() for child in list(self.children)],
+        }
+
+# Wrangler for timing named sections of the periodic loop.
+# Sections are only timed on the main robot thread - anything profiled from another
+# thread just runs untimed, so background threads can't scramble the nesting.
+class LoopProfiler(metaclass=Singleton):
+    def __init__(self):
+        self.mainThreadId = threading.main_thread().ident
+        self.root = ProfileSection(ROOT_SECTION_NAME, None)
+        self.sections = [self.root]
+        self.sectionsByPath = {self.root.path: self.root}
+        # Sections currently running, innermost last, along with when each started
+        self.stack = []
+        self.loopCount = 0
+        # When the root section started this loop, or None if nothing's happened yet
+        self.loopStartTime = None
+
+    # Called by SegmentTimeTracker at the start of robotPeriodic()
+    def startLoop(self):
+        if self.loopStartTime is None:
+            self.loopStartTime = time.perf_counter()
+
+    def enter(self, name):
+        if threading.get_ident() != self.mainThreadId:
+            return
+
+        if not self.stack and self.loopStartTime is None:
+            self.loopStartTime = time.perf_counter()
+
+        parent = self.stack[-1][0] if self.stack else self.root
+        section = self.sectionsByPath.get(f"{parent.path}/{name}")
+        if section is None:
+            section = ProfileSection(name, parent)
+            parent.children.append(section)
+            self.sections.append(section)
+            self.sectionsByPath[section.path] = section
+
+        self.stack.append((section, time.perf_counter()))
+
+    def exit(self):
+        if threading.get_ident() != self.mainThreadId:
+            return
+
+        section, startTime = self.stack.pop()
+        section.addTime(time.perf_counter() - startTime)
+
+    # Close out one loop's worth of timing. Called by SegmentTimeTracker at the end of each loop.
+    def endLoop(self):
+        if self.loopStartTime is not None:
+            self.root.addTime(time.perf_counter() - self.loopStartTime)
+            self.loopStartTime = None
+        for section in self.sections:
+            section.endLoop()
+
+        self.loopCount += 1
+        if self.loopCount % PROFILE_STATS_PERIOD_LOOPS == 0:
+            for section in self.sections:
+                section.updateStats()
+
+    def getBreakdown(self):
+        return self.root.getBreakdown()
+
+    # (path, seconds) for each section which ran in the loop that just ended
+    def getLastLoopTimes(self):
+        return [(section.path, section.lastLoopTime) for section in self.sections if section.lastLoopTime > 0.0]
+
+###########################################
+# Public API
+###########################################
+
+class _ProfileBlock():
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        LoopProfiler().enter(self.name)
+        return self
+
+    def __exit__(self, *args):
+        LoopProfiler().exit()
+
+# Time a block of code as a named section
+# Usage:
+#   with profile("Drivetrain"):
+#       self.driveTrain.update()
+def profile(name):
+    return _ProfileBlock(name)
+
+# Decorator to time every call to a function as a named section
+# Defaults to naming the section after the function
+def profiled(name=None):
+    def decorator(func):
+        sectionName = func.__qualname__ if name is None else name
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _ProfileBlock(sectionName):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
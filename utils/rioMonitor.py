@@ -5,7 +5,7 @@ import subprocess
 from wpilib import RobotController
 from wpilib import RobotBase
 from utils.faults import Fault
-from utils.signalLogging import log
+from utils.signalLogging import Signal, IntegerSignal, log
 
 
 # Records faults and runtime metrics for the roboRIO
@@ -21,6 +21,14 @@ class RIOMonitor():
         self.prevSystemTime = 0
         self.prevIdleTime = 0
 
+        # Most of these change slowly - only publish them when they've moved noticeably
+        self.sdCardUsageSig = Signal("RIO SD Card Disk Usage", "pct", deadband=0.1)
+        self.canBusUsageSig = Signal("RIO CAN Bus Usage", "pct", deadband=0.5)
+        self.canBusErrCountSig = IntegerSignal("RIO CAN Bus Err Count", "count", deadband=0)
+        self.supplyVoltageSig = Signal("RIO Supply Voltage", "V", deadband=0.01)
+        self.cpuLoadSig = Signal("RIO CPU Load", "pct", deadband=0.5)
+        self.memUsageSig = Signal("RIO Memory Usage", "pct", deadband=0.1)
+
         self.thread1 = Thread(target=self._updateFast,daemon=True)
         self.thread2 = Thread(target=self._updateSlow,daemon=True)
         self.runCmd = True
@@ -67,21 +75,21 @@ class RIOMonitor():
 
                         pctUsed = usedBytes / float(usedBytes + availBytes) * 100.0
                         if(mountDir == "/"):
-                            log("RIO SD Card Disk Usage", pctUsed, "pct")
+                            self.sdCardUsageSig.set(pctUsed)
                         elif(mountDir.startswith("/media")):
                             mountDir = mountDir.replace("/", "\\")
-                            log(f"RIO USB {mountDir} Disk Usage", pctUsed, "pct")
+                            # USB mount points aren't known ahead of time, look these up by name
+                            log(f"RIO USB {mountDir} Disk Usage", pctUsed, "pct", deadband=0.1)
 
 
     def _updateCANStats(self):
         status = RobotController.getCANStatus()
-        log("RIO CAN Bus Usage", status.percentBusUtilization, "pct")
-        log("RIO CAN Bus Err Count", status.txFullCount + 
-                                     status.receiveErrorCount + 
-                                     status.transmitErrorCount, 
-                                     "count")
+        self.canBusUsageSig.set(status.percentBusUtilization)
+        self.canBusErrCountSig.set(status.txFullCount + 
+                                   status.receiveErrorCount + 
+                                   status.transmitErrorCount)
     def _updateVoltages(self):
-        log("RIO Supply Voltage", RobotController.getInputVoltage(), "V")
+        self.supplyVoltageSig.set(RobotController.getInputVoltage())
         if(not RobotController.isBrownedOut()):
             self.railFault3p3v.set(not RobotController.getEnabled3V3())
             self.railFault5v.set(not RobotController.getEnabled5V())
@@ -129,7 +137,7 @@ class RIOMonitor():
 
                 # Calculate and log  the Load Percent as percentage of 
                 # total time that we were not idle
-                log("RIO CPU Load", totalInUseTime/totalTime * 100.0, "pct")
+                self.cpuLoadSig.set(totalInUseTime/totalTime * 100.0)
 
                 # Remember current stats for next time
                 self.prevUserTime   = curUserTime   
@@ -163,4 +171,4 @@ class RIOMonitor():
                     return # Skip this time if we couldn't parse out values
 
 
-                log("RIO Memory Usage", (1.0 - curFreeMem/curTotalMem) * 100.0, "pct")
+                self.memUsageSig.set((1.0 - curFreeMem/curTotalMem) * 100.0)
@@ -1,6 +1,8 @@
 import wpilib
 
-from utils.signalLogging import log
+from utils.signalLogging import Signal, IntegerSignal
+from utils.profiler import LoopProfiler
+from utils.loopBlackBox import LoopBlackBox
 
 # Utilties for tracking how long certain chunks of code take
 # including logging overall loop execution time
@@ -14,12 +16,17 @@ class SegmentTimeTracker():
         self.curPeriod = 0
         self.curLoopExecDur = 0
         self.numOfOverRuns = 0
+        self.loopPeriodSig = Signal("LoopPeriod", "ms")
+        self.loopDurationSig = Signal("LoopDuration", "ms")
+        self.loopEndTimeSig = Signal("LoopEndTime", "s")
+        self.overRunCountSig = IntegerSignal("CountOfOverRuns", "count", deadband=0)
+        self.blackBox = LoopBlackBox()
     
     def start(self):
         self.tracer.clearEpochs()
         self.prevLoopStartTime = self.loopStartTime
         self.loopStartTime = wpilib.Timer.getFPGATimestamp()
-
+        LoopProfiler().startLoop()
         
     def mark(self, name):
         self.tracer.addEpoch(name)
@@ -28,10 +35,14 @@ class SegmentTimeTracker():
         self.loopEndTime = wpilib.Timer.getFPGATimestamp()
         self.curPeriod = self.loopStartTime - self.prevLoopStartTime
         self.curLoopExecDur = self.loopEndTime - self.loopStartTime
+        LoopProfiler().endLoop()
+        self.blackBox.record(self.loopStartTime, self.curPeriod, self.curLoopExecDur,
+                             LoopProfiler().getLastLoopTimes())
         if(self.curLoopExecDur > self.longLoopThresh):
             self.numOfOverRuns += 1
             self.tracer.printEpochs()
-        log("LoopPeriod", self.curPeriod * 1000.0, "ms")
-        log("LoopDuration", self.curLoopExecDur * 1000.0, "ms")
-        log("LoopEndTime", self.loopEndTime*1000.0*1000.0, "s")
-        log("CountOfOverRuns", self.numOfOverRuns, "count")
+            self.blackBox.dumpOnOverrun(self.numOfOverRuns)
+        self.loopPeriodSig.set(self.curPeriod * 1000.0)
+        self.loopDurationSig.set(self.curLoopExecDur * 1000.0)
+        self.loopEndTimeSig.set(self.loopEndTime*1000.0*1000.0)
+        self.overRunCountSig.set(self.numOfOverRuns)
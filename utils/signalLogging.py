@@ -1,3 +1,6 @@
+import queue
+import threading
+import traceback
 import wpilib
 import ntcore as nt
 import wpiutil._wpiutil.log as wpilog # pylint: disable=import-error,no-name-in-module
@@ -6,6 +9,10 @@ from utils.singleton import Singleton
 
 BASE_TABLE = "SmartDashboard"
 
+# Rough size of one double sample, as sent over NT4 and as written in a wpilog record.
+# Only used to estimate how much the per-signal publish policies are saving us.
+EST_BYTES_PER_SAMPLE = 20
+
 # Wrangler for coordinating the set of all signals
 class SignalWrangler(metaclass=Singleton):
 
@@ -14,71 +21,346 @@ class SignalWrangler(metaclass=Singleton):
     def __init__(self):
         # Default to publishing things under Shuffleboard, which makes things more available
         self.table = nt.NetworkTableInstance.getDefault().getTable(BASE_TABLE)
-        self.publishedSigDict = {}
-        self.sigUnitsDict = {}
-        self.sampleList = []
 
+        # Flat list of every registered signal handle, walked once per loop
+        self.signalList = []
+        # Name to handle lookup, only used by the `log()` compatibility shim
+        self.signalDict = {}
+
+        self.log = None
         if(ExtDriveManager().isConnected()):
             wpilib.DataLogManager.start(dir=ExtDriveManager().getLogStoragePath())
             wpilib.DataLogManager.logNetworkTables(False) # We have a lot of things in NT that don't need to be logged
             self.log = wpilib.DataLogManager.getLog()
 
+        # Background writer state - only used after startBackgroundPublish() is called
+        self.writerThread = None
+        self.fullBufQueue = queue.Queue()
+        self.freeBufQueue = queue.Queue()
+        self.overrunCount = 0
+        self.droppedSampleCount = 0
+        self.writeErrorCount = 0
+        self.overrunCountSig = None
+        self.droppedSampleCountSig = None
+        self.writeErrorCountSig = None
+
+        # Summary of samples the per-signal publish policies filtered out. Created on
+        # the first publish, since signals can't be made while the wrangler is being constructed.
+        self.skippedSampleCountSig = None
+        self.savedBytesSig = None
+
+    def startBackgroundPublish(self, maxQueueDepth=4):
+        """Opt in to publishing from a dedicated writer thread. After this, `publishPeriodic()`
+        only copies this loop's samples into a buffer and hands it to the writer, which does
+        the (potentially slow) NT and log file writes.
+
+        Args:
+            maxQueueDepth (int, optional): Number of loops' worth of samples which may be waiting
+            on the writer at once. If the writer falls further behind than this, new loops' samples
+            are dropped. Defaults to 4.
+        """
+        if self.writerThread is not None:
+            return
+
+        self.overrunCountSig = IntegerSignal("SignalWrangler Writer Overruns", "count")
+        self.droppedSampleCountSig = IntegerSignal("SignalWrangler Dropped Samples", "count")
+        self.writeErrorCountSig = IntegerSignal("SignalWrangler Write Errors", "count")
+
+        # Preallocate every buffer up front. The free queue holding them is what bounds the depth.
+        for _ in range(maxQueueDepth):
+            self.freeBufQueue.put([])
+
+        self.writerThread = threading.Thread(target=self._writerLoop, name="SignalWriter", daemon=True)
+        self.writerThread.start()
+
+    def stopBackgroundPublish(self):
+        """Write out every sample still queued, then stop the writer thread.
+        Safe to call even if background publishing was never started.
+        """
+        if self.writerThread is None:
+            return
+
+        self.fullBufQueue.put(None) # Tells the writer to stop once it's drained everything before this
+        self.writerThread.join()
+        self.writerThread = None
+
+        if self.log is not None:
+            self.log.flush()
+
+    # Set up the NT publisher and log file entry for a new signal handle.
+    # Done once, at signal construction time, so the periodic loop never has to.
+    def register(self, sig):
+        if sig.name in self.signalDict:
+            # Someone already made a signal with this name - share its publishers,
+            # which only works if they hold the same type of value
+            existing = self.signalDict[sig.name]
+            if type(existing) is not type(sig): # pylint: disable=unidiomatic-typecheck
+                raise TypeError(f"Signal {sig.name} already exists as a {type(existing).__name__}, "
+                                f"can't also make it a {type(sig).__name__}")
+            sig.pub = existing.pub
+            sig.logEntry = existing.logEntry
+        else:
+            # Set up NT publishing, with the topic type matching the kind of signal
+            sigTopic = sig.makeTopic(self.table)
+            sig.pub = sigTopic.publish(nt.PubSubOptions(
+                sendAll=True, keepDuplicates=True))
+            sig.pub.setDefault(sig.DEFAULT_VALUE)
+
+            if sig.units is not None:
+                sigTopic.setProperty("units", str(sig.units))
+
+            # Set up log file publishing if enabled
+            if self.log is not None:
+                sig.logEntry = sig.makeLogEntry(self.log, sigNameToNT4TopicName(sig.name))
+            else:
+                sig.logEntry = None
+
+            self.signalDict[sig.name] = sig
+
+        self.signalList.append(sig)
+
+    # Get the handle for a named signal, creating it on first use
+    def getSignal(self, name, units=None, decimation=1, deadband=None):
+        sig = self.signalDict.get(name)
+        if sig is None:
+            sig = Signal(name, units, decimation, deadband)
+        return sig
+
     # Periodic value update
     # Should be called once per periodic loop
-    # Synchronously puts all `log()`'ed numbers to both disc and
-    # Will empty all the samples from the sampleList and put them into NT and disk
-
+    # Puts every signal which was `set()` this loop, and which passes its publish
+    # policy, to both NT and disk - either synchronously, or by handing them off
+    # to the background writer if it's running
     def publishPeriodic(self):
+        if self.skippedSampleCountSig is None:
+            self.skippedSampleCountSig = IntegerSignal("SignalWrangler Skipped Samples", "count")
+            self.savedBytesSig = IntegerSignal("SignalWrangler Saved Bytes", "bytes")
+
         time = nt._now() # pylint: disable=W0212
-        for sample in self.sampleList:
-            name = sample[0]
-            value = sample[1]
-
-            if not name in self.publishedSigDict:
-                # New signal found!
-
-                # Set up NT publishing
-                sigTopic = self.table.getDoubleTopic(name)
-                sigPub = sigTopic.publish(nt.PubSubOptions(
-                    sendAll=True, keepDuplicates=True))
-                sigPub.setDefault(0)
-                
-                if name in self.sigUnitsDict:
-                    unitsStr = self.sigUnitsDict[name]
-                    sigTopic.setProperty("units", str(unitsStr))
-
-                # Set up log file publishing if enabled
-                if(ExtDriveManager().isConnected()):
-                    sigLog = wpilog.DoubleLogEntry(log=self.log, name=sigNameToNT4TopicName(name))
-                else:
-                    sigLog = None
-
-                # Remember handles for both
-                self.publishedSigDict[name] = (sigPub, sigLog)
-
-            # Publish value to NT
-            self.publishedSigDict[name][0].set(value, time)
-            # Put value to log file
-            if(ExtDriveManager().isConnected()):
-                self.publishedSigDict[name][1].append(value, time)
-
-        # Reset sample list back to empty for next loop
-        self.sampleList = []
-
-    # Tack on a new floating point number sample
-    def addSampleForThisLoop(self, name, value):
-        self.sampleList.append((name, value))
+        if self.writerThread is None:
+            skippedCount = 0
+            for sig in self.signalList:
+                if sig.pending:
+                    sig.pending = False
+                    if sig.checkPublishPolicy():
+                        # Publish value to NT
+                        sig.pub.set(sig.value, time)
+                        # Put value to log file
+                        if sig.logEntry is not None:
+                            sig.logEntry.append(sig.value, time)
+                    else:
+                        skippedCount += 1
+        else:
+            skippedCount = self._handOffToWriter(time)
+
+        # Each skipped sample saves one NT message, and one log file record if logging
+        logMult = 2 if self.log is not None else 1
+        self.skippedSampleCountSig.set(skippedCount)
+        self.savedBytesSig.set(skippedCount * EST_BYTES_PER_SAMPLE * logMult)
+
+    # Copy this loop's samples into a free buffer and queue it up for the writer thread
+    # Returns the number of samples skipped by their signal's publish policy
+    def _handOffToWriter(self, time):
+        skippedCount = 0
+
+        try:
+            buf = self.freeBufQueue.get_nowait()
+        except queue.Empty:
+            buf = None
+
+        if buf is None:
+            # Writer has fallen behind and every buffer is still queued. Drop this loop's samples.
+            self.overrunCount += 1
+            for sig in self.signalList:
+                if sig.pending:
+                    sig.pending = False
+                    self.droppedSampleCount += 1
+        else:
+            for sig in self.signalList:
+                if sig.pending:
+                    sig.pending = False
+                    if sig.checkPublishPolicy():
+                        buf.append((sig, sig.value))
+                    else:
+                        skippedCount += 1
+            self.fullBufQueue.put((time, buf))
+
+        self.overrunCountSig.set(self.overrunCount)
+        self.droppedSampleCountSig.set(self.droppedSampleCount)
+        self.writeErrorCountSig.set(self.writeErrorCount)
+        return skippedCount
+
+    # Writer thread main loop - drains queued buffers into NT and the log file
+    def _writerLoop(self):
+        while True:
+            item = self.fullBufQueue.get()
+            if item is None:
+                break
+
+            time, buf = item
+            try:
+                for sig, value in buf:
+                    self._writeSample(sig, value, time)
+            finally:
+                # Always give the buffer back for reuse. A lost buffer would eventually
+                # count every loop as an overrun.
+                buf.clear()
+                self.freeBufQueue.put(buf)
+
+    # Write one sample from the writer thread. One bad sample mustn't stop the writer,
+    # so failures are counted (and the first one printed) rather than raised.
+    def _writeSample(self, sig, value, time):
+        try:
+            sig.pub.set(value, time)
+            if sig.logEntry is not None:
+                sig.logEntry.append(value, time)
+        except Exception: # pylint: disable=broad-exception-caught
+            if self.writeErrorCount == 0:
+                print(f"Warning, failed to write signal {sig.name}, further failures are only counted")
+                traceback.print_exc()
+            self.writeErrorCount += 1
 
 
 ###########################################
 # Public API
 ###########################################
 
+class Signal():
+    """
+    Handle to one named floating point signal. Create it once (usually in a constructor),
+    then call `set()` with the latest value each loop. The value is published
+    to NT and the log file on the next `SignalWrangler().publishPeriodic()`.
+    """
+    DEFAULT_VALUE = 0.0
+
+    def __init__(self, name, units=None, decimation=1, deadband=None):
+        """
+        Args:
+            name (str): Unique name of the signal
+            units (str, optional): Units to show alongside the value. Defaults to None.
+            decimation (int, optional): Only publish one of every `decimation` values. Defaults to 1 (all of them).
+                With a deadband, this instead sets how often a value held by the deadband is published anyway.
+            deadband (float, optional): Only publish when the value has moved more than this far from the
+                last published value. Use 0 to publish on any change. Defaults to None (always publish).
+        """
+        self.name = name
+        self.units = units
+        self.decimation = decimation
+        self.deadband = deadband
+        self.value = self.DEFAULT_VALUE
+        self.pending = False
+        self.pub = None
+        self.logEntry = None
+        self._decimationCountdown = 0
+        self._lastPublishedValue = None
+        SignalWrangler().register(self)
+
+    def makeTopic(self, table):
+        return table.getDoubleTopic(self.name)
+
+    def makeLogEntry(self, dataLog, topicName):
+        return wpilog.DoubleLogEntry(log=dataLog, name=topicName)
+
+    def set(self, value):
+        self.value = value
+        self.pending = True
+
+    def checkPublishPolicy(self):
+        """Apply the decimation and deadband policy to the pending value.
+        Called by the SignalWrangler once per pending value.
+
+        Returns:
+            bool: True if the pending value should be published, False if it should be skipped
+        """
+        if self.deadband is None:
+            publish = self._decimationCountdown <= 0
+        else:
+            # Publish any real change. With decimation too, a held value still gets
+            # refreshed at least once every `decimation` values.
+            publish = (self._lastPublishedValue is None
+                       or self._movedPastDeadband(self._lastPublishedValue)
+                       or (self.decimation > 1 and self._decimationCountdown <= 0))
+
+        if not publish:
+            self._decimationCountdown -= 1
+            return False
+
+        self._decimationCountdown = self.decimation - 1
+        if self.deadband is not None:
+            self._lastPublishedValue = self.value
+        return True
+
+    def _movedPastDeadband(self, prevValue):
+        return abs(self.value - prevValue) > self.deadband
+
+class BooleanSignal(Signal):
+    """
+    A signal holding True/False. Published as an NT boolean topic, and logged as a boolean entry.
+    Any deadband just means "publish on change".
+    """
+    DEFAULT_VALUE = False
+
+    def makeTopic(self, table):
+        return table.getBooleanTopic(self.name)
+
+    def makeLogEntry(self, dataLog, topicName):
+        return wpilog.BooleanLogEntry(log=dataLog, name=topicName)
+
+    def _movedPastDeadband(self, prevValue):
+        return self.value != prevValue
+
+class IntegerSignal(Signal):
+    """
+    A signal holding a whole number, like a count. Published as an NT integer topic, and logged as an integer entry.
+    """
+    DEFAULT_VALUE = 0
+
+    def makeTopic(self, table):
+        return table.getIntegerTopic(self.name)
+
+    def makeLogEntry(self, dataLog, topicName):
+        return wpilog.IntegerLogEntry(log=dataLog, name=topicName)
+
+class StringSignal(Signal):
+    """
+    A signal holding text. Published as an NT string topic, and logged as a string entry.
+    Any deadband just means "publish on change".
+    """
+    DEFAULT_VALUE = ""
+
+    def makeTopic(self, table):
+        return table.getStringTopic(self.name)
+
+    def makeLogEntry(self, dataLog, topicName):
+        return wpilog.StringLogEntry(log=dataLog, name=topicName)
+
+    def _movedPastDeadband(self, prevValue):
+        return self.value != prevValue
+
+class DoubleArraySignal(Signal):
+    """
+    A signal holding a list of floating point numbers, published and logged together as one entry.
+    Useful for grouping closely related values (like all swerve module states) to cut per-sample overhead.
+    `set()` keeps a reference to the list, so pass in a new list each time rather than modifying the old one.
+    """
+    DEFAULT_VALUE = []
+
+    def makeTopic(self, table):
+        return table.getDoubleArrayTopic(self.name)
+
+    def makeLogEntry(self, dataLog, topicName):
+        return wpilog.DoubleArrayLogEntry(log=dataLog, name=topicName)
+
+    def _movedPastDeadband(self, prevValue):
+        if len(self.value) != len(prevValue):
+            return True
+        return any(abs(cur - prev) > self.deadband for cur, prev in zip(self.value, prevValue))
+
 # Log a new named value
-def log(name, value, units=None):
-    SignalWrangler().addSampleForThisLoop(name, value)
-    if units is not None :
-        SignalWrangler().sigUnitsDict[name] = units
+# Compatibility shim - prefer creating a `Signal` once and calling `set()` on it
+# The publish policy (`decimation` and `deadband`) only takes effect the first time a name is logged
+def log(name, value, units=None, decimation=1, deadband=None):
+    SignalWrangler().getSignal(name, units, decimation, deadband).set(value)
 
 def sigNameToNT4TopicName(name):
-    return f"/{BASE_TABLE}/{name}"
\ No newline at end of file
+    return f"/{BASE_TABLE}/{name}"
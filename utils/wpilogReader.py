@@ -0,0 +1,464 @@
+import array
+import json
+import mmap
+import os
+import struct
+
+# Reader for the .wpilog files that SignalWrangler writes to disk.
+# Meant for post-match analysis - it runs on a laptop or the RIO, needs no wpilib,
+# and only pulls NumPy in for the array/export helpers.
+#
+# File format reference:
+# https://github.com/wpilibsuite/allwpilib/blob/main/wpiutil/doc/datalog.adoc
+
+WPILOG_MAGIC = b"WPILOG"
+WPILOG_VERSION = 0x0100
+
+# Control record types (payload of a record with entry ID 0)
+CONTROL_START = 0
+CONTROL_FINISH = 1
+CONTROL_SET_METADATA = 2
+
+# How each fixed-size type is packed, as a numpy dtype and a struct format
+_FIXED_TYPES = {
+    "double": ("<f8", "<d"),
+    "float": ("<f4", "<f"),
+    "int64": ("<i8", "<q"),
+    "boolean": ("u1", "<?"),
+}
+
+# How each array type's elements are packed
+_ARRAY_TYPES = {
+    "double[]": ("<f8", "<d", 8),
+    "float[]": ("<f4", "<f", 4),
+    "int64[]": ("<i8", "<q", 8),
+    "boolean[]": ("u1", "<?", 1),
+}
+
+# A record starts with one byte describing how many bytes the entry ID, payload size,
+# and timestamp fields that follow it each take up.
+def _headerFieldLengths(hdr):
+    return (hdr & 0x3) + 1, ((hdr >> 2) & 0x3) + 1, ((hdr >> 4) & 0x7) + 1
+
+def _headerScanInfo(hdr):
+    # Masks and shifts to pull the entry ID and payload size out of the 8 bytes after the
+    # header byte in one read, plus the total length of the record header
+    idLen, sizeLen, tsLen = _headerFieldLengths(hdr)
+    return ((1 << (8 * idLen)) - 1, 8 * idLen, (1 << (8 * sizeLen)) - 1, 1 + idLen + sizeLen + tsLen)
+
+# Precomputed for every possible header byte, since the index pass looks one up per record
+_HEADER_SCAN_INFO = tuple(_headerScanInfo(hdr) for hdr in range(256))
+
+class WpilogFormatError(Exception):
+    pass
+
+class WpilogEntry():
+    """
+    Everything known about one named entry in a log file, plus where its records live.
+    Record locations are kept in compact arrays - values are only decoded on request.
+    """
+    def __init__(self, name, typeStr, metadata):
+        self.name = name
+        self.type = typeStr
+        self.metadata = metadata
+        self.recordStarts = array.array("q") # File offset of each of this entry's records
+
+    def __len__(self):
+        return len(self.recordStarts)
+
+class WpilogReader():
+    """
+    Streaming reader for a single .wpilog file.
+    The file is memory-mapped rather than read in. A single pass over the record headers
+    indexes where each entry's data is, and values are only decoded for signals that are asked for.
+    """
+    def __init__(self, filePath, entries=None):
+        """
+        Args:
+            filePath (str): the .wpilog file to read
+            entries (dict[str, WpilogEntry], optional): index from an earlier reader's getEntries(), for
+                the same file, unchanged since. Skips the pass over every record. Defaults to None.
+        """
+        self.filePath = filePath
+        self._file = open(filePath, "rb") # pylint: disable=consider-using-with
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as err:
+            self._file.close()
+            raise WpilogFormatError(f"{filePath} is empty") from err
+
+        self.extraHeader, self._dataStart = self._readFileHeader()
+        self._entries = entries # name -> WpilogEntry, filled in on first use
+        self._entryIds = {}  # entry ID -> WpilogEntry most recently started with that ID
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _readFileHeader(self):
+        mm = self._mm
+        if len(mm) < 12 or mm[0:6] != WPILOG_MAGIC:
+            raise WpilogFormatError(f"{self.filePath} is not a wpilog file")
+        version, extraHeaderLen = struct.unpack_from("<HI", mm, 6)
+        if version != WPILOG_VERSION:
+            raise WpilogFormatError(f"{self.filePath} has unsupported wpilog version {version:#06x}")
+        extraHeader = mm[12:12 + extraHeaderLen].decode("utf-8")
+        return extraHeader, 12 + extraHeaderLen
+
+    def getEntries(self):
+        """
+        Returns:
+            dict[str, WpilogEntry]: Every entry in the log, keyed by name
+        """
+        if self._entries is None:
+            self._entries = self._buildIndex()
+        return self._entries
+
+    def getSignalNames(self):
+        return list(self.getEntries().keys())
+
+    def _buildIndex(self): # pylint: disable=too-many-locals
+        # One pass over every record header in the file, noting where each entry's records are.
+        # This is the only part which touches every record, so it's kept as lean as possible:
+        # one read per record for the entry ID and payload size, and nothing else is decoded.
+        mm = self._mm
+        fileLen = len(mm)
+        unpackFields = struct.Struct("<Q").unpack_from
+        scanInfo = _HEADER_SCAN_INFO
+
+        entriesByName = {}
+        # entry ID -> bound `append` of that entry's recordStarts. IDs may be reused after a Finish.
+        activeAppenders = {}
+
+        pos = self._dataStart
+        fastEnd = fileLen - 9 # Past here, an 8 byte read could run off the end of the file
+        while pos < fastEnd:
+            idMask, sizeShift, sizeMask, recordHeaderLen = scanInfo[mm[pos]]
+            fields = unpackFields(mm, pos + 1)[0]
+            entryId = fields & idMask
+            if entryId:
+                appender = activeAppenders.get(entryId)
+                if appender is not None:
+                    appender(pos)
+                pos += recordHeaderLen + ((fields >> sizeShift) & sizeMask)
+            else:
+                payloadStart = pos + recordHeaderLen
+                payloadSize = (fields >> sizeShift) & sizeMask
+                if payloadStart + payloadSize <= fileLen:
+                    self._handleControlRecord(payloadStart, payloadSize, activeAppenders, entriesByName)
+                pos = payloadStart + payloadSize
+
+        # Last few bytes of the file - go slow and careful
+        while pos < fileLen:
+            entryId, payloadStart, payloadSize, _ = self._readRecordHeader(pos)
+            if payloadStart + payloadSize > fileLen:
+                break
+            if entryId:
+                appender = activeAppenders.get(entryId)
+                if appender is not None:
+                    appender(pos)
+            else:
+                self._handleControlRecord(payloadStart, payloadSize, activeAppenders, entriesByName)
+            pos = payloadStart + payloadSize
+
+        # A record cut short by a power loss can leave an entry pointing past the end of the file
+        for entry in entriesByName.values():
+            while entry.recordStarts and not self._recordFits(entry.recordStarts[-1]):
+                entry.recordStarts.pop()
+
+        return entriesByName
+
+    def _recordFits(self, pos):
+        try:
+            _, payloadStart, payloadSize, _ = self._readRecordHeader(pos)
+        except IndexError:
+            return False
+        return payloadStart + payloadSize <= len(self._mm)
+
+    def _readRecordHeader(self, pos):
+        # Decode one record header the straightforward way.
+        # Returns the entry ID, payload start, payload size, and timestamp
+        idLen, sizeLen, tsLen = _headerFieldLengths(self._mm[pos])
+        pos += 1
+        entryId = int.from_bytes(self._mm[pos:pos + idLen], "little")
+        pos += idLen
+        payloadSize = int.from_bytes(self._mm[pos:pos + sizeLen], "little")
+        pos += sizeLen
+        timestamp = int.from_bytes(self._mm[pos:pos + tsLen], "little")
+        return entryId, pos + tsLen, payloadSize, timestamp
+
+    def _handleControlRecord(self, pos, payloadSize, activeAppenders, entriesByName):
+        mm = self._mm
+        if payloadSize < 5:
+            return
+        controlType = mm[pos]
+        targetId, = struct.unpack_from("<I", mm, pos + 1)
+
+        if controlType == CONTROL_START:
+            cursor = pos + 5
+            name, cursor = self._readString(cursor)
+            typeStr, cursor = self._readString(cursor)
+            metadata, cursor = self._readString(cursor)
+            entry = entriesByName.get(name)
+            if entry is None:
+                entry = WpilogEntry(name, typeStr, metadata)
+                entriesByName[name] = entry
+            activeAppenders[targetId] = entry.recordStarts.append
+            self._entryIds[targetId] = entry
+        elif controlType == CONTROL_FINISH:
+            activeAppenders.pop(targetId, None)
+        elif controlType == CONTROL_SET_METADATA:
+            entry = self._entryIds.get(targetId)
+            if entry is not None and targetId in activeAppenders:
+                entry.metadata, _ = self._readString(pos + 5)
+
+    def _readString(self, pos):
+        strLen, = struct.unpack_from("<I", self._mm, pos)
+        pos += 4
+        return self._mm[pos:pos + strLen].decode("utf-8"), pos + strLen
+
+    def _getEntry(self, name):
+        entry = self.getEntries().get(name)
+        if entry is None:
+            raise KeyError(f"No signal named {name} in {self.filePath}")
+        return entry
+
+    def readSignal(self, name):
+        """Decode every value of one signal into plain python lists
+
+        Args:
+            name (str): Full entry name, ie "/SmartDashboard/LoopDuration"
+
+        Returns:
+            tuple(list[int], list): timestamps in microseconds, and the value recorded at each
+        """
+        timestamps = []
+        values = []
+        for timestamp, value in self.iterSamples(name):
+            timestamps.append(timestamp)
+            values.append(value)
+        return timestamps, values
+
+    def iterSamples(self, name, startTime=None, endTime=None):
+        """Lazily decode one signal, one sample at a time, optionally limited to a window of time
+
+        Args:
+            name (str): Full entry name, ie "/SmartDashboard/LoopDuration"
+            startTime (int, optional): Skip samples before this time, in microseconds. Defaults to None.
+            endTime (int, optional): Stop at samples after this time, in microseconds. Defaults to None.
+
+        Yields:
+            tuple(int, value): timestamp in microseconds, and the value recorded then
+        """
+        entry = self._getEntry(name)
+        for recordStart in entry.recordStarts:
+            _, payloadStart, payloadSize, timestamp = self._readRecordHeader(recordStart)
+            if startTime is not None and timestamp < startTime:
+                continue
+            if endTime is not None and timestamp > endTime:
+                break
+            yield timestamp, self._decodeValue(entry.type, payloadStart, payloadSize)
+
+    def getTimeRange(self, name):
+        """
+        Returns:
+            tuple(int, int): timestamps of the first and last samples of a signal in microseconds,
+            or None if it has no samples
+        """
+        entry = self._getEntry(name)
+        if len(entry) == 0:
+            return None
+        return (self._readRecordHeader(entry.recordStarts[0])[3],
+                self._readRecordHeader(entry.recordStarts[-1])[3])
+
+    def _decodeValue(self, typeStr, offset, size):
+        mm = self._mm
+        if typeStr in _FIXED_TYPES:
+            return struct.unpack_from(_FIXED_TYPES[typeStr][1], mm, offset)[0]
+        elif typeStr in _ARRAY_TYPES:
+            _, fmt, elemSize = _ARRAY_TYPES[typeStr]
+            return list(struct.unpack_from(f"<{size // elemSize}{fmt[-1]}", mm, offset))
+        elif typeStr in ("string", "json"):
+            return mm[offset:offset + size].decode("utf-8")
+        elif typeStr == "string[]":
+            count, = struct.unpack_from("<I", mm, offset)
+            cursor = offset + 4
+            vals = []
+            for _ in range(count):
+                val, cursor = self._readString(cursor)
+                vals.append(val)
+            return vals
+        else:
+            # Unknown or raw type - hand back the bytes
+            return mm[offset:offset + size]
+
+    def readSignalArrays(self, name):
+        """Decode one signal into NumPy arrays. Fixed-size numeric types are
+        decoded in a single vectorized gather, without making per-sample python objects.
+
+        Args:
+            name (str): Full entry name, ie "/SmartDashboard/LoopDuration"
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): int64 timestamps in microseconds, and the values.
+            Array-typed signals give a 2D array if every sample is the same length, otherwise an object array.
+        """
+        import numpy as np # pylint: disable=import-outside-toplevel
+
+        entry = self._getEntry(name)
+        if len(entry) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        # Release our view of the mmap before returning, so the reader can still be closed
+        fileBytes = np.frombuffer(self._mm, dtype=np.uint8)
+        try:
+            timestamps, payloadStarts, payloadSizes = _decodeRecordHeaders(np, fileBytes, entry.recordStarts)
+
+            if entry.type in _FIXED_TYPES:
+                dtype = np.dtype(_FIXED_TYPES[entry.type][0])
+                values = _gather(np, fileBytes, payloadStarts, dtype.itemsize).view(dtype).reshape(-1)
+            elif entry.type in _ARRAY_TYPES and np.all(payloadSizes == payloadSizes[0]):
+                dtype = np.dtype(_ARRAY_TYPES[entry.type][0])
+                values = _gather(np, fileBytes, payloadStarts, int(payloadSizes[0])).view(dtype)
+            else:
+                values = np.empty(len(entry), dtype=object)
+                values[:] = [self._decodeValue(entry.type, int(start), int(size)) 
+                             for start, size in zip(payloadStarts, payloadSizes)]
+        finally:
+            del fileBytes
+
+        if entry.type in ("boolean", "boolean[]"):
+            values = values.astype(bool)
+
+        return timestamps, values
+
+    def exportColumnar(self, outDir, names=None):
+        """Write signals out as one .npy of values and one .npy of timestamps per signal,
+        plus an index.json describing them. The .npy files can be loaded (or memory-mapped)
+        later with numpy.load, without needing this reader or the original log.
+
+        Args:
+            outDir (str): Directory to write to. Created if needed.
+            names (list[str], optional): Signals to export. Defaults to None, meaning every
+            signal with a numeric type.
+
+        Returns:
+            dict: The contents written to index.json
+        """
+        import numpy as np # pylint: disable=import-outside-toplevel
+
+        entries = self.getEntries()
+        if names is None:
+            names = [name for name, entry in entries.items()
+                     if entry.type in _FIXED_TYPES or entry.type in _ARRAY_TYPES]
+
+        os.makedirs(outDir, exist_ok=True)
+        index = {"source": os.path.basename(self.filePath), "signals": {}}
+
+        for name in names:
+            timestamps, values = self.readSignalArrays(name)
+            if values.dtype == object:
+                continue # Variable-length samples don't fit in a flat column
+
+            fileBase = _nameToFileBase(name)
+            np.save(os.path.join(outDir, fileBase + ".npy"), values)
+            np.save(os.path.join(outDir, fileBase + ".time.npy"), timestamps)
+            index["signals"][name] = {
+                "type": entries[name].type,
+                "count": len(timestamps),
+                "values": fileBase + ".npy",
+                "timestamps": fileBase + ".time.npy",
+            }
+
+        with open(os.path.join(outDir, "index.json"), "w", encoding="utf-8") as outFile:
+            json.dump(index, outFile, indent=2)
+
+        return index
+
+def isNumericType(typeStr):
+    return typeStr in _FIXED_TYPES
+
+def minMaxDecimate(samples, startTime, endTime, numBuckets):
+    """Shrink a series of numeric samples down to at most two points per bucket of time.
+    The smallest and largest sample in each bucket are kept, so short spikes still show up.
+    Works incrementally, so `samples` can be a generator straight off of the log file.
+
+    Args:
+        samples (iterable of tuple(int, value)): timestamp and value pairs, in time order
+        startTime (int): start of the first bucket
+        endTime (int): end of the last bucket
+        numBuckets (int): how many buckets to split the time between start and end into
+
+    Yields:
+        tuple(int, value): the kept samples, in time order
+    """
+    numBuckets = max(numBuckets, 1)
+    bucketWidth = max((endTime - startTime) / numBuckets, 1)
+    curBucket = None
+    minSample = (0, 0)
+    maxSample = (0, 0)
+
+    for sample in samples:
+        # A sample right at endTime goes in the last bucket, rather than starting a new one
+        bucket = min(int((sample[0] - startTime) / bucketWidth), numBuckets - 1)
+        if bucket != curBucket:
+            if curBucket is not None:
+                yield from _bucketExtremes(minSample, maxSample)
+            curBucket = bucket
+            minSample = sample
+            maxSample = sample
+        elif sample[1] < minSample[1]:
+            minSample = sample
+        elif sample[1] > maxSample[1]:
+            maxSample = sample
+
+    if curBucket is not None:
+        yield from _bucketExtremes(minSample, maxSample)
+
+def _bucketExtremes(minSample, maxSample):
+    if minSample is maxSample:
+        return (minSample,)
+    elif minSample[0] <= maxSample[0]:
+        return (minSample, maxSample)
+    else:
+        return (maxSample, minSample)
+
+def _gather(np, fileBytes, starts, width):
+    # Pull `width` bytes from each start offset into one (numStarts x width) byte array.
+    # Reads which would run off the end of the file are clamped - callers mask off those bytes.
+    idx = starts[:, None] + np.arange(width)
+    np.minimum(idx, len(fileBytes) - 1, out=idx)
+    return fileBytes[idx]
+
+def _decodeRecordHeaders(np, fileBytes, recordStarts):
+    # Vectorized version of WpilogReader._readRecordHeader, for many records at once.
+    # Returns the timestamps, payload starts, and payload sizes.
+    starts = np.frombuffer(recordStarts, dtype=np.int64)
+    hdr = fileBytes[starts].astype(np.int64)
+    idLen = (hdr & 0x3) + 1
+    sizeLen = ((hdr >> 2) & 0x3) + 1
+    tsLen = ((hdr >> 4) & 0x7) + 1
+
+    sizeStarts = starts + 1 + idLen
+    tsStarts = sizeStarts + sizeLen
+    payloadStarts = tsStarts + tsLen
+
+    payloadSizes = _gather(np, fileBytes, sizeStarts, 4).view("<u4").reshape(-1).astype(np.int64)
+    payloadSizes &= (np.int64(1) << (8 * sizeLen)) - 1
+
+    timestamps = _gather(np, fileBytes, tsStarts, 8).view("<u8").reshape(-1)
+    tsMask = np.where(tsLen >= 8, np.uint64(0xFFFFFFFFFFFFFFFF),
+                      (np.uint64(1) << (np.uint64(8) * np.minimum(tsLen, 7).astype(np.uint64))) - np.uint64(1))
+    timestamps = (timestamps & tsMask).astype(np.int64)
+
+    return timestamps, payloadStarts, payloadSizes
+
+def _nameToFileBase(name):
+    # Signal names have slashes and spaces, which don't make for nice file names
+    return "".join(c if (c.isalnum() or c in "-_.") else "_" for c in name.strip("/"))
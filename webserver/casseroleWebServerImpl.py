@@ -4,13 +4,86 @@ import platform
 import sys
 import pathlib
 import json
+import re
+import shutil
+import tarfile
+import threading
+import time
+import gzip
+import hashlib
+import email.utils
+import math
+import mimetypes
+import collections
+import urllib.parse
+import zlib
 
 import wpilib
 from utils.extDriveManager import ExtDriveManager
+from utils.singleton import Singleton
+from utils.signalLogging import sigNameToNT4TopicName, BooleanSignal, IntegerSignal
+from utils.profiler import LoopProfiler
+from utils.calibration import CalibrationWrangler
+from utils.wpilogReader import WpilogReader, WpilogFormatError, isNumericType, minMaxDecimate
+
+# How much of a log file to read and send at once while streaming a download
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Upper limit on the memory the static file cache may use, counting both plain and gzipped copies
+STATIC_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Static files are only replaced by a deploy, but their URLs don't change when they are,
+# so browsers are only allowed to reuse their copy without checking back for a little while.
+STATIC_CACHE_CONTROL = "public, max-age=600"
+
+# File types which are already compressed, and gain nothing from gzip
+PRECOMPRESSED_EXTENSIONS = (".png", ".jpg", ".ico", ".mp3", ".woff", ".woff2")
+
+# How long a worker waits on a client which has started sending a request, but not finished it.
+# Idle time between requests is handled by the server, see PooledTCPServer.
+REQUEST_READ_TIMEOUT_S = 2.0
+
+# Clients turned away from bulk requests are asked to try again after this long
+BULK_RETRY_AFTER_S = 2
+
+# Requests for log files which do a lot of disk I/O or CPU work. These get held off
+# while the robot loop is running close to overrun, or while the robot is enabled in a match.
+BULK_PATH_PREFIXES = ('/get_file_list', '/query_log', '/download_file/', '/download_logs_since',
+                      '/delete_file/', '/delete_all_files')
+
+# Throttle bulk requests once a loop takes this fraction of the long loop threshold
+THROTTLE_LOOP_FRACTION = 0.8
+
+# How long to stay throttled after the last slow loop, so one slow loop doesn't let
+# a burst of bulk work through right after it
+THROTTLE_HOLD_S = 1.0
+
+# Bulk requests turned away by the throttle are asked to try again after this long.
+# A bit longer than THROTTLE_HOLD_S, so the retry has a chance of getting through.
+THROTTLE_RETRY_AFTER_S = 3
+
+# While throttled, transfers already in progress pause this long between chunks
+THROTTLE_CHUNK_PAUSE_S = 0.05
+
+# Point count used by /query_log when the client doesn't ask for one
+DEFAULT_QUERY_POINTS = 1000
+
+# Returned by _parseByteRange() for a range which starts past the end of the file
+RANGE_NOT_SATISFIABLE = "not satisfiable"
+
+# Number of log files whose record index /query_log keeps around. Each index takes
+# about 8 bytes per record in the file, so only keep a couple.
+LOG_INDEX_CACHE_FILES = 2
 
 # Global list of all widgets on the dashboard. 
 dashboardWidgetList = []
 
+# Generated dashboard pages, keyed by URL path. Built on first request, and thrown
+# away whenever the widget list changes. Guarded by dashboardCacheLock since
+# requests are handled on several threads at once.
+dashboardCache = {}
+dashboardCacheLock = threading.Lock()
+
 # Where we expect to find our template files at 
 WEB_ROOT = pathlib.Path(__file__).parent / "www"
 DASHBOARD_ROOT = WEB_ROOT / "dashboard"
@@ -36,7 +109,8 @@ with open(DASHBOARD_ROOT / "dashboard.js_tmplt", "r", encoding="utf-8") as infil
 class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
     # This code-generation class has some long lines 
     # that I don't know of a good way to get rid of.
-    # pylint: disable=line-too-long
+    # It also has one method per route.
+    # pylint: disable=line-too-long,too-many-public-methods
     
     # from https://gist.github.com/HaiyangXu/ec88cbdce3cdbac7b8d5
     # Chrome barfs at you about "wrong response type" without this
@@ -53,6 +127,62 @@ class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
         '.json': 'application/json',
         '.xml': 'application/xml',
     }
+
+    # HTTP/1.1 lets browsers reuse one connection for many requests.
+    # Every reply must then either say how long it is, or close the connection when done.
+    protocol_version = "HTTP/1.1"
+    timeout = REQUEST_READ_TIMEOUT_S
+    requestStartTime = None
+
+    # Set when the connection is quiet between requests, so the server should keep it
+    # open without tying up a worker thread. See PooledTCPServer.
+    parked = False
+
+    # Handle requests until the connection closes, or the client has nothing more to send for now.
+    # A quiet connection is left open and parked, and the server calls resume() once the client
+    # sends its next request.
+    def handle(self):
+        self.parked = False
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self._requestWaiting():
+                self.parked = True
+                return
+            self.handle_one_request()
+
+    def resume(self):
+        try:
+            self.handle()
+        finally:
+            self.finish()
+
+    # Leave the connection open while it's parked
+    def finish(self):
+        if not self.parked:
+            SimpleHTTPRequestHandler.finish(self)
+
+    # True if (some of) the next request has already arrived - possibly already read into our buffer
+    def _requestWaiting(self):
+        try:
+            self.connection.settimeout(0)
+            return len(self.rfile.peek(1)) > 0
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    # Track how long each request takes to handle, not counting time spent
+    # waiting on the client to send it
+    def handle_one_request(self):
+        self.requestStartTime = None
+        SimpleHTTPRequestHandler.handle_one_request(self)
+        if self.requestStartTime is not None:
+            self.server.recordRequestDuration(time.perf_counter() - self.requestStartTime)
+
+    def parse_request(self):
+        self.requestStartTime = time.perf_counter()
+        return SimpleHTTPRequestHandler.parse_request(self)
     
     # Fill out and return the index HTML page
     # This is the main landing page of the robot and includes robopy-provided
@@ -79,89 +209,47 @@ class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
 
 
         filledOut = INDEX_TMPLT_TXT.replace("${BUILD_INFO}", deployText)
-                    
-        self.send_response(200)
-        self.send_header("Content-Type", "text/html")
-        self.end_headers()                
 
-        self.wfile.write(filledOut.encode())
+        self.sendSimpleResponse(200, filledOut.encode(), "text/html")
 
         return SimpleHTTPRequestHandler
     
-    # Fill out and return the HTML page for the dashboard
+    # Return the HTML page for the dashboard
     def handleDashboardHtml(self):
-        filledOut = ""
-
-        htmlText = ""
-        for widget in dashboardWidgetList:
-            htmlText += widget.getHTML()
-            htmlText += "\n"
-            
-        filledOut = HTML_TMPLT_TXT.replace("${WIDGETS_HTML}", htmlText)
-                    
-        self.send_response(200)
-        self.send_header("Content-Type", "text/html")
-        self.end_headers()                
-
-        self.wfile.write(filledOut.encode())
-
+        self.sendCachedResponse(getDashboardPage(self.path, buildDashboardHtml, "text/html"))
         return SimpleHTTPRequestHandler
-    
-    # Fill out and return the javascript page for the dashboard
-    def handleDashboardJs(self):
-        jsInstantiate = ""
-        jsUpdate = ""
-        jsCallback = ""
-        jsSetData = ""
-        jsSetNoData = ""
-        subscribeLine = "nt4Client.subscribePeriodic(["
-
-        for widget in dashboardWidgetList:
-            jsInstantiate += widget.getJSDeclaration()
-            jsInstantiate += "\n"
-
-            jsUpdate += widget.getJSUpdate()
-            jsUpdate += "\n"
 
-            jsSetData += widget.getJSSetData()
-            jsSetData += "\n"
-
-            jsSetNoData += widget.getJSSetNoData()
-            jsSetNoData += "\n"
-
-            jsCallback += widget.getJSCallback()
-            jsCallback += "\n"
-
-            subscribeLine +=  widget.getTopicSubscriptionStrings()
-
-        # Remove the trailing comma and close out the line
-        subscribeLine = subscribeLine[:-1]
-        subscribeLine += "], 0.05);" # 50ms sample rate
-        subscribeLine += "\n"
+    # Return the javascript page for the dashboard
+    def handleDashboardJs(self):
+        self.sendCachedResponse(getDashboardPage(self.path, buildDashboardJs, "application/x-javascript"))
+        return SimpleHTTPRequestHandler
 
-        filledOut = JS_TMPLT_TXT
-        filledOut = filledOut.replace("${WIDGETS_INSTANTIATE}", jsInstantiate)
-        filledOut = filledOut.replace("${WIDGETS_NT4_SUBSCRIBE}", subscribeLine)
-        filledOut = filledOut.replace("${WIDGETS_UPDATE}", jsUpdate)
-        filledOut = filledOut.replace("${WIDGETS_SET_VALUE}", jsSetData)
-        filledOut = filledOut.replace("${WIDGETS_SET_NO_DATA}", jsSetNoData)
-        filledOut = filledOut.replace("${WIDGETS_CALLBACK}", jsCallback)
+    # Send a pre-built response, or just a "304 Not Modified" if the client's copy is already up to date
+    def sendCachedResponse(self, cached, cacheControl="no-cache"):
+        if cached.matchesRequest(self.headers):
+            self.send_response(304)
+            self.send_header("ETag", cached.etag)
+            self.send_header("Cache-Control", cacheControl)
+            self.end_headers()
+            return
 
+        body = cached.body
         self.send_response(200)
-        self.send_header("Content-Type", "application/x-javascript")
+        self.send_header("Content-Type", cached.contentType)
+        if cached.gzBody is not None and self._acceptsGzip():
+            body = cached.gzBody
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", cached.etag)
+        self.send_header("Last-Modified", cached.lastModified)
+        self.send_header("Cache-Control", cacheControl)
+        self.send_header("Vary", "Accept-Encoding")
         self.end_headers()
 
-        self.wfile.write(filledOut.encode())
-
-        return SimpleHTTPRequestHandler
+        self.wfile.write(body)
 
     # Special HTTP Post helper to get a json list of log files
     def getLogFileList(self):
-
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        
         fileInfo = []
 
         if(ExtDriveManager().isConnected()):
@@ -179,7 +267,7 @@ class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
             # Sort the file list by modification time in descending order (newest first)
             fileInfo.sort(key=lambda x: x['modTime'], reverse=True)
 
-        self.wfile.write(json.dumps(fileInfo).encode()) 
+        self.sendSimpleResponse(200, json.dumps(fileInfo).encode(), 'application/json')
         
     # Special HTTP Post (DELETE method) to delete a log file
     def deleteOneLogFile(self):
@@ -188,20 +276,18 @@ class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
         filename = self.path[len('/delete_file/'):]
         filePath = os.path.join(logFilePath, filename)
         if os.path.exists(filePath):
+            logIndexCache.invalidate(filePath)
             os.remove(filePath)
-            self.send_response(200)
-            self.end_headers()
-            self.wfile.write(b'File deleted')
+            self.sendSimpleResponse(200, b'File deleted')
         else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b'File not found')
+            self.sendSimpleResponse(404, b'File not found')
             
     # Special HTTP Post (DELETE method) to delete all log files
     def deleteAllLogFiles(self):
         
         if(ExtDriveManager().isConnected()):
             logFilePath = ExtDriveManager().getLogStoragePath()
+            logIndexCache.invalidate()
 
             for file in os.listdir(logFilePath):
                 filePath = os.path.join(logFilePath, file)
@@ -211,12 +297,210 @@ class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
                     except PermissionError:
                         print(f"Warning, log {filePath} in use, skipping...")
 
+        self.sendSimpleResponse(200, b'All files deleted')
+
+    # Special HTTP Get to pull a downsampled slice of some signals out of one log file,
+    # so triage doesn't require downloading the whole thing.
+    # Ex: /query_log?file=FRC_1.wpilog&signal=LoopDuration&signal=LoopPeriod&start=10&end=20&points=500
+    # start/end are in seconds and optional. Signals can be given by their signal name or full entry name.
+    # Replies with one JSON object per line, one line per signal, written out as each signal is finished.
+    # Each request is already handled on its own thread, so the decode happens off of the robot loop.
+    def queryLogFile(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+
+        fileName = os.path.basename(query.get("file", [""])[0])
+        filePath = os.path.join(ExtDriveManager().getLogStoragePath(), fileName)
+        if not fileName or not os.path.isfile(filePath):
+            self.sendSimpleResponse(404, b'File not found')
+            return
+
+        try:
+            numPoints = int(query.get("points", [DEFAULT_QUERY_POINTS])[0])
+            startTime = _secToUs(query.get("start", [None])[0])
+            endTime = _secToUs(query.get("end", [None])[0])
+        except ValueError:
+            self.sendSimpleResponse(400, b'Bad query parameters')
+            return
+
+        try:
+            reader = logIndexCache.openReader(filePath)
+        except WpilogFormatError:
+            self.sendSimpleResponse(400, b'Not a wpilog file')
+            return
+
+        # Reply length isn't known up front - the end of the reply is marked by closing the connection
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson')
+        self.end_headers()
+        self.close_connection = True
+
+        with reader:
+            for sigName in query.get("signal", []):
+                RequestThrottle().pauseIfThrottled()
+                result = _querySignal(reader, sigName, startTime, endTime, numPoints)
+                self.wfile.write((json.dumps(result) + "\n").encode())
+
+    # Special HTTP Get to download one log file.
+    # Supports resuming a dropped download with a "Range" request, and gzip-compressing
+    # the file on the fly if the client accepts it.
+    def downloadLogFile(self):
+        fileName = os.path.basename(urllib.parse.unquote(urllib.parse.urlsplit(self.path).path))
+        filePath = os.path.join(ExtDriveManager().getLogStoragePath(), fileName)
+        if not fileName or not os.path.isfile(filePath):
+            self.sendSimpleResponse(404, b'File not found')
+            return
+
+        fileSize = os.path.getsize(filePath)
+        rangeHeader = self.headers.get("Range")
+        byteRange = None if rangeHeader is None else _parseByteRange(rangeHeader, fileSize)
+        outFile = _ThrottledWriter(self.wfile)
+
+        with open(filePath, "rb") as inFile:
+            if byteRange == RANGE_NOT_SATISFIABLE:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{fileSize}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            elif byteRange is not None:
+                start, end = byteRange
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{fileSize}")
+                self._sendDownloadHeaders(fileName)
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                inFile.seek(start)
+                _copyBytes(inFile, outFile, end - start + 1)
+
+            elif self._acceptsGzip():
+                # Compressed size isn't known up front - the end of the reply is marked by closing the connection
+                self.send_response(200)
+                self._sendDownloadHeaders(fileName)
+                self.send_header("Content-Encoding", "gzip")
+                self.end_headers()
+                self.close_connection = True
+                with _GzipStreamWriter(outFile) as gzOut:
+                    shutil.copyfileobj(inFile, gzOut, DOWNLOAD_CHUNK_BYTES)
+
+            else:
+                self.send_response(200)
+                self._sendDownloadHeaders(fileName)
+                self.send_header("Content-Length", str(fileSize))
+                self.end_headers()
+                shutil.copyfileobj(inFile, outFile, DOWNLOAD_CHUNK_BYTES)
+
+    # Special HTTP Get to download every log file modified since some time as one tar archive.
+    # Ex: /download_logs_since?time=1710000000 (unix time in seconds, leave it off to get everything)
+    # The archive is built as it is sent, so nothing gets staged on the disk.
+    def downloadLogsSince(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        try:
+            sinceTime = float(query.get("time", [0])[0])
+        except ValueError:
+            self.sendSimpleResponse(400, b'Bad query parameters')
+            return
+
+        filePaths = []
+        if(ExtDriveManager().isConnected()):
+            logFilePath = ExtDriveManager().getLogStoragePath()
+            for file in sorted(os.listdir(logFilePath)):
+                filePath = os.path.join(logFilePath, file)
+                if os.path.isfile(filePath) and os.path.getmtime(filePath) >= sinceTime:
+                    filePaths.append(filePath)
+
+        useGzip = self._acceptsGzip()
+        archiveName = time.strftime("logs_%Y%m%d_%H%M%S.tar", time.localtime(sinceTime))
+
         self.send_response(200)
+        self._sendDownloadHeaders(archiveName)
+        if useGzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.close_connection = True
+
+        # If the archive gets cut short, it's left unfinished - no gzip trailer either - so
+        # the client sees a broken download rather than an archive quietly missing data
+        outFile = _ThrottledWriter(self.wfile)
+        if useGzip:
+            gzOut = _GzipStreamWriter(outFile)
+            if _writeTar(gzOut, filePaths):
+                gzOut.close()
+        else:
+            _writeTar(outFile, filePaths)
+
+    # Special HTTP Get to download every calibration's current value, in the same layout as the calibration store
+    def exportCalibrations(self):
+        body = json.dumps(CalibrationWrangler().exportSnapshot(), indent=1, sort_keys=True).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Disposition", f'attachment; filename="calibrations_{time.strftime("%Y%m%d_%H%M%S")}.json"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Special HTTP Post to load calibration values from a previously exported file.
+    # Values are applied (and saved) by the robot loop on its next update.
+    def importCalibrations(self):
+        try:
+            bodyLen = int(self.headers.get("Content-Length", "0"))
+            snapshot = json.loads(self.rfile.read(bodyLen))
+            unknown = CalibrationWrangler().importSnapshot(snapshot)
+        except (ValueError, TypeError, AttributeError):
+            self.sendSimpleResponse(400, b'Not a calibration snapshot')
+            return
+        self.sendSimpleResponse(200, json.dumps({'unknown': unknown}).encode(), 'application/json')
+
+    # Send a complete reply which is already fully in memory
+    def sendSimpleResponse(self, code, body, contentType="text/plain"):
+        self.send_response(code)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(b'All files deleted')
+        self.wfile.write(body)
+
+    # Run a bulk request, as long as the robot isn't too busy, and there's a free bulk slot.
+    # Only a couple of bulk requests run at once, so the other workers stay free for the dashboard.
+    # Otherwise, the client is told to come back later with a 503 right away, rather than tying up a worker.
+    def runBulkRequest(self, handlerFunc):
+        if not RequestThrottle().checkClearance():
+            self.sendRetryLater(THROTTLE_RETRY_AFTER_S)
+            return
+        if not self.server.tryStartBulk():
+            self.sendRetryLater(BULK_RETRY_AFTER_S)
+            return
+        try:
+            handlerFunc()
+        finally:
+            self.server.endBulk()
+
+    # The logs page retries fetches itself, after Retry-After. Downloads are plain page loads,
+    # so the body is a page which reloads itself after the same wait.
+    def sendRetryLater(self, retryAfterSec):
+        body = (f'<!DOCTYPE html><html><head><meta http-equiv="refresh" content="{retryAfterSec}">'
+                f'<title>Robot Busy</title></head><body><p>The robot is busy, retrying in {retryAfterSec} seconds...</p>'
+                f'<p>Once the download starts, go back to the <a href="/logs/logs.html">log list</a>.</p></body></html>').encode()
+        self.send_response(503)
+        self.send_header("Retry-After", str(retryAfterSec))
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _acceptsGzip(self):
+        return "gzip" in self.headers.get("Accept-Encoding", "")
+
+    def _sendDownloadHeaders(self, fileName):
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{fileName}"')
+        self.send_header("Accept-Ranges", "bytes")
 
     # Override the get method to apply templates on the files which need templating
     def do_GET(self):
+        if self.path.startswith(BULK_PATH_PREFIXES):
+            return self.runBulkRequest(self.handleGet)
+        return self.handleGet()
+
+    def handleGet(self): # pylint: disable=too-many-return-statements
         # Check for known tempaltes first
         if self.path in ("/index.html", "/") :
             return self.handleIndexPage()
@@ -226,22 +510,421 @@ class CasseroleWebServerImpl(SimpleHTTPRequestHandler):
             return self.handleDashboardJs()
         elif self.path == '/get_file_list':
             return self.getLogFileList()
+        elif self.path == '/calibrations/export':
+            return self.exportCalibrations()
+        elif self.path == '/profile_data':
+            return self.sendSimpleResponse(200, json.dumps(LoopProfiler().getBreakdown()).encode(), 'application/json')
+        elif self.path.startswith('/query_log'):
+            return self.queryLogFile()
+        elif self.path.startswith('/download_file/'):
+            return self.downloadLogFile()
+        elif self.path.startswith('/download_logs_since'):
+            return self.downloadLogsSince()
         else:
+            # Serve static files out of memory if we can
+            cached = staticAssetCache.get(self.translate_path(self.path))
+            if cached is not None:
+                # Plain HTML pages aren't versioned, make sure browsers always check for a new one
+                isHtml = cached.contentType == "text/html"
+                return self.sendCachedResponse(cached, "no-cache" if isHtml else STATIC_CACHE_CONTROL)
+
             # Fallback on serving like a normal HTTP request handler
             return SimpleHTTPRequestHandler.do_GET(self)
    
+    def do_POST(self): # pylint: disable=invalid-name
+        if self.path == '/calibrations/import':
+            self.importCalibrations()
+        else:
+            self.send_error(404)
+
     # Support a special DELETE method for managing log files
     def do_DELETE(self): # pylint: disable=invalid-name
+        if self.path.startswith(BULK_PATH_PREFIXES):
+            self.runBulkRequest(self.handleDelete)
+        else:
+            self.send_error(404)
+
+    def handleDelete(self):
         if self.path.startswith('/delete_file/'):
             self.deleteOneLogFile()
         elif self.path.startswith('/delete_all_files'):
             self.deleteAllLogFiles()
-            
-    # Support the web prefix "download_file" to point to wherever the logs are at
-    def translate_path(self, path):
-        prefix = "/download_file"
-        if self.path.startswith(prefix):
-            logFilePath = ExtDriveManager().getLogStoragePath()
-            return logFilePath + path[len(prefix):]
         else:
-            return SimpleHTTPRequestHandler.translate_path(self, path)
+            self.send_error(404)
+
+def _secToUs(secStr):
+    if secStr is None:
+        return None
+    return int(float(secStr) * 1e6)
+
+# Build the downsampled series for one signal in a /query_log reply
+def _querySignal(reader, sigName, startTime, endTime, numPoints):
+    entries = reader.getEntries()
+    entryName = sigName if sigName in entries else sigNameToNT4TopicName(sigName)
+    entry = entries.get(entryName)
+    if entry is None:
+        return {'name': sigName, 'error': 'not found'}
+    if not isNumericType(entry.type):
+        return {'name': sigName, 'error': f'cannot downsample type {entry.type}'}
+
+    # Open-ended windows run to the ends of the signal
+    timeRange = reader.getTimeRange(entryName)
+    if timeRange is None:
+        return {'name': sigName, 'type': entry.type, 'time': [], 'value': []}
+    startTime = timeRange[0] if startTime is None else startTime
+    endTime = timeRange[1] if endTime is None else endTime
+
+    # Each bucket contributes up to two points - its min and its max
+    samples = reader.iterSamples(entryName, startTime, endTime)
+    times = []
+    values = []
+    for timestamp, value in minMaxDecimate(samples, startTime, endTime, max(numPoints // 2, 1)):
+        times.append(timestamp / 1e6)
+        # JSON has no NaN or infinity - send null instead
+        values.append(value if math.isfinite(value) else None)
+
+    return {'name': sigName, 'type': entry.type, 'time': times, 'value': values}
+
+# Record indexes of recently queried log files, so repeated /query_log requests against
+# the same file don't each re-walk every record in it. An index is only reused while the
+# file's modification time and size are unchanged - ie, never for the log being written right now.
+class LogIndexCache():
+    def __init__(self, maxFiles=LOG_INDEX_CACHE_FILES):
+        self.maxFiles = maxFiles
+        self.entries = collections.OrderedDict() # path -> ((mtime, size), index)
+        self.lock = threading.Lock()
+
+    # Open a reader for a log file, with its index already built
+    def openReader(self, filePath):
+        fileStat = os.stat(filePath)
+        stamp = (fileStat.st_mtime_ns, fileStat.st_size)
+        with self.lock:
+            cached = self.entries.get(filePath)
+            index = None
+            if cached is not None and cached[0] == stamp:
+                index = cached[1]
+                self.entries.move_to_end(filePath)
+
+        reader = WpilogReader(filePath, index)
+        if index is None:
+            try:
+                index = reader.getEntries()
+            except WpilogFormatError:
+                reader.close()
+                raise
+            with self.lock:
+                self.entries[filePath] = (stamp, index)
+                self.entries.move_to_end(filePath)
+                while len(self.entries) > self.maxFiles:
+                    self.entries.popitem(last=False)
+        return reader
+
+    # Forget one file's index, or every file's if none is given
+    def invalidate(self, filePath=None):
+        with self.lock:
+            if filePath is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(filePath, None)
+
+logIndexCache = LogIndexCache()
+
+# Parse a single "bytes=start-end" Range header into an inclusive (start, end) pair.
+# Returns RANGE_NOT_SATISFIABLE if the range lies entirely past the end of a file of this size.
+# Returns None if the header should be ignored, and the whole file sent instead - either it's
+# malformed, or it asks for several ranges at once, which we don't support. RFC 9110 allows both.
+def _parseByteRange(rangeHeader, fileSize):
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", rangeHeader)
+    if match is None or (match.group(1) == "" and match.group(2) == ""):
+        return None
+
+    if match.group(1) == "":
+        # "bytes=-N" means the last N bytes
+        suffixLen = int(match.group(2))
+        if suffixLen == 0 or fileSize == 0:
+            return RANGE_NOT_SATISFIABLE
+        return max(fileSize - suffixLen, 0), fileSize - 1
+
+    start = int(match.group(1))
+    if match.group(2) != "" and int(match.group(2)) < start:
+        return None
+    if start >= fileSize:
+        return RANGE_NOT_SATISFIABLE
+    end = fileSize - 1 if match.group(2) == "" else min(int(match.group(2)), fileSize - 1)
+    return start, end
+
+# Copy exactly numBytes from one file to another, a chunk at a time
+def _copyBytes(inFile, outFile, numBytes):
+    while numBytes > 0:
+        chunk = inFile.read(min(numBytes, DOWNLOAD_CHUNK_BYTES))
+        if not chunk:
+            break
+        outFile.write(chunk)
+        numBytes -= len(chunk)
+
+# Stream every file into a tar archive, written straight to outFile.
+# Returns False if the archive had to be cut short, in which case it's left unfinished.
+def _writeTar(outFile, filePaths):
+    tar = tarfile.open(fileobj=outFile, mode="w|") # pylint: disable=consider-using-with
+    for filePath in filePaths:
+        headerSent = False
+        try:
+            with open(filePath, "rb") as inFile:
+                # Sized from the open file, since the header promises exactly this many bytes
+                info = tar.gettarinfo(arcname=os.path.basename(filePath), fileobj=inFile)
+                headerSent = True
+                tar.addfile(info, inFile)
+        except OSError:
+            if headerSent:
+                # Part of this file is already out, there's no way to skip it now
+                print(f"Warning, log {filePath} could not be read while being sent, stopping the archive")
+                return False
+            print(f"Warning, log {filePath} could not be read, skipping...")
+    tar.close()
+    return True
+
+# File-like object which passes writes on to another file, slowing down while bulk requests are throttled
+class _ThrottledWriter():
+    def __init__(self, outFile):
+        self.outFile = outFile
+
+    def write(self, data):
+        RequestThrottle().pauseIfThrottled()
+        return self.outFile.write(data)
+
+    def flush(self):
+        self.outFile.flush()
+
+# File-like object which gzip compresses everything written to it on the way out to another file.
+# Unlike gzip.GzipFile, it never needs to seek, so it works on a socket.
+class _GzipStreamWriter():
+    def __init__(self, outFile):
+        self.outFile = outFile
+        # wbits=31 asks zlib for a gzip header and trailer. Level 1 keeps the RIO's CPU load down.
+        self.compressor = zlib.compressobj(1, zlib.DEFLATED, 31)
+
+    def write(self, data):
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.outFile.write(compressed)
+        return len(data)
+
+    def close(self):
+        self.outFile.write(self.compressor.flush())
+
+    def __enter__(self):
+        return self
+
+    # Left without a trailer if something went wrong, so the client can tell it's incomplete
+    def __exit__(self, excType, *args):
+        if excType is None:
+            self.close()
+
+# One fully-built response body, kept in memory along with a gzipped copy and
+# the validators clients use to check if their copy is still current.
+class CachedResponse():
+    def __init__(self, body, contentType, modTime=None, compress=True):
+        self.body = body
+        self.gzBody = gzip.compress(body, mtime=0) if compress else None
+        self.contentType = contentType
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.lastModified = email.utils.formatdate(time.time() if modTime is None else modTime, usegmt=True)
+
+    def sizeBytes(self):
+        return len(self.body) + (0 if self.gzBody is None else len(self.gzBody))
+
+    # True if the request's conditional headers say the client already has this body
+    def matchesRequest(self, headers):
+        ifNoneMatch = headers.get("If-None-Match")
+        if ifNoneMatch is not None:
+            return self.etag in ifNoneMatch or ifNoneMatch.strip() == "*"
+        return headers.get("If-Modified-Since") == self.lastModified
+
+# Fill out the HTML page for the dashboard
+def buildDashboardHtml():
+    htmlText = ""
+    for widget in dashboardWidgetList:
+        htmlText += widget.getHTML()
+        htmlText += "\n"
+
+    return HTML_TMPLT_TXT.replace("${WIDGETS_HTML}", htmlText)
+
+# Fill out the javascript page for the dashboard
+def buildDashboardJs():
+    jsInstantiate = ""
+    jsUpdate = ""
+    jsCallback = ""
+    jsSetData = ""
+    jsSetNoData = ""
+    subscribeLine = "nt4Client.subscribePeriodic(["
+
+    for widget in dashboardWidgetList:
+        jsInstantiate += widget.getJSDeclaration()
+        jsInstantiate += "\n"
+
+        jsUpdate += widget.getJSUpdate()
+        jsUpdate += "\n"
+
+        jsSetData += widget.getJSSetData()
+        jsSetData += "\n"
+
+        jsSetNoData += widget.getJSSetNoData()
+        jsSetNoData += "\n"
+
+        jsCallback += widget.getJSCallback()
+        jsCallback += "\n"
+
+        subscribeLine +=  widget.getTopicSubscriptionStrings()
+
+    # Remove the trailing comma and close out the line
+    subscribeLine = subscribeLine[:-1]
+    subscribeLine += "], 0.05);" # 50ms sample rate
+    subscribeLine += "\n"
+
+    filledOut = JS_TMPLT_TXT
+    filledOut = filledOut.replace("${WIDGETS_INSTANTIATE}", jsInstantiate)
+    filledOut = filledOut.replace("${WIDGETS_NT4_SUBSCRIBE}", subscribeLine)
+    filledOut = filledOut.replace("${WIDGETS_UPDATE}", jsUpdate)
+    filledOut = filledOut.replace("${WIDGETS_SET_VALUE}", jsSetData)
+    filledOut = filledOut.replace("${WIDGETS_SET_NO_DATA}", jsSetNoData)
+    filledOut = filledOut.replace("${WIDGETS_CALLBACK}", jsCallback)
+    return filledOut
+
+# Get the cached copy of one generated dashboard page, building it first if needed
+def getDashboardPage(path, buildFunc, contentType):
+    with dashboardCacheLock:
+        cached = dashboardCache.get(path)
+        if cached is None:
+            cached = CachedResponse(buildFunc().encode(), contentType)
+            dashboardCache[path] = cached
+        return cached
+
+# Add a widget to the dashboard, and throw away the generated pages so they get rebuilt with it.
+# Both happen under the cache lock, so a page being built at the same time can't be cached
+# with the old widget list.
+def addDashboardWidget(widget):
+    with dashboardCacheLock:
+        widget.idx = len(dashboardWidgetList)
+        dashboardWidgetList.append(widget)
+        dashboardCache.clear()
+
+# In-memory copies of the files under webserver/www, so serving them costs no disk I/O
+# and little CPU. Files only change on a deploy, which restarts the server, so entries
+# are never re-checked against the disk. If everything doesn't fit in maxBytes,
+# the least recently requested files are dropped and go back to being served from disk.
+class StaticAssetCache():
+    def __init__(self, rootDir, maxBytes=STATIC_CACHE_MAX_BYTES):
+        self.rootDir = pathlib.Path(rootDir).resolve()
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    # Load every file up front, so the first requests at match start are fast too
+    def preload(self):
+        for filePath in sorted(self.rootDir.rglob("*")):
+            if filePath.is_file():
+                self.get(filePath)
+
+    # Get the cached response for a file, loading it if needed.
+    # Returns None for anything that can't or shouldn't be cached.
+    def get(self, filePath):
+        filePath = str(filePath)
+        with self.lock:
+            cached = self.entries.get(filePath)
+            if cached is not None:
+                self.entries.move_to_end(filePath)
+                return cached
+
+        cached = self._load(filePath)
+        if cached is None:
+            return None
+
+        with self.lock:
+            if filePath not in self.entries:
+                self.entries[filePath] = cached
+                self.totalBytes += cached.sizeBytes()
+                while self.totalBytes > self.maxBytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.totalBytes -= evicted.sizeBytes()
+        return cached
+
+    def _load(self, filePath):
+        # Only files which actually live under the web root
+        if not os.path.isfile(filePath) or not pathlib.Path(filePath).resolve().is_relative_to(self.rootDir):
+            return None
+
+        fileSize = os.path.getsize(filePath)
+        if fileSize > self.maxBytes // 2:
+            return None
+
+        with open(filePath, "rb") as inFile:
+            body = inFile.read()
+        compress = not filePath.lower().endswith(PRECOMPRESSED_EXTENSIONS)
+        return CachedResponse(body, _contentTypeFor(filePath), os.path.getmtime(filePath), compress)
+
+def _contentTypeFor(filePath):
+    ext = os.path.splitext(filePath)[1].lower()
+    return (CasseroleWebServerImpl.extensions_map.get(ext)
+            or mimetypes.guess_type(filePath)[0]
+            or "application/octet-stream")
+
+staticAssetCache = StaticAssetCache(WEB_ROOT)
+
+# Back-pressure between the robot loop and the webserver.
+# The robot loop calls update() once per loop. Worker threads check in with it
+# before bulk requests, which are deferred - sent back with a 503 and a time to retry
+# after - while it says the robot is busy. Transfers already in progress slow down instead.
+class RequestThrottle(metaclass=Singleton):
+    def __init__(self):
+        # Set while bulk requests are allowed through
+        self.clearEvent = threading.Event()
+        self.clearEvent.set()
+        self.lastBusyTime = None
+        self.countLock = threading.Lock()
+        self.deferredCount = 0
+        # Created on the first update, from the robot loop
+        self.throttledSig = None
+        self.deferredCountSig = None
+
+    def update(self, loopExecDur, longLoopThresh, enabledInMatch):
+        """Decide whether bulk requests should be held off this loop. Call once per robot loop.
+
+        Args:
+            loopExecDur (float): How long the robot loop just took, in seconds
+            longLoopThresh (float): Loop duration counted as an overrun, in seconds
+            enabledInMatch (bool): True if the robot is enabled on a competition field
+        """
+        if self.throttledSig is None:
+            self.throttledSig = BooleanSignal("Webserver Throttled")
+            self.deferredCountSig = IntegerSignal("Webserver Deferred Requests", "count")
+
+        now = time.monotonic()
+        if loopExecDur > longLoopThresh * THROTTLE_LOOP_FRACTION:
+            self.lastBusyTime = now
+        recentlyBusy = self.lastBusyTime is not None and (now - self.lastBusyTime) < THROTTLE_HOLD_S
+
+        if enabledInMatch or recentlyBusy:
+            self.clearEvent.clear()
+        else:
+            self.clearEvent.set()
+
+        self.throttledSig.set(self.isThrottled())
+        self.deferredCountSig.set(self.deferredCount)
+
+    def isThrottled(self):
+        return not self.clearEvent.is_set()
+
+    # Returns True if a bulk request may go ahead now. Never blocks.
+    def checkClearance(self):
+        if self.clearEvent.is_set():
+            return True
+
+        with self.countLock:
+            self.deferredCount += 1
+        return False
+
+    # Called between chunks of a bulk transfer to slow it down while throttled
+    def pauseIfThrottled(self):
+        if not self.clearEvent.is_set():
+            self.clearEvent.wait(THROTTLE_CHUNK_PAUSE_S)
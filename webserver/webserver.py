@@ -1,19 +1,209 @@
 import socketserver
 import socket
+import selectors
 import threading
 import functools
-from webserver.casseroleWebServerImpl import CasseroleWebServerImpl, dashboardWidgetList, WEB_ROOT
+import collections
+import queue
+import time
+import wpilib
+from webserver.casseroleWebServerImpl import CasseroleWebServerImpl, WEB_ROOT
+from webserver.casseroleWebServerImpl import addDashboardWidget, staticAssetCache, RequestThrottle
 from utils.singleton import Singleton
+from utils.signalLogging import Signal, IntegerSignal
 
-# A threaded TCP server starts up new python threads for each client request, which allows
-# complex requests to be handled in the background and not bog down robot code
-class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    pass
+# Default number of requests the webserver will work on at once
+WEB_MAX_CONCURRENCY = 4
+
+# Default number of bulk requests (log downloads and the like) worked on at once.
+# Keeps the rest of the workers free for the dashboard.
+WEB_MAX_BULK_REQUESTS = 2
+
+# How long a kept-alive connection may sit idle between requests before it's closed
+KEEP_ALIVE_IDLE_S = 15.0
+
+# Most idle kept-alive connections held open at once. The longest-idle ones get closed past this.
+MAX_PARKED_CONNECTIONS = 32
+
+# How often idle connections are checked for having timed out
+PARK_CHECK_PERIOD_S = 0.5
+
+# A TCP server which hands each client request off to a fixed pool of worker threads.
+# This lets complex requests be handled in the background without bogging down robot code,
+# while putting a cap on how many threads can be fighting the robot loop for time.
+# Once every worker is busy, new connections wait in a queue. Once the queue is full too,
+# new connections wait in the OS until there's room.
+# Between requests, a kept-alive connection doesn't hold on to a worker. It's "parked" with
+# one extra thread which watches every idle connection at once, and goes back in the queue
+# as soon as the client sends something more.
+class PooledTCPServer(socketserver.TCPServer):
+
+    def __init__(self, serverAddress, handlerClass, maxConcurrency=WEB_MAX_CONCURRENCY,
+                 maxBulk=WEB_MAX_BULK_REQUESTS):
+        super().__init__(serverAddress, handlerClass)
+        self.requestQueue = queue.Queue(maxsize=maxConcurrency * 4)
+        self.activeCount = 0
+        self.activeCountLock = threading.Lock()
+        self.bulkSlots = threading.BoundedSemaphore(maxBulk)
+
+        self.activeConnSig = IntegerSignal("Webserver Active Connections", "count")
+        self.queuedConnSig = IntegerSignal("Webserver Queued Connections", "count")
+        self.parkedConnSig = IntegerSignal("Webserver Idle Connections", "count")
+        self.requestDurSig = Signal("Webserver Request Duration", "ms")
+
+        # Idle connections, and the time each was parked. Only touched by the parker thread -
+        # workers hand connections over through parkQueue, and poke wakeSend so it notices.
+        self.parkedConns = collections.OrderedDict()
+        self.parkQueue = queue.SimpleQueue()
+        self.parkSelector = selectors.DefaultSelector()
+        self.wakeRecv, self.wakeSend = socket.socketpair()
+        self.wakeSend.setblocking(False)
+        self.parkSelector.register(self.wakeRecv, selectors.EVENT_READ, None)
+        self.parkerRunning = True
+        self.parker = threading.Thread(target=self._parkLoop, name="WebserverParker", daemon=True)
+        self.parker.start()
+
+        self.workers = []
+        for idx in range(maxConcurrency):
+            worker = threading.Thread(target=self._workerLoop, name=f"WebserverWorker{idx}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    # Called by serve_forever() for each new connection
+    def process_request(self, request, client_address):
+        self.requestQueue.put((request, client_address))
+        self.queuedConnSig.set(self.requestQueue.qsize())
+
+    # Called by the request handler after each request it finishes
+    def recordRequestDuration(self, duration):
+        self.requestDurSig.set(duration * 1000.0)
+
+    # Claim one of the limited slots for bulk work. Returns False if they're all in use.
+    def tryStartBulk(self):
+        return self.bulkSlots.acquire(blocking=False)
+
+    def endBulk(self):
+        self.bulkSlots.release()
+
+    def _workerLoop(self):
+        while True:
+            item = self.requestQueue.get()
+            if item is None:
+                break
+
+            self._updateActiveCount(1)
+            try:
+                self._serveConnection(item)
+            finally:
+                self._updateActiveCount(-1)
+
+    # Work on a new connection - a (socket, address) pair - or pick a parked one back up.
+    # Handlers which set `parked` when they return are parked again, rather than closed.
+    def _serveConnection(self, item):
+        if isinstance(item, tuple):
+            request, clientAddress = item
+            handler = None
+        else:
+            handler = item
+            request, clientAddress = handler.request, handler.client_address
+
+        keepOpen = False
+        try:
+            if handler is None:
+                handler = self.RequestHandlerClass(request, clientAddress, self)
+            else:
+                handler.resume()
+            keepOpen = getattr(handler, "parked", False)
+        except Exception: # pylint: disable=broad-except
+            self.handle_error(request, clientAddress)
+
+        if keepOpen and self.parkerRunning:
+            self.parkQueue.put(handler)
+            self._wakeParker()
+        else:
+            self.shutdown_request(request)
+
+    def _wakeParker(self):
+        try:
+            self.wakeSend.send(b"\0")
+        except OSError:
+            pass # Already plenty of wakeups waiting
+
+    # Parker thread main loop - waits on every idle connection at once, and queues up
+    # each one for a worker as soon as its client sends something
+    def _parkLoop(self):
+        while self.parkerRunning:
+            for key, _ in self.parkSelector.select(PARK_CHECK_PERIOD_S):
+                if key.data is None:
+                    self.wakeRecv.recv(4096)
+                else:
+                    self._unpark(key.data)
+                    self._requeueParked(key.data)
+
+            now = time.monotonic()
+            while True:
+                try:
+                    handler = self.parkQueue.get_nowait()
+                except queue.Empty:
+                    break
+                self.parkSelector.register(handler.connection, selectors.EVENT_READ, handler)
+                self.parkedConns[handler] = now
+
+            # Oldest first, so stop at the first one which is still allowed to stay
+            for handler, parkTime in list(self.parkedConns.items()):
+                if now - parkTime < KEEP_ALIVE_IDLE_S and len(self.parkedConns) <= MAX_PARKED_CONNECTIONS:
+                    break
+                self._unpark(handler)
+                self._closeParked(handler)
+            self.parkedConnSig.set(len(self.parkedConns))
+
+        for handler in list(self.parkedConns):
+            self._unpark(handler)
+            self._closeParked(handler)
+
+    def _unpark(self, handler):
+        self.parkSelector.unregister(handler.connection)
+        del self.parkedConns[handler]
+
+    # Hand a parked connection with a new request back to the workers. Never waits, so one
+    # full queue can't hold up every other parked connection. If there's no room, the connection
+    # is closed, and the client can reconnect - just like a new connection left waiting in the OS.
+    def _requeueParked(self, handler):
+        try:
+            self.requestQueue.put_nowait(handler)
+        except queue.Full:
+            self._closeParked(handler)
+
+    def _closeParked(self, handler):
+        handler.parked = False
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(handler.request)
+
+    def _updateActiveCount(self, delta):
+        with self.activeCountLock:
+            self.activeCount += delta
+            self.activeConnSig.set(self.activeCount)
+        self.queuedConnSig.set(self.requestQueue.qsize())
+
+    # Close idle connections, and stop the workers once they finish whatever connections are already queued
+    def server_close(self):
+        super().server_close()
+        self.parkerRunning = False
+        self._wakeParker()
+        self.parker.join()
+        self.parkSelector.close()
+        self.wakeRecv.close()
+        self.wakeSend.close()
+        for _ in self.workers:
+            self.requestQueue.put(None)
 
 # Main robot website server
 class Webserver(metaclass=Singleton):
     
-    def __init__(self):
+    def __init__(self, maxConcurrency=WEB_MAX_CONCURRENCY):
         
         httpPort=5805
         
@@ -22,13 +212,16 @@ class Webserver(metaclass=Singleton):
         templatingHttpHandler = functools.partial(CasseroleWebServerImpl, 
                                      directory=str(WEB_ROOT))
 
+        # Pull all the static files into memory now, rather than during the match
+        staticAssetCache.preload()
+
         hostname=socket.gethostname()   
         ipAddr=socket.gethostbyname(hostname)   
 
-        self.httpServer = ThreadedTCPServer(("", httpPort), templatingHttpHandler)
+        self.httpServer = PooledTCPServer(("", httpPort), templatingHttpHandler, maxConcurrency)
 
-        # Start a thread with the HTTP server -- that thread will then start one
-        # more thread for each request
+        # Start a thread with the HTTP server -- that thread will then pass each
+        # request on to the pool of worker threads
         self.serverThread = threading.Thread(target=self.httpServer.serve_forever)
         # Exit the server thread when the main thread terminates
         self.serverThread.daemon = True
@@ -47,8 +240,15 @@ class Webserver(metaclass=Singleton):
     def shutdown(self):
         self.httpServer.shutdown()
         self.serverThread.join()
+        self.httpServer.server_close()
         
     # public api to submit a new dashboard widget
     def addDashboardWidget(self, widget):
-        widget.idx = len(dashboardWidgetList)
-        dashboardWidgetList.append(widget)
\ No newline at end of file
+        addDashboardWidget(widget)
+
+    # public api to tell the webserver how busy the robot loop is. Call once per loop.
+    # Bulk requests (log downloads, deletes and listings) are held off while the loop is
+    # running close to longLoopThresh, or while the robot is enabled in a match.
+    def updateThrottle(self, loopExecDur, longLoopThresh):
+        enabledInMatch = wpilib.DriverStation.isFMSAttached() and wpilib.DriverStation.isEnabled()
+        RequestThrottle().update(loopExecDur, longLoopThresh, enabledInMatch)
\ No newline at end of file
@@ -20,6 +20,36 @@ function resetAll(){
     calTilesMap.forEach(cal => cal.reset());
 }
 
+// Download all current calibration values as a file
+window.exportCals = exportCals;
+function exportCals(){
+    window.location.href = "/calibrations/export";
+}
+
+// Send a previously exported file back to the robot
+window.importCals = importCals;
+function importCals(fileInput){
+    var file = fileInput.files[0];
+    if(file === undefined){
+        return;
+    }
+    file.text()
+        .then(text => fetch("/calibrations/import", {method: "POST", body: text}))
+        .then(response => {
+            if(!response.ok){
+                throw new Error("Robot rejected the calibration file");
+            }
+            return response.json();
+        })
+        .then(result => {
+            if(result.unknown.length > 0){
+                alert("Skipped unknown calibrations: " + result.unknown.join(", "));
+            }
+        })
+        .catch(err => alert(err));
+    fileInput.value = "";
+}
+
 // Re-filter the calibrations shown to the user by a new spec
 window.filterChangeHandler = filterChangeHandler;
 function filterChangeHandler(filterSpec_in){
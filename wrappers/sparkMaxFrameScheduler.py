@@ -0,0 +1,175 @@
+import wpilib
+from wpilib import RobotController
+from rev import CANSparkMax
+from utils.signalLogging import Signal
+
+STATUS0 = CANSparkMax.PeriodicFrame.kStatus0 # Applied output and faults
+STATUS1 = CANSparkMax.PeriodicFrame.kStatus1 # Velocity, temperature, voltage, current
+STATUS2 = CANSparkMax.PeriodicFrame.kStatus2 # Position
+STATUS3 = CANSparkMax.PeriodicFrame.kStatus3 # Analog sensor input
+
+# Frame periods, in ms
+STATUS0_PERIOD_MS = 20 # Always kept at this rate
+FAST_PERIOD_MS = 20    # Data some code reads - once per loop
+SLOW_PERIOD_MS = 250   # Data which is only logged
+BOOST_PERIOD_MS = 10   # Default for temporary boosts
+OFF_PERIOD_MS = 65500  # Slowest the Spark Max allows - effectively off
+
+# Data keeps coming fast for this long after its getter was last called
+USAGE_HOLD_S = 2.0
+
+# Rates are re-planned this often, or sooner if a boost is requested
+SCHEDULE_PERIOD_S = 0.5
+
+# Rough cost of one status frame on the bus - extended ID, 8 data bytes, and
+# worst-case bit stuffing - on a 1 Mbit/s bus.
+FRAME_BITS = 150
+CAN_BITRATE_BPS = 1.0e6
+
+# Fraction of the CAN bus (0-1) we're willing to let all traffic use.
+# Other devices' traffic is measured and counts against this too.
+CAN_BUDGET_FRAC = 0.6
+
+# Fraction of the bus (0-1) taken by one frame sent at the given period
+def frameLoad(periodMs):
+    return FRAME_BITS / CAN_BITRATE_BPS / (periodMs / 1000.0)
+
+# Scheduler's record of one motor
+class _MotorFrameState():
+    def __init__(self, motor, now):
+        self.motor = motor
+        # Assume everything is in use to start with
+        self.lastUsedTime = {STATUS1: now, STATUS2: now}
+        self.boostEndTime = 0.0
+        self.boostPeriodMs = BOOST_PERIOD_MS
+        self.status1PeriodSig = Signal(motor.name + "_status1Period", "ms")
+        self.status2PeriodSig = Signal(motor.name + "_status2Period", "ms")
+
+# Picks status frame periods for every Spark Max.
+# Each frame is sent fast only if some code actually calls a getter which needs it, and only
+# slowly (for logging) otherwise. Subsystems can ask for faster frames for a while.
+# If the whole plan would use more of the CAN bus than the budget allows, frames are slowed
+# down to fit - unread frames first, then un-boosted ones, then boosted ones. Frames which
+# some code reads are never slowed past SLOW_PERIOD_MS, even if that means going over budget.
+class SparkMaxFrameScheduler():
+    def __init__(self):
+        self.motorStates = {}
+        self.nextScheduleTime = 0.0
+        self.replanRequested = False
+
+        self.estLoadSig = Signal("SparkMax CAN Est Load", "frac")
+        self.budgetSig = Signal("SparkMax CAN Budget", "frac")
+        self.stretchSig = Signal("SparkMax CAN Budget Stretch", "factor")
+
+    def requestBoost(self, motor, durationSec, periodMs=BOOST_PERIOD_MS):
+        """Send all of one motor's used data at a faster rate for a while
+
+        Args:
+            motor (WrapperedSparkMax): motor to speed up
+            durationSec (float): how long to keep the faster rate for
+            periodMs (int, optional): frame period to use while boosted. Defaults to BOOST_PERIOD_MS.
+        """
+        state = self._getState(motor, wpilib.Timer.getFPGATimestamp())
+        state.boostEndTime = wpilib.Timer.getFPGATimestamp() + durationSec
+        state.boostPeriodMs = periodMs
+        self.replanRequested = True
+
+    def update(self, motorList):
+        """Re-plan frame rates if it's time to. Call once per loop.
+        """
+        now = wpilib.Timer.getFPGATimestamp()
+        if not self.replanRequested and now < self.nextScheduleTime:
+            return
+        self.nextScheduleTime = now + SCHEDULE_PERIOD_S
+        self.replanRequested = False
+        # Despite the name, WPILib reports this as a fraction of the bus (0-1), not a percentage
+        measuredLoad = RobotController.getCANStatus().percentBusUtilization
+        self.schedule(motorList, now, min(1.0, max(0.0, measuredLoad)))
+
+    def schedule(self, motorList, now, measuredLoad):
+        """Work out and apply new frame periods for all motors
+
+        Args:
+            motorList (list[WrapperedSparkMax]): every motor to schedule
+            now (float): current time, in seconds
+            measuredLoad (float): measured CAN bus utilization, 0-1
+        """
+        # Whatever the bus is busy with besides our frames still counts against the budget
+        curSparkLoad = sum(frameLoad(periodMs) for motor in motorList for periodMs in motor.framePeriodsMs.values())
+        budget = max(0.0, CAN_BUDGET_FRAC - max(0.0, measuredLoad - curSparkLoad))
+
+        # Each entry is [motor, frame, period, boosted, inUse]
+        plan = []
+        for motor in motorList:
+            plan.extend(self._planMotor(motor, now))
+
+        fixedLoad = len(motorList) * (frameLoad(STATUS0_PERIOD_MS) + frameLoad(OFF_PERIOD_MS))
+        stretch = self._fitToBudget(plan, budget - fixedLoad)
+
+        for motor, frame, periodMs, _, _ in plan:
+            motor.setFramePeriod(frame, periodMs)
+        for motor in motorList:
+            state = self.motorStates[motor]
+            state.status1PeriodSig.set(motor.framePeriodsMs[STATUS1])
+            state.status2PeriodSig.set(motor.framePeriodsMs[STATUS2])
+
+        self.estLoadSig.set(fixedLoad + sum(frameLoad(entry[2]) for entry in plan))
+        self.budgetSig.set(budget)
+        self.stretchSig.set(stretch)
+
+    # Frame periods one motor wants, ignoring the budget
+    def _planMotor(self, motor, now):
+        state = self._getState(motor, now)
+        used1, used2 = motor.takeFrameUsage()
+        if used1:
+            state.lastUsedTime[STATUS1] = now
+        if used2:
+            state.lastUsedTime[STATUS2] = now
+
+        boosted = now < state.boostEndTime
+        entries = []
+        for frame in (STATUS1, STATUS2):
+            inUse = (now - state.lastUsedTime[frame]) < USAGE_HOLD_S
+            periodMs = FAST_PERIOD_MS if inUse else SLOW_PERIOD_MS
+            if boosted and inUse:
+                entries.append([motor, frame, min(periodMs, state.boostPeriodMs), True, inUse])
+            else:
+                entries.append([motor, frame, periodMs, False, inUse])
+        return entries
+
+    # Slow down frames in the plan until they fit in the budget, one group at a time.
+    # Only frames nobody reads can be turned off. The rest stop at SLOW_PERIOD_MS.
+    # Returns how much the in-use, un-boosted frames had to be slowed by.
+    @staticmethod
+    def _fitToBudget(plan, budget):
+        stretch = 1.0
+        # Each group is (which entries are in it, slowest period allowed, whether it sets the returned stretch)
+        groups = (
+            (lambda entry: not entry[4], OFF_PERIOD_MS, False),
+            (lambda entry: entry[4] and not entry[3], SLOW_PERIOD_MS, True),
+            (lambda entry: entry[3], SLOW_PERIOD_MS, False),
+        )
+        for inGroup, maxPeriodMs, isStretchGroup in groups:
+            totalLoad = sum(frameLoad(entry[2]) for entry in plan)
+            if totalLoad <= budget:
+                break
+
+            groupEntries = [entry for entry in plan if inGroup(entry)]
+            groupLoad = sum(frameLoad(entry[2]) for entry in groupEntries)
+            if groupLoad <= 0.0:
+                continue
+            room = budget - (totalLoad - groupLoad)
+            # No room at all sends the whole group to its slowest rate
+            factor = groupLoad / room if room > 0.0 else float(maxPeriodMs)
+            for entry in groupEntries:
+                entry[2] = max(entry[2], min(maxPeriodMs, int(entry[2] * factor + 0.999)))
+            if isStretchGroup:
+                stretch = min(factor, SLOW_PERIOD_MS / FAST_PERIOD_MS)
+        return stretch
+
+    def _getState(self, motor, now):
+        state = self.motorStates.get(motor)
+        if state is None:
+            state = _MotorFrameState(motor, now)
+            self.motorStates[motor] = state
+        return state
@@ -1,57 +1,232 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from rev import CANSparkMax, CANSparkMaxLowLevel, SparkMaxPIDController, REVLibError
-from utils.signalLogging import log
+from utils.signalLogging import Signal, IntegerSignal, BooleanSignal
 from utils.units import rev2Rad, radPerSec2RPM, RPM2RadPerSec
 from utils.faults import Fault
+from utils.singleton import Singleton
+from wrappers.sparkMaxFrameScheduler import SparkMaxFrameScheduler, BOOST_PERIOD_MS
+from wrappers.sparkMaxFrameScheduler import STATUS0, STATUS1, STATUS2, STATUS3
+from wrappers.sparkMaxFrameScheduler import STATUS0_PERIOD_MS, FAST_PERIOD_MS, OFF_PERIOD_MS
+
+# Number of motor controllers configured at the same time
+CONFIG_WORKERS = 8
+
+# Attempts at configuring one controller before giving up on it
+CONFIG_MAX_TRIES = 10
+
+# Version of the settings configure() burns into flash. Bump this whenever configure()
+# changes what it sets, so controllers set up by older code get factory reset again.
+CONFIG_VERSION = 1
+
+# The version is stored in a PID slot nothing else uses, as that slot's I-Zone.
+# Small whole numbers survive the Spark Max's 32-bit float storage exactly.
+CONFIG_MARKER_SLOT = 3
+
+# Keeps track of every Spark Max, and reads all their sensors together once per loop.
+# Without this, each getter call is its own trip into the REV library, and the same
+# value often gets read several times per loop by different bits of code.
+# Also runs every controller's startup configuration in the background, all at once,
+# rather than one after another inside robotInit().
+class SparkMaxWrangler(metaclass=Singleton):
+    def __init__(self):
+        self.motorList = []
+        self.frameScheduler = SparkMaxFrameScheduler()
+        self.snapshotTime = None
+        self.snapshotReadTimeSig = Signal("SparkMax Snapshot Read Time", "ms")
+        self.snapshotPeriodSig = Signal("SparkMax Snapshot Period", "ms")
+
+        self.configPool = ThreadPoolExecutor(max_workers=CONFIG_WORKERS, thread_name_prefix="SparkMaxConfig")
+        self.configPending = []
+        self.configStartTime = time.perf_counter()
+        self.configDoneSig = BooleanSignal("SparkMax Config Done")
+        self.configTotalTimeSig = Signal("SparkMax Config Total Time", "ms")
+
+    def register(self, motor):
+        self.motorList.append(motor)
+        self.configPending.append((motor, self.configPool.submit(motor.configure)))
+
+    def isConfigDone(self):
+        return not self.configPending
+
+    def waitForConfig(self, timeoutSec=None):
+        """Block until every motor controller has finished configuring (or given up).
+        Only needed for things which must have configured motors right away - otherwise
+        snapshotAll() picks up the results as they finish.
+        """
+        for _, future in self.configPending:
+            future.result(timeout=timeoutSec)
+        self._checkConfig()
+
+    # Report results for any motors which have finished configuring since last time
+    def _checkConfig(self):
+        stillPending = []
+        for motor, future in self.configPending:
+            if future.done():
+                motor.reportConfig()
+            else:
+                stillPending.append((motor, future))
+        self.configPending = stillPending
+
+        if not self.configPending:
+            self.configTotalTimeSig.set((time.perf_counter() - self.configStartTime) * 1000.0)
+            # Nothing left for the workers to do - unless more motors get created later, which starts them back up
+            self.configPool.shutdown(wait=False)
+            self.configPool = ThreadPoolExecutor(max_workers=CONFIG_WORKERS, thread_name_prefix="SparkMaxConfig")
+        self.configDoneSig.set(not self.configPending)
+
+    # Read every registered motor's sensors. Call once, at the top of robotPeriodic().
+    # All getters return these values until the next snapshot.
+    def snapshotAll(self):
+        if self.configPending:
+            self._checkConfig()
+
+        startTime = time.perf_counter()
+        for motor in self.motorList:
+            motor.updateSnapshot()
+        endTime = time.perf_counter()
+
+        # Time since the previous snapshot, ie, how long its values were in use
+        if self.snapshotTime is not None:
+            self.snapshotPeriodSig.set((endTime - self.snapshotTime) * 1000.0)
+        self.snapshotTime = endTime
+        self.snapshotReadTimeSig.set((endTime - startTime) * 1000.0)
+
+        self.frameScheduler.update(self.motorList)
+
+# The Spark Max stores parameters as 32-bit floats, so values read back won't exactly match what was sent
+def _differs(actual, desired):
+    return abs(actual - desired) > 1e-6 * max(1.0, abs(desired))
 
 ## Wrappered Spark Max
 # Wrappers REV's libraries to add the following functionality for spark max controllers:
 # Grouped PID controller, Encoder, and motor controller objects
 # Physical unit conversions into SI units (radians)
-# Retry logic for initial configuration
+# Retry logic for initial configuration, run in the background by SparkMaxWrangler
 # Fault handling for not crashing code if the motor controller is disconnected
 # Fault annunication logic to trigger warnings if a motor couldn't be configured
+# Once-per-loop sensor snapshots, see SparkMaxWrangler
+# Status frame rates picked based on which getters get used, see SparkMaxFrameScheduler
 class WrapperedSparkMax():
     def __init__(self, canID, name, brakeMode = False):
+        self.canID = canID
+        self.brakeMode = brakeMode
         self.ctrl = CANSparkMax(canID, CANSparkMaxLowLevel.MotorType.kBrushless)
         self.pidCtrl = self.ctrl.getPIDController()
         self.encoder = self.ctrl.getEncoder()
         self.name = name
         self.connected = False
         self.disconFault = Fault(f"Spark Max {name} ID {canID} disconnected")
+
+        self.desVelSig = Signal(name + "_desVel", "RPM")
+        self.arbFFSig = Signal(name + "_arbFF", "V")
+        self.cmdVoltageSig = Signal(name + "_cmdVoltage", "V")
+        self.outputCurrentSig = Signal(name + "_outputCurrent", "A")
+        self.motorActPosSig = Signal(name + "_motorActPos", "rad")
+        self.motorActVelSig = Signal(name + "_motorActVel", "RPM")
+        self.motorTempSig = Signal(name + "_motorTemp", "C")
+        self.configTimeSig = Signal(name + "_configTime", "ms")
+        self.configTriesSig = IntegerSignal(name + "_configTries", "count")
+
+        # Most recent sensor snapshot. Until the first one is taken, getters read the sensors directly.
+        self.snapshotValid = False
+        self.posRad = 0.0
+        self.velRadPerSec = 0.0
+        self.outputCurrentA = 0.0
+        self.motorTempC = 0.0
+
+        # Whether anything has asked for data from each status frame since the scheduler last checked
+        self.usedStatus1 = False
+        self.usedStatus2 = False
+        # Frame periods currently configured on the controller, in ms
+        self.framePeriodsMs = {
+            STATUS0: STATUS0_PERIOD_MS,
+            STATUS1: FAST_PERIOD_MS,
+            STATUS2: FAST_PERIOD_MS,
+            STATUS3: OFF_PERIOD_MS,
+        }
         
-        # Perform motor configuration, tracking errors and retrying until we have success
-        retryCounter = 0
-        while(not self.connected and retryCounter < 10):
-            retryCounter += 1
+        # Settings asked for while configuration is still running get applied at the end of it.
+        # The lock keeps them from getting lost in between.
+        self.configLock = threading.Lock()
+        self.desInverted = False
+        self.desPID = None
+        self.configTries = 0
+        self.configTimeMs = 0.0
+        self.skippedFactoryReset = False
+
+        # Configuration happens in the background - until it's done, connected stays False
+        SparkMaxWrangler().register(self)
+
+    # Perform motor configuration, tracking errors and retrying until we have success.
+    # Runs on one of SparkMaxWrangler's worker threads.
+    def configure(self):
+        startTime = time.perf_counter()
+        mode = CANSparkMax.IdleMode.kBrake if self.brakeMode else CANSparkMax.IdleMode.kCoast
+        while(not self.connected and self.configTries < CONFIG_MAX_TRIES):
+            self.configTries += 1
             errList = []
-            errList.append(self.ctrl.restoreFactoryDefaults())
-            mode = CANSparkMax.IdleMode.kBrake if brakeMode else CANSparkMax.IdleMode.kCoast            
+            # A factory reset is slow, and only needed if the controller's flash wasn't set up by this
+            # version of configure(). Skip it if the marker burned in along with the settings matches.
+            self.skippedFactoryReset = self._configMarkerMatches()
+            if(not self.skippedFactoryReset):
+                errList.append(self.ctrl.restoreFactoryDefaults())
             errList.append(self.ctrl.setIdleMode(mode))
             errList.append(self.ctrl.setSmartCurrentLimit(40))
-            # Status 0 = Motor output and Faults
-            errList.append(self.ctrl.setPeriodicFramePeriod(CANSparkMax.PeriodicFrame.kStatus0, 20)) 
-            # Status 1 = Motor velocity & electrical data
-            errList.append(self.ctrl.setPeriodicFramePeriod(CANSparkMax.PeriodicFrame.kStatus1, 60))
-            # Status 2 = Motor Position
-            errList.append(self.ctrl.setPeriodicFramePeriod(CANSparkMax.PeriodicFrame.kStatus2, 65500))
-            # Status 3 = Analog Sensor Input
-            errList.append(self.ctrl.setPeriodicFramePeriod(CANSparkMax.PeriodicFrame.kStatus3, 65500))
+            # Start with every status frame in use. The scheduler slows down the unused ones later.
+            for frame, periodMs in self.framePeriodsMs.items():
+                errList.append(self.ctrl.setPeriodicFramePeriod(frame, periodMs))
+            if(not self.skippedFactoryReset and all(x == REVLibError.kOk for x in errList)):
+                # Only mark the controller as set up once everything else worked
+                errList.append(self.pidCtrl.setIZone(CONFIG_VERSION, CONFIG_MARKER_SLOT))
+                errList.append(self.ctrl.burnFlash())
             if(any(x != REVLibError.kOk for x in errList)):
-                print(f"Failure configuring Spark Max {name} CAN ID {canID}, retrying...")
-            else:
+                print(f"Failure configuring Spark Max {self.name} CAN ID {self.canID}, retrying...")
+                continue
+
+            with self.configLock:
+                self._applyInverted()
+                self._applyPID()
                 self.connected = True
-                
+        self.configTimeMs = (time.perf_counter() - startTime) * 1000.0
+
+    # True if the controller's flash was last set up by this version of configure()
+    def _configMarkerMatches(self):
+        return self.pidCtrl.getIZone(CONFIG_MARKER_SLOT) == CONFIG_VERSION
+
+    # Publish how configuration went. Called on the main thread once configure() is done.
+    def reportConfig(self):
         self.disconFault.set(not self.connected)
+        self.configTimeSig.set(self.configTimeMs)
+        self.configTriesSig.set(self.configTries)
+
+    def _applyInverted(self):
+        if(self.ctrl.getInverted() != self.desInverted):
+            self.ctrl.setInverted(self.desInverted)
+
+    def _applyPID(self):
+        if(self.desPID is None):
+            return
+        kP, kI, kD = self.desPID
+        if(_differs(self.pidCtrl.getP(), kP)):
+            self.pidCtrl.setP(kP)
+        if(_differs(self.pidCtrl.getI(), kI)):
+            self.pidCtrl.setI(kI)
+        if(_differs(self.pidCtrl.getD(), kD)):
+            self.pidCtrl.setD(kD)
         
     def setInverted(self, isInverted):
-        if(self.connected):
-            self.ctrl.setInverted(isInverted)
+        with self.configLock:
+            self.desInverted = isInverted
+            if(self.connected):
+                self._applyInverted()
     
     def setPID(self, kP, kI, kD):
-        if(self.connected):
-            self.pidCtrl.setP(kP)
-            self.pidCtrl.setI(kI)
-            self.pidCtrl.setD(kD)
+        with self.configLock:
+            self.desPID = (kP, kI, kD)
+            if(self.connected):
+                self._applyPID()
         
     def setVelCmd(self, velCmd, arbFF=0):
         """_summary_
@@ -66,31 +241,74 @@ class WrapperedSparkMax():
             self.pidCtrl.setReference(velCmdRPM, CANSparkMax.ControlType.kVelocity, 
                                     0, arbFF, SparkMaxPIDController.ArbFFUnits.kVoltage)
             
-        log(self.name + "_desVel", velCmdRPM, "RPM")
-        log(self.name + "_arbFF", arbFF, "V")
-        self._logCurrent()
+        self.desVelSig.set(velCmdRPM)
+        self.arbFFSig.set(arbFF)
 
     def setVoltage(self, outputVoltageVolts):
-        log(self.name + "_cmdVoltage", outputVoltageVolts, "V")
+        self.cmdVoltageSig.set(outputVoltageVolts)
         if(self.connected):
             self.ctrl.setVoltage(outputVoltageVolts)
-            self._logCurrent()
-    
-    def _logCurrent(self):
-        log(self.name + "_outputCurrent", self.ctrl.getOutputCurrent(), "A")
-    
-    def getMotorPositionRad(self):
+
+    # Read all sensors from the controller at once. Called by SparkMaxWrangler.snapshotAll().
+    def updateSnapshot(self):
         if(self.connected):
-            pos =  rev2Rad(self.encoder.getPosition())
+            self.posRad = rev2Rad(self.encoder.getPosition())
+            velRPM = self.encoder.getVelocity()
+            self.outputCurrentA = self.ctrl.getOutputCurrent()
+            self.motorTempC = self.ctrl.getMotorTemperature()
         else:
-            pos = 0
-        log(self.name + "_motorActPos", pos, "rad")
-        return pos
+            self.posRad = 0.0
+            velRPM = 0.0
+            self.outputCurrentA = 0.0
+            self.motorTempC = 0.0
+        self.velRadPerSec = RPM2RadPerSec(velRPM)
+        self.snapshotValid = True
+
+        self.motorActPosSig.set(self.posRad)
+        self.motorActVelSig.set(velRPM)
+        self.outputCurrentSig.set(self.outputCurrentA)
+        self.motorTempSig.set(self.motorTempC)
+
+    # Change one status frame's period, if it's not already set to that
+    # Skipped until configuration is done, the next plan will pick it up
+    def setFramePeriod(self, frame, periodMs):
+        if(self.connected and self.framePeriodsMs[frame] != periodMs):
+            self.ctrl.setPeriodicFramePeriod(frame, periodMs)
+            self.framePeriodsMs[frame] = periodMs
+
+    # Which status frames have been needed since the last call. Used by SparkMaxFrameScheduler.
+    def takeFrameUsage(self):
+        usage = (self.usedStatus1, self.usedStatus2)
+        self.usedStatus1 = False
+        self.usedStatus2 = False
+        return usage
+
+    def boostStatusFrames(self, durationSec, periodMs=BOOST_PERIOD_MS):
+        """Get fresher sensor data for a while, ie, while following a trajectory.
+        Only speeds up data something is actually reading.
+
+        Args:
+            durationSec (float): how long to boost for
+            periodMs (int, optional): status frame period while boosted. Defaults to BOOST_PERIOD_MS.
+        """
+        SparkMaxWrangler().frameScheduler.requestBoost(self, durationSec, periodMs)
+
+    def getMotorPositionRad(self):
+        self.usedStatus2 = True
+        if(not self.snapshotValid):
+            return rev2Rad(self.encoder.getPosition()) if self.connected else 0
+        return self.posRad
     
     def getMotorVelocityRadPerSec(self):
-        if(self.connected):
-            vel = self.encoder.getVelocity()
-        else:
-            vel = 0
-        log(self.name + "_motorActVel", vel, "RPM")
-        return RPM2RadPerSec(vel)
\ No newline at end of file
+        self.usedStatus1 = True
+        if(not self.snapshotValid):
+            return RPM2RadPerSec(self.encoder.getVelocity()) if self.connected else 0
+        return self.velRadPerSec
+
+    def getOutputCurrentA(self):
+        self.usedStatus1 = True
+        return self.outputCurrentA
+
+    def getMotorTemperatureC(self):
+        self.usedStatus1 = True
+        return self.motorTempC
\ No newline at end of file